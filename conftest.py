@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_feed_caches():
+    """Тест откатывает свою транзакцию, и смена поколений лент,
+    отложенная до COMMIT, не происходит: страницы и буферы лент из
+    прошлого теста сбрасываются явно.
+    """
+    from django.core.cache import cache
+
+    from posts.hot_feeds import registry
+
+    cache.clear()
+    registry.reset()
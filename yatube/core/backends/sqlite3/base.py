@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+from core.slow_queries import SlowQueryLog
+
+# Ключи OPTIONS, которые обрабатывает сам бэкенд, а не sqlite3.connect.
+OWN_OPTIONS = ('pragmas', 'transaction_mode')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с настройкой соединений из OPTIONS.
+
+    ``pragmas`` выполняются при открытии каждого соединения; с
+    CONN_MAX_AGE это происходит раз на соединение, а не на запрос.
+    ``transaction_mode`` задаёт вид BEGIN для transaction.atomic:
+    при IMMEDIATE транзакция сразу берёт блокировку записи и ждёт её
+    по busy_timeout, а не падает с «database is locked», когда другой
+    процесс успел записать между её чтением и записью.
+
+    При заданном SLOW_QUERY_MS все запросы соединения проходят через
+    журнал медленных запросов.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if settings.SLOW_QUERY_MS is not None:
+            self.execute_wrappers.append(SlowQueryLog(
+                settings.SLOW_QUERY_LOG, settings.SLOW_QUERY_MS))
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for option in OWN_OPTIONS:
+            params.pop(option, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', {})
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
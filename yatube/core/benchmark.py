@@ -0,0 +1,288 @@
+import math
+import platform
+import random
+import sqlite3
+import time
+import tracemalloc
+from datetime import timedelta
+from importlib import import_module
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from posts.models import AuthorStats, Comment, Group, Post
+
+User = get_user_model()
+
+# Приложения, все адреса которых замеряются.
+URLCONFS = ('posts', 'users', 'about')
+PERCENTILES = (50, 95, 99)
+# cold — кэш очищается перед каждым запросом, warm — как на живом сайте.
+MODES = ('cold', 'warm')
+WORDS = (
+    'пост', 'лента', 'группа', 'автор', 'комментарий', 'новость', 'день',
+    'город', 'работа', 'книга', 'музыка', 'фото', 'погода', 'кот', 'чай',
+    'код', 'база', 'запрос', 'индекс', 'кэш', 'сервер', 'отпуск', 'море',
+)
+
+
+def skewed(rng, count, skew):
+    """Номер от 0 до ``count - 1``; первые выпадают намного чаще.
+
+    При ``skew=3`` на первые 10% номеров приходится почти половина
+    выборок, как у самых активных авторов и групп.
+    """
+    return min(int(count * rng.random() ** skew), count - 1)
+
+
+def random_text(rng):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(5, 60)))
+
+
+def insert_rows(model, fields, rows):
+    """INSERT пачкой в обход создания моделей: миллионы строк иначе
+    тратят большую часть времени на Python.
+    """
+    meta = model._meta
+    columns = ', '.join(
+        connection.ops.quote_name(meta.get_field(field).column)
+        for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {meta.db_table} ({columns}) '
+            f'VALUES ({placeholders})', rows)
+
+
+def seed(posts, authors, groups, comments_per_post=0.5, skew=3.0,
+         seed=0, batch_size=10000, progress=None):
+    """Заполнить базу постами с неравномерным распределением по
+    авторам и группам; одинаковые параметры дают одинаковые данные.
+    """
+    rng = random.Random(seed)
+    adapt = connection.ops.adapt_datetimefield_value
+    User.objects.bulk_create(
+        (User(username=f'author{number}', first_name='Автор',
+              last_name=str(number), password=make_password(None))
+         for number in range(authors)),
+        batch_size=batch_size)
+    Group.objects.bulk_create(
+        (Group(title=f'Группа {number}', slug=f'group-{number}',
+               description='Группа для замеров')
+         for number in range(groups)),
+        batch_size=batch_size)
+    author_ids = list(User.objects.filter(
+        username__startswith='author').order_by('pk').values_list(
+        'pk', flat=True))
+    group_ids = list(Group.objects.filter(
+        slug__startswith='group-').order_by('pk').values_list(
+        'pk', flat=True))
+    first_id = (Post.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+    span = timedelta(days=365)
+    start = timezone.now() - span
+    step = span / max(posts, 1)
+
+    def post_date(number):
+        return start + step * number
+
+    for offset in range(0, posts, batch_size):
+        rows = []
+        for number in range(offset, min(offset + batch_size, posts)):
+            # Треть постов без группы.
+            group_id = (
+                group_ids[skewed(rng, len(group_ids), skew)]
+                if group_ids and rng.random() < 0.67 else None)
+            date = adapt(post_date(number))
+            rows.append((
+                random_text(rng), date,
+                author_ids[skewed(rng, len(author_ids), skew)],
+                group_id, date, '', 0))
+        with transaction.atomic():
+            insert_rows(Post, (
+                'text', 'pub_date', 'author', 'group', 'modified', 'image',
+                'comment_count'), rows)
+        if progress is not None:
+            progress('постов', offset + len(rows))
+    comments = int(posts * comments_per_post)
+    for offset in range(0, comments, batch_size):
+        rows = []
+        for _ in range(offset, min(offset + batch_size, comments)):
+            # Обсуждают в основном свежие посты.
+            number = posts - 1 - skewed(rng, posts, skew)
+            rows.append((
+                first_id + number,
+                author_ids[skewed(rng, len(author_ids), skew)],
+                random_text(rng),
+                adapt(post_date(number) + timedelta(
+                    minutes=rng.randint(1, 60 * 24)))))
+        with transaction.atomic():
+            insert_rows(
+                Comment, ('post', 'author', 'text', 'created'), rows)
+        if progress is not None:
+            progress('комментариев', offset + len(rows))
+    counts = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post').annotate(count=Count('id')).values('count')
+    Post.objects.filter(pk__gte=first_id).update(
+        comment_count=Coalesce(Subquery(counts), 0))
+    AuthorStats.rebuild(author_ids=author_ids)
+    cache.clear()
+
+
+def sample_kwargs(user):
+    """Значения для параметров адресов: самые нагруженные автор и
+    группа и последний пост автора.
+    """
+    group = Group.objects.order_by('pk').first()
+    post = Post.objects.filter(author=user).order_by('-pub_date').first()
+    return {
+        'username': user.username,
+        'slug': group.slug if group else 'missing',
+        'post_id': post.pk if post else 0,
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user),
+    }
+
+
+def url_paths(user, only=None, skip=()):
+    """{имя URL: путь} для всех адресов приложений из URLCONFS."""
+    kwargs = sample_kwargs(user)
+    paths = {}
+    for app in URLCONFS:
+        module = import_module(f'{app}.urls')
+        namespace = getattr(module, 'app_name', app)
+        for pattern in module.urlpatterns:
+            name = f'{namespace}:{pattern.name}'
+            if (only and name not in only) or name in skip:
+                continue
+            paths[name] = reverse(name, kwargs={
+                key: kwargs[key] for key in pattern.pattern.converters})
+    return paths
+
+
+def fetch(client, path):
+    response = client.get(path)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share / 100 * len(ordered)) - 1, 0)]
+
+
+def measure(client, path, iterations, mode):
+    """Задержки ``iterations`` запросов, а затем отдельным запросом —
+    число SQL-запросов и пик памяти: tracemalloc сильно замедляет код
+    и не должен попадать в задержки.
+    """
+    if mode == 'warm':
+        fetch(client, path)
+    latencies = []
+    for _ in range(iterations):
+        if mode == 'cold':
+            cache.clear()
+        started = time.perf_counter()
+        fetch(client, path)
+        latencies.append((time.perf_counter() - started) * 1000)
+    if mode == 'cold':
+        cache.clear()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            response = fetch(client, path)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'queries': len(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'latency_ms': dict(
+            {f'p{share}': round(percentile(latencies, share), 3)
+             for share in PERCENTILES},
+            mean=round(sum(latencies) / len(latencies), 3)),
+    }
+
+
+def run(user, iterations=20, only=None, skip=(), progress=None):
+    """Замерить все адреса от имени ``user`` в обоих режимах кэша."""
+    results = {}
+    for name, path in url_paths(user, only, skip).items():
+        results[name] = {'path': path}
+        for mode in MODES:
+            # Свой клиент на каждый замер: выход из аккаунта и сброс
+            # пароля меняют сессию.
+            client = Client()
+            client.force_login(user)
+            try:
+                results[name][mode] = measure(
+                    client, path, iterations, mode)
+            except Exception as error:
+                # Тестовый клиент пробрасывает исключения вьюх; такой
+                # адрес отмечается, а замеры идут дальше.
+                results[name][mode] = {'error': repr(error)}
+        if progress is not None:
+            progress(name, results[name])
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform.machine(),
+    }
+
+
+def compare(baseline, current, tolerance=1.25, slack_ms=1.0, slack_kb=64):
+    """Регрессии ``current`` относительно ``baseline``: новая ошибка,
+    любой лишний SQL-запрос, а задержка p95 и пик памяти — сверх допуска.
+    """
+    if baseline.get('data') != current.get('data'):
+        return [
+            f'Замеры на разных данных: {baseline.get("data")} '
+            f'и {current.get("data")}']
+    problems = []
+    for name, result in current['urls'].items():
+        before = baseline['urls'].get(name)
+        if before is None:
+            continue
+        for mode in MODES:
+            problems += [
+                f'{name} ({mode}): {problem}' for problem in compare_result(
+                    before[mode], result[mode], tolerance, slack_ms,
+                    slack_kb)]
+    return problems
+
+
+def compare_result(old, new, tolerance, slack_ms, slack_kb):
+    if 'error' in new:
+        return [] if 'error' in old else [new['error']]
+    if 'error' in old:
+        return []
+    problems = []
+    if new['queries'] > old['queries']:
+        problems.append(
+            f'SQL-запросов {old["queries"]} -> {new["queries"]}')
+    old_p95, new_p95 = old['latency_ms']['p95'], new['latency_ms']['p95']
+    if new_p95 > old_p95 * tolerance + slack_ms:
+        problems.append(f'p95 {old_p95} -> {new_p95} мс')
+    old_kb, new_kb = old['peak_memory_kb'], new['peak_memory_kb']
+    if new_kb > old_kb * tolerance + slack_kb:
+        problems.append(f'пик памяти {old_kb} -> {new_kb} КБ')
+    return problems
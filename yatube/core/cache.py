@@ -0,0 +1,236 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+    'expires REAL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+)
+ALIVE = '(expires IS NULL OR expires > ?)'
+# Время последнего чтения обновляется не чаще раза в секунду на ключ,
+# чтобы чтения не превращались в записи.
+TOUCH_INTERVAL = 1
+# Размер и число записей проверяются раз в столько записей в процессе.
+CULL_EVERY = 64
+# UPDATE ... RETURNING появился в SQLite 3.35.
+RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+
+class SQLiteCache(BaseCache):
+    """Общий для всех процессов на хосте кэш в файле SQLite.
+
+    Файл открывается в режиме WAL, поэтому читатели не ждут писателей,
+    а ``incr`` и ``add`` атомарны между процессами благодаря
+    ``BEGIN IMMEDIATE``. Целые числа хранятся как INTEGER и
+    увеличиваются на стороне SQLite, остальное — в pickle.
+
+    При превышении ``MAX_ENTRIES`` или ``OPTIONS['MAX_BYTES']``
+    удаляются просроченные записи, а затем ``1/CULL_FREQUENCY``
+    давно не читавшихся.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        options = params.get('OPTIONS', {})
+        self.max_bytes = options.get('MAX_BYTES')
+        self.busy_timeout = options.get('BUSY_TIMEOUT', 5000)
+        self.local = threading.local()
+        self.writes = 0
+
+    @property
+    def db(self):
+        """Соединение текущего потока; после fork открывается заново."""
+        pid = os.getpid()
+        if getattr(self.local, 'pid', None) != pid:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, isolation_level=None)
+            db.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout)}')
+            db.execute('PRAGMA journal_mode = WAL')
+            db.execute('PRAGMA synchronous = NORMAL')
+            for statement in SCHEMA:
+                db.execute(statement)
+            self.local.db = db
+            self.local.pid = pid
+        return self.local.db
+
+    def transaction(self):
+        return Transaction(self.db)
+
+    @staticmethod
+    def encode(value):
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.key(key, version)
+        now = time.time()
+        with self.transaction() as db:
+            db.execute(
+                f'DELETE FROM cache WHERE key = ? AND NOT {ALIVE}',
+                (key, now))
+            added = db.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)',
+                (key, self.encode(value),
+                 self.get_backend_timeout(timeout), now),
+            ).rowcount == 1
+        if added:
+            self.wrote()
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self.key(key, version)
+        now = time.time()
+        row = self.db.execute(
+            f'SELECT value, accessed FROM cache WHERE key = ? AND {ALIVE}',
+            (key, now)).fetchone()
+        if row is None:
+            return default
+        if now - row[1] > TOUCH_INTERVAL:
+            self.db.execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return self.decode(row[0])
+
+    def get_many(self, keys, version=None):
+        names = {self.key(key, version): key for key in keys}
+        if not names:
+            return {}
+        placeholders = ', '.join('?' * len(names))
+        rows = self.db.execute(
+            f'SELECT key, value FROM cache '
+            f'WHERE key IN ({placeholders}) AND {ALIVE}',
+            (*names, time.time()))
+        return {names[key]: self.decode(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = [
+            (self.key(key, version), self.encode(value), expires, now)
+            for key, value in data.items()
+        ]
+        with self.transaction() as db:
+            db.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)', rows)
+        self.wrote(len(rows))
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.key(key, version)
+        now = time.time()
+        return self.db.execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+            (self.get_backend_timeout(timeout), key, now),
+        ).rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно изменить число; ValueError, если ключа нет."""
+        name = key
+        key = self.key(key, version)
+        now = time.time()
+        update = (
+            f"UPDATE cache SET value = value + ?, accessed = ? "
+            f"WHERE key = ? AND typeof(value) = 'integer' AND {ALIVE}")
+        params = (delta, now, key, now)
+        if RETURNING:
+            # Один оператор в автокоммите: без отдельной транзакции
+            # и второго чтения.
+            row = self.db.execute(f'{update} RETURNING value', params)
+            row = row.fetchone()
+            if row is not None:
+                return row[0]
+        else:
+            with self.transaction() as db:
+                if db.execute(update, params).rowcount:
+                    return db.execute(
+                        'SELECT value FROM cache WHERE key = ?',
+                        (key,)).fetchone()[0]
+        # Ключа нет или в нём не целое число: ведём себя как BaseCache.
+        return super().incr(name, delta, version)
+
+    def delete(self, key, version=None):
+        self.db.execute(
+            'DELETE FROM cache WHERE key = ?', (self.key(key, version),))
+
+    def delete_many(self, keys, version=None):
+        keys = [(self.key(key, version),) for key in keys]
+        with self.transaction() as db:
+            db.executemany('DELETE FROM cache WHERE key = ?', keys)
+
+    def has_key(self, key, version=None):
+        return self.db.execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            (self.key(key, version), time.time())).fetchone() is not None
+
+    def clear(self):
+        self.db.execute('DELETE FROM cache')
+
+    def wrote(self, count=1):
+        self.writes += count
+        if self.writes >= CULL_EVERY:
+            self.writes = 0
+            self.cull()
+
+    def cull(self):
+        """Освободить место, если кэш вышел за пределы размера."""
+        db = self.db
+        with self.transaction():
+            db.execute(f'DELETE FROM cache WHERE NOT {ALIVE}', (time.time(),))
+            count = db.execute('SELECT count(*) FROM cache').fetchone()[0]
+            if count <= self._max_entries and not self.oversized():
+                return
+            if self._cull_frequency == 0:
+                db.execute('DELETE FROM cache')
+                return
+            db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY accessed LIMIT ?)',
+                (max(count // self._cull_frequency, 1),))
+
+    def oversized(self):
+        if self.max_bytes is None:
+            return False
+        pages, free = (
+            self.db.execute(f'PRAGMA {pragma}').fetchone()[0]
+            for pragma in ('page_count', 'freelist_count'))
+        page_size = self.db.execute('PRAGMA page_size').fetchone()[0]
+        return (pages - free) * page_size > self.max_bytes
+
+
+class Transaction:
+    """``BEGIN IMMEDIATE``: блокировка записи берётся сразу, поэтому
+    чтение и запись внутри блока не перемежаются с другими процессами.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        return self.db
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.db.execute('ROLLBACK' if exc_type else 'COMMIT')
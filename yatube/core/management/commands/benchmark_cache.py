@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import SQLiteCache
+
+BACKENDS = {
+    'locmem': lambda directory, params: LocMemCache('benchmark', params),
+    'file': lambda directory, params: FileBasedCache(
+        os.path.join(directory, 'files'), params),
+    'sqlite': lambda directory, params: SQLiteCache(
+        os.path.join(directory, 'cache.sqlite3'), params),
+}
+
+
+def run_worker(cache, operations, keys, write_ratio, value, seed, results):
+    """Чтение с дозаписью при промахе, как у кэша страниц, и счётчик."""
+    rng = random.Random(seed)
+    hits = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        key = f'key:{rng.randrange(keys)}'
+        if rng.random() < write_ratio:
+            cache.set(key, value)
+        elif cache.get(key) is None:
+            cache.set(key, value)
+        else:
+            hits += 1
+        try:
+            cache.incr('counter')
+        except ValueError:
+            cache.add('counter', 0)
+            cache.incr('counter')
+    results.put((time.perf_counter() - started, hits))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить пропускную способность кэшей locmem, file и sqlite '
+        'при работе из нескольких процессов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--operations', type=int, default=5000)
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--write-ratio', type=float, default=0.1)
+        parser.add_argument('--value-size', type=int, default=2048)
+        parser.add_argument(
+            '--backend', choices=BACKENDS, action='append',
+            help='Какие кэши сравнивать; по умолчанию все')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        value = 'x' * options['value_size']
+        processes = options['processes']
+        operations = options['operations']
+        self.stdout.write(
+            f'{"кэш":8} {"оп/с":>10} {"попадания":>10} {"счётчик":>10}')
+        for name in options['backend'] or BACKENDS:
+            with tempfile.TemporaryDirectory() as directory:
+                # Все ключи помещаются в кэш: сравнивается скорость,
+                # а не политика вытеснения.
+                cache = BACKENDS[name](directory, {
+                    'OPTIONS': {'MAX_ENTRIES': options['keys'] * 2}})
+                cache.clear()
+                results = context.Queue()
+                workers = [
+                    context.Process(target=run_worker, args=(
+                        cache, operations, options['keys'],
+                        options['write_ratio'], value, seed, results))
+                    for seed in range(processes)
+                ]
+                started = time.perf_counter()
+                for worker in workers:
+                    worker.start()
+                measured = [results.get() for _ in workers]
+                for worker in workers:
+                    worker.join()
+                elapsed = time.perf_counter() - started
+                total = processes * operations
+                hits = sum(hits for _, hits in measured)
+                # Для кэша в памяти процесса родитель не видит счётчик
+                # воркеров: каждый считал в своей копии.
+                counter = cache.get('counter') or 0
+                self.stdout.write(
+                    f'{name:8} {total / elapsed:10.0f} '
+                    f'{hits / total:10.1%} {counter:>6}/{total}')
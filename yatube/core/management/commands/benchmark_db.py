@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connections
+
+from posts.models import Post
+
+User = get_user_model()
+
+# Настройки SQLite и Django по умолчанию: журнал отката, отложенный
+# BEGIN и новое соединение на каждый запрос.
+BASELINE = {'pragmas': {'journal_mode': 'delete', 'synchronous': 'full'}}
+
+
+def run_worker(requests, write_ratio, author_id, seed, results):
+    """Запросы как у сайта: чтение первой страницы ленты или новый пост,
+    после каждого соединение закрывается по правилам CONN_MAX_AGE.
+    """
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    for number in range(requests):
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                Post.objects.create(
+                    text=f'Пост {seed}-{number}', author_id=author_id)
+            else:
+                list(Post.objects.select_related('author', 'group')[:10])
+        except OperationalError:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+        close_old_connections()
+    connections.close_all()
+    results.put((latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить пропускную способность SQLite с настройками по умолчанию '
+        'и с настройками из DATABASES при смеси чтений и записей'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--posts', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        database = connections['default'].settings_dict
+        tuned = database['OPTIONS']
+        profiles = {
+            'default': (BASELINE, 0),
+            'wal': ({'pragmas': tuned.get('pragmas', {})}, 0),
+            'tuned': (tuned, database['CONN_MAX_AGE']),
+        }
+        original = (
+            database['NAME'], database['CONN_MAX_AGE'], database['OPTIONS'])
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                template = os.path.join(directory, 'template.sqlite3')
+                author_id = self.prepare(
+                    database, template, options['posts'])
+                self.stdout.write(
+                    f'{"профиль":8} {"запр/с":>8} {"p50, мс":>8} '
+                    f'{"p99, мс":>8} {"ошибки":>7}')
+                for name, (profile, max_age) in profiles.items():
+                    path = os.path.join(directory, f'{name}.sqlite3')
+                    shutil.copy(template, path)
+                    database['NAME'] = path
+                    database['CONN_MAX_AGE'] = max_age
+                    database['OPTIONS'] = profile
+                    self.run(name, author_id, options)
+        finally:
+            connections.close_all()
+            (database['NAME'], database['CONN_MAX_AGE'],
+             database['OPTIONS']) = original
+
+    def prepare(self, database, path, posts):
+        """Схема и стартовые посты во временной базе без WAL-файлов."""
+        connections.close_all()
+        database['NAME'] = path
+        database['OPTIONS'] = BASELINE
+        call_command('migrate', verbosity=0)
+        author = User.objects.create_user(username='benchmark')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=author)
+            for number in range(posts))
+        connections.close_all()
+        return author.pk
+
+    def run(self, name, author_id, options):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [
+            context.Process(target=run_worker, args=(
+                options['requests'], options['write_ratio'],
+                author_id, seed, results))
+            for seed in range(options['processes'])
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        measured = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        latencies = sorted(
+            latency for worker, _ in measured for latency in worker)
+        errors = sum(errors for _, errors in measured)
+
+        def percentile(share):
+            return latencies[int(share * (len(latencies) - 1))] * 1000
+
+        self.stdout.write(
+            f'{name:8} {len(latencies) / elapsed:8.0f} '
+            f'{percentile(0.5):8.1f} {percentile(0.99):8.1f} {errors:7}')
@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+
+from core import metrics
+from core.middleware import MetricsMiddleware
+
+ROUNDS = 20
+
+
+def make_view(queries):
+    """Вьюха без работы: ``queries`` запросов SELECT 1 и ответ 1 КБ."""
+    def view(request):
+        with connection.cursor() as cursor:
+            for _ in range(queries):
+                cursor.execute('SELECT 1')
+        return HttpResponse('x' * 1024)
+    return view
+
+
+def measure(handler, request, count):
+    """Среднее время обработки запроса, в микросекундах."""
+    started = time.perf_counter()
+    for _ in range(count):
+        handler(request)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def overhead(queries, count, rounds=ROUNDS):
+    """Время запроса без слоя метрик и с ним, в микросекундах.
+
+    Замеры чередуются по раундам, и берётся лучший раунд каждого
+    варианта, как в timeit: шум машины только прибавляет время.
+    """
+    url = reverse('posts:index')
+    request = RequestFactory().get(url)
+    request.resolver_match = resolve(url)
+    view = make_view(queries)
+    with override_settings(METRICS_ENABLED=True):
+        middleware = MetricsMiddleware(view)
+    measure(middleware, request, max(count // 10, 1))
+    per_round = max(count // rounds, 1)
+    bare, wrapped = [], []
+    for _ in range(rounds):
+        bare.append(measure(view, request, per_round))
+        wrapped.append(measure(middleware, request, per_round))
+    return min(bare), min(wrapped)
+
+
+class Command(BaseCommand):
+    help = (
+        'Измерить, сколько микросекунд слой метрик добавляет к запросу '
+        'в зависимости от числа SQL-запросов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=10000)
+        parser.add_argument(
+            '--queries', type=int, nargs='+', default=[0, 1, 10])
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"SQL":>4} {"без метрик, мкс":>16} {"с метриками, мкс":>17} '
+            f'{"разница, мкс":>13}')
+        worst = 0.0
+        for queries in options['queries']:
+            bare, wrapped = overhead(queries, options['requests'])
+            worst = max(worst, wrapped - bare)
+            self.stdout.write(
+                f'{queries:4} {bare:16.1f} {wrapped:17.1f} '
+                f'{wrapped - bare:13.1f}')
+        self.stdout.write(
+            f'Бюджет: {metrics.OVERHEAD_BUDGET_US} мкс на запрос')
+        if worst > metrics.OVERHEAD_BUDGET_US:
+            raise CommandError(
+                f'Слой метрик добавляет до {worst:.1f} мкс, бюджет превышен')
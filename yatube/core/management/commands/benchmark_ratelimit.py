@@ -0,0 +1,92 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from core import ratelimit
+from core.cache import SQLiteCache
+
+# Лимиты, при которых каждый запрос идёт одним путём: ведро всегда
+# полное (редкие посты, два incr на ведро), ведро расходуется (один
+# incr) и ведро пустое (отказ: incr, decr и touch).
+PATHS = {
+    'полное': '1000000/s',
+    'расход': '1000000/d',
+    'отказ': '1/d',
+}
+
+
+def make_requests(url, count, clients):
+    factory = RequestFactory()
+    requests = []
+    for number in range(count):
+        request = factory.post(url)
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = (
+            f'session-{number % clients}')
+        request.resolver_match = resolve(url)
+        requests.append(request)
+    return requests
+
+
+def measure(limits, requests):
+    """Среднее время ratelimit.check на запрос, в микросекундах."""
+    started = time.perf_counter()
+    for request in requests:
+        ratelimit.check(limits, request)
+    return (time.perf_counter() - started) / len(requests) * 1e6
+
+
+def measure_paths(cache, requests):
+    """Время проверки по путям; ``мимо`` — URL без лимита."""
+    url_name = requests[0].resolver_match.view_name
+    results = {'мимо': measure({}, requests)}
+    for path, rate in PATHS.items():
+        cache.clear()
+        limits = ratelimit.load_limits(
+            {url_name: {'user': rate, 'ip': rate}}, cache)
+        measure(limits, requests[:100])
+        results[path] = measure(limits, requests)
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Измерить, сколько микросекунд добавляют лимиты запросов '
+        'с кэшем в памяти и с общим кэшем SQLite'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=10000)
+        parser.add_argument('--clients', type=int, default=100)
+
+    def handle(self, *args, **options):
+        requests = make_requests(
+            reverse('posts:post_create'),
+            options['requests'], options['clients'])
+        self.stdout.write(
+            f'{"кэш":8}' + ''.join(
+                f'{path + ", мкс":>14}' for path in ['мимо', *PATHS]))
+        with tempfile.TemporaryDirectory() as directory:
+            backends = {
+                'locmem': LocMemCache('ratelimit', {}),
+                'sqlite': SQLiteCache(
+                    os.path.join(directory, 'cache.sqlite3'), {}),
+            }
+            # sqlite идёт последним: по нему сверяется бюджет.
+            for name, cache in backends.items():
+                results = measure_paths(cache, requests)
+                self.stdout.write(f'{name:8}' + ''.join(
+                    f'{value:14.1f}' for value in results.values()))
+        self.stdout.write(
+            f'Бюджет: {ratelimit.OVERHEAD_BUDGET_US} мкс на запрос')
+        # Бюджет задан для общего кэша: в проде лимиты работают с ним.
+        worst = max(results.values())
+        if worst > ratelimit.OVERHEAD_BUDGET_US:
+            raise CommandError(
+                f'Проверка с общим кэшем занимает до {worst:.1f} мкс, '
+                f'бюджет превышен')
@@ -0,0 +1,149 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core import benchmark
+from posts.importer import deferred_indexes
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполнить отдельную базу данными заданного объёма и замерить '
+        'задержки, SQL-запросы и пик памяти всех адресов сайта'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--authors', type=int,
+            help='По умолчанию один автор на сто постов')
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--comments-per-post', type=float, default=0.5)
+        parser.add_argument(
+            '--skew', type=float, default=3.0,
+            help='Неравномерность авторов и групп; 1 — равномерно')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--database',
+            help='Файл базы SQLite: создаётся и заполняется при первом '
+                 'запуске, потом используется повторно')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--only', nargs='+', default=(),
+            help='Замерить только эти адреса, например posts:index')
+        parser.add_argument('--skip', nargs='+', default=())
+        parser.add_argument('--output', help='Куда записать JSON')
+        parser.add_argument(
+            '--baseline',
+            help='JSON прошлого прогона: регрессии завершают команду '
+                 'с ошибкой')
+        parser.add_argument('--tolerance', type=float, default=1.25)
+
+    def handle(self, *args, **options):
+        data = {
+            'posts': options['posts'],
+            'authors': options['authors'] or max(options['posts'] // 100, 1),
+            'groups': options['groups'],
+            'comments_per_post': options['comments_per_post'],
+            'skew': options['skew'],
+            'seed': options['seed'],
+        }
+        database = connections['default'].settings_dict
+        original = database['NAME']
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = options['database'] or os.path.join(
+                    directory, 'benchmark.sqlite3')
+                data = self.prepare(database, path, data)
+                caches = {'default': {
+                    'BACKEND': 'core.cache.SQLiteCache',
+                    'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+                }}
+                with override_settings(DEBUG=False, CACHES=caches):
+                    report = self.measure(data, options)
+        finally:
+            connections.close_all()
+            database['NAME'] = original
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            self.compare(report, options)
+
+    def prepare(self, database, path, data):
+        """Открыть базу замеров; заполнить её, если она новая.
+
+        Параметры заполнения лежат рядом в ``<база>.json``, и при
+        повторном запуске действуют они, а не аргументы команды.
+        """
+        params_path = path + '.json'
+        connections.close_all()
+        database['NAME'] = path
+        if os.path.exists(params_path):
+            with open(params_path, encoding='utf-8') as file:
+                return json.load(file)
+        call_command('migrate', verbosity=0)
+
+        def progress(kind, count):
+            self.stdout.write(f'Создано {kind}: {count}')
+
+        with deferred_indexes():
+            benchmark.seed(
+                data['posts'], data['authors'], data['groups'],
+                data['comments_per_post'], data['skew'], data['seed'],
+                progress=progress)
+        with open(params_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        return data
+
+    def measure(self, data, options):
+        # Самый активный автор; сотрудник, чтобы открылась и выгрузка.
+        user = User.objects.get(username='author0')
+        user.is_staff = True
+        user.save(update_fields=['is_staff'])
+        self.stdout.write(
+            f'{"адрес":32} {"режим":5} {"код":>4} {"SQL":>4} '
+            f'{"p50, мс":>8} {"p95, мс":>8} {"p99, мс":>8} {"пик, КБ":>8}')
+
+        def progress(name, result):
+            for mode in benchmark.MODES:
+                row = result[mode]
+                if 'error' in row:
+                    self.stdout.write(f'{name:32} {mode:5} {row["error"]}')
+                    continue
+                latency = row['latency_ms']
+                self.stdout.write(
+                    f'{name:32} {mode:5} {row["status"]:4} '
+                    f'{row["queries"]:4} {latency["p50"]:8.2f} '
+                    f'{latency["p95"]:8.2f} {latency["p99"]:8.2f} '
+                    f'{row["peak_memory_kb"]:8.0f}')
+
+        urls = benchmark.run(
+            user, options['iterations'], options['only'], options['skip'],
+            progress)
+        return {
+            'created': timezone.now().isoformat(),
+            'data': data,
+            'environment': benchmark.environment(),
+            'iterations': options['iterations'],
+            'urls': urls,
+        }
+
+    def compare(self, report, options):
+        with open(options['baseline'], encoding='utf-8') as file:
+            baseline = json.load(file)
+        problems = benchmark.compare(baseline, report, options['tolerance'])
+        if problems:
+            raise CommandError(
+                'Регрессии относительно базового прогона:\n'
+                + '\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
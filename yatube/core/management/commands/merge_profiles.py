@@ -0,0 +1,44 @@
+import glob
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiler
+from core.management.commands.slow_queries import parse_since
+
+
+class Command(BaseCommand):
+    help = (
+        'Сложить выборочные профили из PROFILER_DIR в один файл '
+        'свёрнутых стеков для flamegraph.pl или speedscope'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--view', help='Только профили этого адреса, например '
+                           'posts:index')
+        parser.add_argument(
+            '--since', help='Период (30m, 2h, 7d) или дата ISO 8601')
+        parser.add_argument('--output', help='Файл вместо stdout')
+
+    def handle(self, *args, **options):
+        view = options['view'].replace(':', '.') if options['view'] else '*'
+        since = parse_since(options['since']) if options['since'] else 0
+        paths = [
+            path for path in glob.glob(os.path.join(
+                settings.PROFILER_DIR, f'*-*-{view}.folded'))
+            # Имя файла начинается с времени записи в миллисекундах.
+            if int(os.path.basename(path).split('-', 1)[0]) >= since * 1000
+        ]
+        if not paths:
+            raise CommandError('Подходящих профилей нет')
+        folded = ''.join(
+            f'{stack} {count}\n'
+            for stack, count in sorted(profiler.merge(paths).items()))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(folded)
+        else:
+            self.stdout.write(folded, ending='')
+        self.stderr.write(f'Профилей: {len(paths)}')
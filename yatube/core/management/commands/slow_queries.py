@@ -0,0 +1,60 @@
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from core.slow_queries import SlowQueryLog
+
+PERIOD = re.compile(r'^(\d+)([smhd])$')
+UNITS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_since(value):
+    """Отметка времени из '30m', '2h', '7d' или даты ISO 8601."""
+    match = PERIOD.match(value)
+    if match:
+        return time.time() - int(match.group(1)) * UNITS[match.group(2)]
+    moment = parse_datetime(value)
+    if moment is None:
+        raise CommandError(
+            f'Неверное значение --since: {value!r}; нужно, например, '
+            f'30m, 2h, 7d или 2024-05-01T12:00')
+    return moment.timestamp()
+
+
+class Command(BaseCommand):
+    help = (
+        'Самые затратные формы медленных SQL-запросов из журнала '
+        'SLOW_QUERY_LOG'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', default='1d',
+            help='Период (30m, 2h, 7d) или дата ISO 8601')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument(
+            '--plans', action='store_true',
+            help='Показать параметры и план самого долгого запроса')
+
+    def handle(self, *args, **options):
+        log = SlowQueryLog(
+            settings.SLOW_QUERY_LOG, settings.SLOW_QUERY_MS or 0)
+        rows = log.top(parse_since(options['since']), options['limit'])
+        if not rows:
+            self.stdout.write('Медленных запросов нет')
+            return
+        for row in rows:
+            self.stdout.write(
+                f'{row["fingerprint"]}  раз: {row["count"]}  '
+                f'всего: {row["total_ms"]:.1f} мс  '
+                f'макс.: {row["max_ms"]:.1f} мс')
+            self.stdout.write(f'  {row["view"] or "-"}  {row["location"]}')
+            self.stdout.write(f'  {row["shape"]}')
+            if options['plans']:
+                self.stdout.write(f'  Параметры: {row["params"]}')
+                for line in row['plan'].splitlines():
+                    self.stdout.write(f'  | {line}')
+            self.stdout.write('')
@@ -0,0 +1,310 @@
+import bisect
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.backends.django import Template
+
+# Границы гистограммы времени ответа в секундах, как у клиентов
+# Prometheus по умолчанию.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Адрес, не совпавший ни с одним шаблоном URL: так 404 на случайные
+# пути не раздувают число меток.
+UNMATCHED = '<unmatched>'
+# Число занятых когда-либо слотов воркеров: слоты переиспользуются,
+# поэтому оно не больше числа одновременно живших процессов.
+WORKERS_KEY = 'metrics:workers'
+# Слот воркера, который столько секунд не сбрасывал снимок, может
+# занять новый процесс.
+LEASE = 60
+# Сколько микросекунд слой метрик может добавлять к запросу
+# (manage.py benchmark_metrics).
+OVERHEAD_BUDGET_US = 50
+
+
+def worker_key(slot):
+    return f'metrics:worker:{slot}'
+
+
+def lease_key(slot):
+    return f'metrics:lease:{slot}'
+
+
+class ViewStats:
+    """Накопленные показатели одного URL в одном потоке."""
+
+    __slots__ = (
+        'buckets', 'count', 'seconds', 'sql_queries', 'sql_seconds',
+        'template_seconds', 'response_bytes', 'statuses')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def merge(total, views, sign=1):
+    """Прибавить снимок ``views`` ({URL: словарь показателей}) к
+    ``total``; с ``sign=-1`` — вычесть.
+    """
+    for view, stats in views.items():
+        into = total.get(view)
+        if into is None:
+            total[view] = into = ViewStats().as_dict()
+        for name, value in stats.items():
+            if name == 'buckets':
+                into[name] = [a + sign * b for a, b in zip(into[name], value)]
+            elif name == 'statuses':
+                for status, count in value.items():
+                    into[name][status] = (
+                        into[name].get(status, 0) + sign * count)
+            else:
+                into[name] += sign * value
+    return total
+
+
+class RequestMetrics:
+    """Показатели текущего запроса."""
+
+    __slots__ = ('sql_queries', 'sql_seconds', 'template_seconds', 'depth')
+
+    def __init__(self):
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.depth = 0
+
+
+def time_queries(execute, sql, params, many, context):
+    """Обёртка соединения, которая считает SQL текущего запроса.
+
+    Ставится в execute_wrappers соединения один раз, а не на каждый
+    запрос: вне запроса она сразу передаёт вызов дальше.
+    """
+    metrics = getattr(local, 'request', None)
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_seconds += time.perf_counter() - started
+        metrics.sql_queries += 1
+
+
+class Registry:
+    """Счётчики процесса.
+
+    У каждого потока свой словарь, поэтому запись идёт без блокировок;
+    блокировка берётся только при появлении нового потока и при снятии
+    снимка. Снимок процесса раз в ``METRICS_FLUSH_INTERVAL`` секунд
+    кладётся в общий кэш под номером слота воркера, а /metrics
+    суммирует снимки всех слотов.
+
+    Слот занимается на LEASE секунд и продлевается каждым снимком.
+    Слот ушедшего воркера достаётся новому процессу вместе со снимком:
+    тот продолжает счёт с этих значений, поэтому суммы не падают при
+    перезапусках воркеров и число слотов не растёт. Счётчики падают
+    только при очистке или вытеснении кэша, и Prometheus видит это
+    как обычный сброс счётчика.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+        # После fork счётчики родителя не наши.
+        os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        self.local = threading.local()
+        self.threads = []
+        self.slot = None
+        self.token = f'{os.getpid()}:{uuid.uuid4().hex}'
+        # Унаследованный со слотом снимок и свой, отправленный последним.
+        self.base = {}
+        self.sent = {}
+        self.flushed_at = 0.0
+
+    def views(self):
+        views = getattr(self.local, 'views', None)
+        if views is None:
+            views = self.local.views = {}
+            with self.lock:
+                self.threads.append(views)
+        return views
+
+    def record(self, view, status, seconds, request_metrics, size):
+        views = self.views()
+        stats = views.get(view)
+        if stats is None:
+            stats = views[view] = ViewStats()
+        stats.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        stats.count += 1
+        stats.seconds += seconds
+        stats.sql_queries += request_metrics.sql_queries
+        stats.sql_seconds += request_metrics.sql_seconds
+        stats.template_seconds += request_metrics.template_seconds
+        if size is not None:
+            stats.response_bytes += size
+        status = f'{status // 100}xx'
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        return stats
+
+    def snapshot(self):
+        """Сумма по всем потокам процесса."""
+        total = {}
+        with self.lock:
+            threads = list(self.threads)
+        for views in threads:
+            merge(total, {
+                view: stats.as_dict() for view, stats in list(views.items())})
+        return total
+
+    def claim(self):
+        """Занять свободный слот, начиная с младших."""
+        count = cache.get(WORKERS_KEY) or 0
+        for slot in range(1, count + 1):
+            if cache.add(lease_key(slot), self.token, LEASE):
+                return slot
+        cache.add(WORKERS_KEY, 0, None)
+        slot = cache.incr(WORKERS_KEY)
+        cache.set(lease_key(slot), self.token, LEASE)
+        return slot
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        interval = settings.METRICS_FLUSH_INTERVAL
+        if not force and now - self.flushed_at < interval:
+            return
+        self.flushed_at = now
+        own = self.snapshot()
+        if (self.slot is None
+                or cache.get(lease_key(self.slot)) != self.token):
+            # Слот новый или отобран после долгого простоя. В снимке
+            # слота уже может быть отправленное нами раньше: его новый
+            # владелец унаследовал, и второй раз оно не считается.
+            self.slot = self.claim()
+            self.base = merge(
+                cache.get(worker_key(self.slot)) or {}, self.sent, -1)
+        else:
+            cache.touch(lease_key(self.slot), LEASE)
+        cache.set(
+            worker_key(self.slot), merge(merge({}, self.base), own), None)
+        self.sent = own
+
+    def collect(self):
+        """Показатели всех воркеров; свои — свежие, а не из кэша."""
+        self.flush(force=True)
+        count = cache.get(WORKERS_KEY) or 0
+        snapshots = cache.get_many([
+            worker_key(slot) for slot in range(1, count + 1)
+            if slot != self.slot])
+        total = merge(merge({}, self.base), self.snapshot())
+        for views in snapshots.values():
+            merge(total, views)
+        return total
+
+
+registry = Registry()
+local = threading.local()
+
+
+def current():
+    return getattr(local, 'request', None)
+
+
+def instrument_templates():
+    """Засекать время отрисовки шаблонов Django для текущего запроса.
+
+    Вложенные render_to_string (карточки постов, include) уже входят
+    во время внешнего шаблона и отдельно не считаются.
+    """
+    if getattr(Template.render, 'instrumented', False):
+        return
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        metrics = current()
+        if metrics is None or metrics.depth:
+            return original(self, context, request)
+        metrics.depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            metrics.template_seconds += time.perf_counter() - started
+            metrics.depth -= 1
+
+    render.instrumented = True
+    Template.render = render
+
+
+def counted(content, stats):
+    """Досчитать размер потокового ответа, когда он будет отдан."""
+    size = 0
+    for chunk in content:
+        size += len(chunk)
+        yield chunk
+    stats.response_bytes += size
+
+
+def label(value):
+    return (value.replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def exposition(views):
+    """Показатели в текстовом формате Prometheus."""
+    lines = [
+        '# HELP yatube_request_duration_seconds Время ответа по имени URL.',
+        '# TYPE yatube_request_duration_seconds histogram',
+    ]
+    for view, stats in sorted(views.items()):
+        name = label(view)
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ('+Inf',), stats['buckets']):
+            cumulative += count
+            lines.append(
+                f'yatube_request_duration_seconds_bucket'
+                f'{{view="{name}",le="{bound}"}} {cumulative}')
+        lines.append(
+            f'yatube_request_duration_seconds_sum{{view="{name}"}} '
+            f'{stats["seconds"]}')
+        lines.append(
+            f'yatube_request_duration_seconds_count{{view="{name}"}} '
+            f'{stats["count"]}')
+    counters = (
+        ('yatube_responses_total', 'Ответы по имени URL и классу кода.',
+         None),
+        ('yatube_sql_queries_total', 'SQL-запросы по имени URL.',
+         'sql_queries'),
+        ('yatube_sql_duration_seconds_total',
+         'Время SQL-запросов по имени URL.', 'sql_seconds'),
+        ('yatube_template_duration_seconds_total',
+         'Время отрисовки шаблонов по имени URL.', 'template_seconds'),
+        ('yatube_response_bytes_total', 'Размер ответов по имени URL.',
+         'response_bytes'),
+    )
+    for metric, help_text, field in counters:
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+        for view, stats in sorted(views.items()):
+            name = label(view)
+            if field is None:
+                for status, count in sorted(stats['statuses'].items()):
+                    lines.append(
+                        f'{metric}{{view="{name}",status="{status}"}} '
+                        f'{count}')
+            else:
+                lines.append(f'{metric}{{view="{name}"}} {stats[field]}')
+    return '\n'.join(lines) + '\n'
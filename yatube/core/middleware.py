@@ -0,0 +1,139 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.db import connection
+
+from . import metrics, profiler, ratelimit, slow_queries
+from .query_log import recent_queries
+
+
+class MetricsMiddleware:
+    """Время ответа, SQL, шаблоны и размер ответа по имени URL.
+
+    Стоит первым, чтобы время включало все остальные слои.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        metrics.instrument_templates()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        wrappers = connection.execute_wrappers
+        if metrics.time_queries not in wrappers:
+            wrappers.append(metrics.time_queries)
+        request_metrics = metrics.local.request = metrics.RequestMetrics()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.local.request = None
+        match = request.resolver_match
+        stats = metrics.registry.record(
+            match.view_name if match else metrics.UNMATCHED,
+            response.status_code, time.perf_counter() - started,
+            request_metrics,
+            None if response.streaming else len(response.content))
+        if response.streaming:
+            response.streaming_content = metrics.counted(
+                response.streaming_content, stats)
+        metrics.registry.flush()
+        return response
+
+
+class ProfilerMiddleware:
+    """Профиль запроса вместо страницы для сотрудника по параметру
+    PROFILER_PARAM или заголовку PROFILER_HEADER, а также выборочные
+    профили доли PROFILER_SAMPLE_RATE обычных запросов в PROFILER_DIR.
+
+    Стоит после AuthenticationMiddleware; пользователь загружается,
+    только если профиль запрошен, поэтому кэшированные страницы
+    по-прежнему обходятся без запросов к базе.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = 'HTTP_' + settings.PROFILER_HEADER.upper().replace(
+            '-', '_')
+
+    def __call__(self, request):
+        if self.requested(request) and request.user.is_staff:
+            profile = profiler.Profile()
+            response = profile.run(self.get_response, request)
+            return HttpResponse(
+                profile.report(request, response),
+                content_type='text/plain; charset=utf-8')
+        if random.random() < settings.PROFILER_SAMPLE_RATE:
+            with profiler.Sampler(settings.PROFILER_INTERVAL) as sampler:
+                response = self.get_response(request)
+            match = request.resolver_match
+            sampler.save(
+                settings.PROFILER_DIR,
+                match.view_name if match else metrics.UNMATCHED)
+            return response
+        return self.get_response(request)
+
+    def requested(self, request):
+        return (settings.PROFILER_PARAM in request.GET
+                or self.header in request.META)
+
+
+class RecentQueriesMiddleware:
+    """Записывать SQL-запросы в кольцевой буфер, если задан
+    QUERY_LOG_SIZE; иначе Django просто пропускает этот слой.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_LOG_SIZE:
+            raise MiddlewareNotUsed
+        recent_queries.resize(settings.QUERY_LOG_SIZE)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with connection.execute_wrapper(
+                recent_queries.recorder(request.path)):
+            return self.get_response(request)
+
+
+class SlowQueryMiddleware:
+    """Имя вьюхи для журнала медленных запросов (SLOW_QUERY_MS)."""
+
+    def __init__(self, get_response):
+        if settings.SLOW_QUERY_MS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        slow_queries.local.view = request.path
+        try:
+            return self.get_response(request)
+        finally:
+            slow_queries.local.view = None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        slow_queries.local.view = request.resolver_match.view_name
+
+
+class RateLimitMiddleware:
+    """Лимиты RATE_LIMITS на запись для отдельных URL.
+
+    Проверка идёт в process_view, поэтому слой стоит перед
+    CsrfViewMiddleware: отказ 429 отдаётся до разбора формы и без
+    единого запроса к базе.
+    """
+
+    def __init__(self, get_response):
+        if not settings.RATE_LIMITS:
+            raise MiddlewareNotUsed
+        self.limits = ratelimit.load_limits(settings.RATE_LIMITS)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        return ratelimit.check(self.limits, request)
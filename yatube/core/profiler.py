@@ -0,0 +1,218 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.template.base import Template
+
+# Строк в каждом разделе отчёта.
+REPORT_LINES = 40
+SQL_LENGTH = 300
+
+local = threading.local()
+# Имена кадров по объектам кода для свёрнутых стеков.
+frame_names = {}
+
+
+def current():
+    return getattr(local, 'profile', None)
+
+
+def instrument_templates():
+    """Засекать каждую отрисовку шаблона, включая include и
+    render_to_string, пока на потоке идёт профилирование.
+    """
+    if getattr(Template.render, 'profiled', False):
+        return
+    original = Template.render
+
+    def render(self, context):
+        profile = current()
+        if profile is None:
+            return original(self, context)
+        entry = [profile.depth, self.name or '<строка>', 0.0]
+        profile.templates.append(entry)
+        profile.depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            entry[2] = time.perf_counter() - started
+            profile.depth -= 1
+
+    render.profiled = True
+    Template.render = render
+
+
+class Profile:
+    """Профиль одного запроса по требованию сотрудника.
+
+    cProfile, хронология SQL, дерево шаблонов и выделения памяти
+    снимаются за один проход, поэтому время в отчёте завышено
+    накладными расходами tracemalloc и cProfile; важны пропорции.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.templates = []
+        self.depth = 0
+        self.started = self.seconds = 0.0
+        self.stats = self.memory = None
+        self.peak = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (started - self.started, time.perf_counter() - started, sql))
+
+    def run(self, get_response, request):
+        instrument_templates()
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        profiler = cProfile.Profile()
+        local.profile = self
+        self.started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(self):
+                profiler.enable()
+                try:
+                    response = get_response(request)
+                    if response.streaming:
+                        # Потоковый ответ создаётся при чтении.
+                        b''.join(response.streaming_content)
+                finally:
+                    profiler.disable()
+            self.seconds = time.perf_counter() - self.started
+            self.memory = tracemalloc.take_snapshot()
+            self.peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            local.profile = None
+            if not tracing:
+                tracemalloc.stop()
+        self.stats = pstats.Stats(profiler, stream=io.StringIO())
+        return response
+
+    def report(self, request, response):
+        match = request.resolver_match
+        sql_seconds = sum(duration for _, duration, _ in self.queries)
+        lines = [
+            f'{request.method} {request.get_full_path()}',
+            f'Вьюха: {match.view_name if match else "-"}, '
+            f'ответ: {response.status_code}',
+            f'Время: {self.seconds * 1000:.1f} мс, SQL: {len(self.queries)} '
+            f'за {sql_seconds * 1000:.1f} мс, пик памяти: '
+            f'{self.peak / 1024:.0f} КБ',
+            '',
+            '== cProfile, по суммарному времени ==',
+        ]
+        self.stats.sort_stats('cumulative').print_stats(REPORT_LINES)
+        lines.append(self.stats.stream.getvalue().strip())
+        lines += ['', '== SQL: начало, длительность (мс) и запрос ==']
+        lines += [
+            f'{offset * 1000:9.2f} {duration * 1000:8.2f}  '
+            f'{sql[:SQL_LENGTH]}'
+            for offset, duration, sql in self.queries]
+        lines += ['', '== Шаблоны (мс) ==']
+        lines += [
+            f'{seconds * 1000:9.2f}  {"  " * depth}{name}'
+            for depth, name, seconds in self.templates[:REPORT_LINES]]
+        lines += ['', '== Выделения памяти по строкам кода ==']
+        top = self.memory.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        )).statistics('lineno')[:REPORT_LINES]
+        lines += [
+            f'{stat.size / 1024:9.1f} КБ {stat.count:7} блоков  '
+            f'{stat.traceback}' for stat in top]
+        return '\n'.join(lines) + '\n'
+
+
+def frame_name(code):
+    """Имя кадра для свёрнутых стеков: путь внутри проекта или пакета
+    и функция; вычисляется один раз на объект кода.
+    """
+    name = frame_names.get(code)
+    if name is None:
+        path = code.co_filename
+        marker = os.sep + 'site-packages' + os.sep
+        if marker in path:
+            path = path.split(marker, 1)[1]
+        elif path.startswith(settings.BASE_DIR + os.sep):
+            path = os.path.relpath(path, settings.BASE_DIR)
+        name = f'{path}:{code.co_name}'.replace(';', ':')
+        frame_names[code] = name
+    return name
+
+
+class Sampler:
+    """Выборочный профиль: фоновый поток раз в ``interval`` секунд
+    снимает стек потока запроса. Результат — свёрнутые стеки
+    («кадр;кадр;кадр число»), которые складываются между запросами
+    и рисуются flamegraph.pl или speedscope.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.thread_id = threading.get_ident()
+        # Кадры выше вызывающего (сервер, обработчик Django) не нужны.
+        self.root = sys._getframe(1)
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self):
+        return ''.join(
+            f'{stack} {count}\n' for stack, count in self.stacks.items())
+
+    def save(self, directory, view):
+        if not self.stacks:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(
+            directory,
+            f'{int(time.time() * 1000)}-{os.getpid()}-'
+            f'{view.replace(":", ".")}.folded')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.folded())
+        return path
+
+
+def merge(paths):
+    """Сложить свёрнутые стеки нескольких файлов."""
+    stacks = Counter()
+    for path in paths:
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack:
+                    stacks[stack] += int(count)
+    return stacks
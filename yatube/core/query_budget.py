@@ -0,0 +1,73 @@
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def describe(captured):
+    return '\n'.join(
+        f'{number}. {query["sql"]}'
+        for number, query in enumerate(captured.captured_queries, 1))
+
+
+class query_budget(ContextDecorator):
+    """Не больше ``limit`` SQL-запросов в блоке или функции.
+
+    В отличие от assertNumQueries работает и вне тестов, а запас
+    снизу не считается ошибкой: бюджет — верхняя граница.
+    """
+
+    def __init__(self, limit, using=DEFAULT_DB_ALIAS):
+        self.limit = limit
+        self.using = using
+
+    def __enter__(self):
+        self.captured = CaptureQueriesContext(connections[self.using])
+        return self.captured.__enter__()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.captured.__exit__(exc_type, exc, traceback)
+        if exc_type is None and len(self.captured) > self.limit:
+            raise QueryBudgetExceeded(
+                f'{len(self.captured)} SQL-запросов при бюджете '
+                f'{self.limit}:\n{describe(self.captured)}')
+
+
+class QueryBudgetMixin:
+    """Проверки числа запросов для TestCase.
+
+    ``assertQueriesDoNotGrow`` ловит N+1: запрос повторяется на данных
+    разного объёма, и число SQL-запросов должно оставаться прежним.
+    """
+
+    def countQueries(self, func, *args, using=DEFAULT_DB_ALIAS, **kwargs):
+        with CaptureQueriesContext(connections[using]) as captured:
+            func(*args, **kwargs)
+        return captured
+
+    def assertQueryBudget(self, limit, func, *args, **kwargs):
+        with query_budget(limit, kwargs.pop('using', DEFAULT_DB_ALIAS)):
+            return func(*args, **kwargs)
+
+    def assertQueriesDoNotGrow(self, sizes, grow, func, *args, **kwargs):
+        """``grow(size)`` доводит данные до ``size``, затем вызывается
+        ``func``; число запросов на всех размерах должно совпасть.
+        """
+        counts = {}
+        first = None
+        for size in sizes:
+            grow(size)
+            captured = self.countQueries(func, *args, **kwargs)
+            counts[size] = len(captured)
+            if first is None:
+                first = captured
+            elif len(captured) != len(first):
+                self.fail(
+                    f'Число запросов растёт с объёмом данных: {counts}\n'
+                    f'При {sizes[0]}:\n{describe(first)}\n'
+                    f'При {size}:\n{describe(captured)}')
+        return counts
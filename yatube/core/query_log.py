@@ -0,0 +1,45 @@
+import collections
+import threading
+import time
+
+from django.conf import settings
+
+
+class QueryLog:
+    """Кольцевой буфер последних SQL-запросов процесса.
+
+    В отличие от connection.queries при DEBUG, размер буфера
+    ограничен, а текст запроса обрезается, так что память не растёт
+    со временем работы воркера.
+    """
+
+    def __init__(self, size=0):
+        self.entries = collections.deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def resize(self, size):
+        with self.lock:
+            self.entries = collections.deque(self.entries, maxlen=size)
+
+    def recorder(self, path):
+        """Обёртка для connection.execute_wrapper на время запроса."""
+        def record(execute, sql, params, many, context):
+            started = time.monotonic()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.entries.append({
+                    'path': path,
+                    'sql': sql[:settings.QUERY_LOG_SQL_LENGTH],
+                    'many': many,
+                    'time': round((time.monotonic() - started) * 1000, 3),
+                    'at': time.time(),
+                })
+        return record
+
+    def recent(self):
+        with self.lock:
+            return list(self.entries)
+
+
+recent_queries = QueryLog()
@@ -0,0 +1,53 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def explain(sql, params=()):
+    """План запроса SQLite: список строк из EXPLAIN QUERY PLAN."""
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(plan, allowed_tables=()):
+    """Шаги плана с полным сканом таблицы или сортировкой во временном
+    B-дереве. Скан по индексу и по виртуальной таблице допустим.
+    """
+    problems = []
+    for detail in plan:
+        if TEMP_SORT in detail:
+            problems.append(detail)
+            continue
+        scan = FULL_SCAN.match(detail)
+        if (scan and ' USING ' not in detail
+                and scan.group('table') not in allowed_tables
+                and 'VIRTUAL TABLE' not in detail):
+            problems.append(detail)
+    return problems
+
+
+class QueryPlanMixin:
+    """Проверка, что все SELECT-запросы в блоке идут по индексам.
+
+    ``allowed_tables`` перечисляет маленькие справочники, которые
+    читаются целиком намеренно, например группы для выпадающего списка.
+    """
+
+    def assertIndexedQueries(self, func, *args, allowed_tables=(),
+                             **kwargs):
+        with CaptureQueriesContext(connection) as captured:
+            result = func(*args, **kwargs)
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            problems = plan_problems(explain(sql), allowed_tables)
+            self.assertFalse(
+                problems,
+                f'Запрос без индекса: {sql}\nПлан: {problems}')
+        return result
@@ -0,0 +1,136 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+# Токены считаются в тысячных долях, чтобы скорость вроде 10/m
+# оставалась целым числом для incr.
+SCALE = 1000
+SCOPES = ('user', 'ip')
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+# Сколько микросекунд проверка может добавлять к запросу на запись
+# с общим кэшем SQLite (manage.py benchmark_ratelimit).
+OVERHEAD_BUDGET_US = 300
+
+
+def parse_rate(rate):
+    """``'30/h'`` -> (30, 3600): ёмкость ведра и время его наполнения."""
+    try:
+        count, period = rate.split('/')
+        return int(count), PERIODS[period]
+    except (KeyError, ValueError):
+        raise ImproperlyConfigured(
+            f'Лимит {rate!r} должен иметь вид <число>/<s|m|h|d>')
+
+
+class Bucket:
+    """Ведро токенов на одном атомарном счётчике в кэше.
+
+    В счётчике хранится отметка времени в единицах токенов: запрос
+    сдвигает её на один токен вперёд и проходит, если отметка не
+    обогнала текущее время. Полное ведро — отметка на ``capacity``
+    позади текущего времени, поэтому каждый запрос обходится одним
+    ``incr`` без чтения и записи состояния по отдельности.
+    """
+
+    def __init__(self, rate, cache=cache):
+        self.cache = cache
+        count, period = parse_rate(rate)
+        self.capacity = count * SCALE
+        self.per_second = count * SCALE / period
+        # Простоявшее столько ведро всё равно полное, а отказ продлевает
+        # ключ, чтобы настойчивый клиент не получал полное ведро заново.
+        self.timeout = max(math.ceil(2 * period), 60)
+
+    def take(self, key):
+        """Взять токен; 0, если можно, иначе сколько секунд ждать."""
+        now = int(time.time() * self.per_second)
+        try:
+            mark = self.cache.incr(key, SCALE)
+        except ValueError:
+            self.cache.add(key, now - self.capacity, self.timeout)
+            mark = self.cache.incr(key, SCALE)
+        if mark > now:
+            self.cache.decr(key, SCALE)
+            self.cache.touch(key, self.timeout)
+            return (mark - now) / self.per_second
+        floor = now - self.capacity + SCALE
+        if mark < floor:
+            # Ведро простаивало: токены сверх ёмкости не копятся.
+            self.cache.incr(key, floor - mark)
+        return 0
+
+
+def client_ip(request):
+    """IP клиента с учётом доверенных прокси из TRUSTED_PROXIES.
+
+    Заголовок CLIENT_IP_HEADER читается справа налево до первого
+    адреса, который не принадлежит доверенному прокси: адреса левее
+    него мог подставить сам клиент.
+    """
+    address = request.META.get('REMOTE_ADDR')
+    if address not in settings.TRUSTED_PROXIES:
+        return address
+    forwarded = request.META.get(settings.CLIENT_IP_HEADER, '')
+    for hop in reversed(forwarded.split(',')):
+        hop = hop.strip()
+        if not hop:
+            continue
+        address = hop
+        if hop not in settings.TRUSTED_PROXIES:
+            break
+    return address
+
+
+def client_id(request, scope):
+    """Кого ограничивать, не читая ни сессию, ни базу.
+
+    Пользователь узнаётся по cookie сессии, чей хеш и становится
+    ключом; без cookie ограничение по пользователю не действует.
+    """
+    if scope == 'ip':
+        return client_ip(request)
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not session:
+        return None
+    return hashlib.blake2b(session.encode(), digest_size=12).hexdigest()
+
+
+def load_limits(config, cache=cache):
+    """RATE_LIMITS -> {имя URL: [(область, ведро), ...]}."""
+    limits = {}
+    for view_name, scopes in config.items():
+        for scope in scopes:
+            if scope not in SCOPES:
+                raise ImproperlyConfigured(
+                    f'Неизвестная область лимита {scope!r} для {view_name}')
+        limits[view_name] = [
+            (scope, Bucket(rate, cache)) for scope, rate in scopes.items()]
+    return limits
+
+
+def check(limits, request):
+    """Ответ 429, если запрос превышает лимит своего URL, иначе None."""
+    if request.method in SAFE_METHODS:
+        return None
+    view_name = request.resolver_match.view_name
+    buckets = limits.get(view_name)
+    if buckets is None:
+        return None
+    for scope, bucket in buckets:
+        client = client_id(request, scope)
+        if client is None:
+            continue
+        wait = bucket.take(f'ratelimit:{view_name}:{scope}:{client}')
+        if wait:
+            response = HttpResponse(
+                'Слишком много запросов, попробуйте позже',
+                status=429, content_type='text/plain; charset=utf-8')
+            response['Retry-After'] = str(math.ceil(wait))
+            return response
+    return None
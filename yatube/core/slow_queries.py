@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+from core import metrics
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS slow_query ('
+    'id INTEGER PRIMARY KEY, fingerprint TEXT NOT NULL, '
+    'shape TEXT NOT NULL, sql TEXT NOT NULL, params TEXT NOT NULL, '
+    'view TEXT NOT NULL, location TEXT NOT NULL, plan TEXT NOT NULL, '
+    'duration REAL NOT NULL, at REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS slow_query_at ON slow_query (at)',
+)
+# Записи старше этого срока удаляются раз в PRUNE_EVERY записей.
+RETENTION = 7 * 24 * 60 * 60
+PRUNE_EVERY = 100
+PARAMS_LENGTH = 500
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+# IN (%s, %s, ...) любой длины — одна форма запроса.
+IN_LIST = re.compile(r'\bIN \((?:\s*\?\s*,)*\s*\?\s*\)', re.IGNORECASE)
+SPACES = re.compile(r'\s+')
+EXPLAINABLE = ('SELECT', 'WITH')
+
+local = threading.local()
+logger = logging.getLogger(__name__)
+
+
+def shape(sql):
+    """Текст запроса без значений: одинаковые по форме запросы с
+    разными параметрами и длиной IN-списков совпадают.
+    """
+    sql = STRING.sub('?', sql.replace('%s', '?'))
+    sql = NUMBER.sub('?', sql)
+    sql = IN_LIST.sub('IN (...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(shaped):
+    return hashlib.md5(shaped.encode()).hexdigest()[:16]
+
+
+# Модули постоянных обёрток соединения: их кадры бывают в стеке над
+# журналом, но местом вызова не считаются.
+WRAPPERS = {__file__, metrics.__file__}
+
+
+def location():
+    """Ближайший к запросу вызов из кода проекта, а не Django и не
+    обёрток соединения.
+    """
+    root = settings.BASE_DIR + os.sep
+    frame = sys._getframe(2)
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if (path.startswith(root) and path not in WRAPPERS
+                and os.sep + 'site-packages' + os.sep not in path):
+            return (f'{os.path.relpath(path, settings.BASE_DIR)}:'
+                    f'{frame.f_lineno} in {frame.f_code.co_name}')
+        frame = frame.f_back
+    return ''
+
+
+def explain(connection, sql, params):
+    """EXPLAIN QUERY PLAN на курсоре без execute_wrapper'ов, чтобы
+    запрос плана не попал в журнал сам.
+    """
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return []
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+    except Exception as error:
+        return [f'План не получен: {error!r}']
+    finally:
+        cursor.close()
+
+
+class SlowQueryLog:
+    """Журнал SQL-запросов дольше SLOW_QUERY_MS в отдельном файле SQLite.
+
+    Объект — обёртка для execute_wrapper; бэкенд core.backends.sqlite3
+    подключает его ко всем соединениям, поэтому медленные запросы
+    фоновых задач и команд тоже попадают в журнал. Время считается
+    только для выполнения, план и место вызова — лишь для медленных.
+    """
+
+    def __init__(self, path, threshold_ms):
+        self.path = path
+        self.threshold = threshold_ms / 1000
+        self.local = threading.local()
+        self.writes = 0
+
+    @property
+    def db(self):
+        """Соединение текущего потока; после fork открывается заново."""
+        pid = os.getpid()
+        if getattr(self.local, 'pid', None) != pid:
+            db = sqlite3.connect(self.path, isolation_level=None)
+            db.execute('PRAGMA busy_timeout = 5000')
+            db.execute('PRAGMA journal_mode = WAL')
+            for statement in SCHEMA:
+                db.execute(statement)
+            self.local.db = db
+            self.local.pid = pid
+        return self.local.db
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if duration >= self.threshold:
+                # Журнал не должен менять ни результат запроса, ни его
+                # исключение: занятый файл или полный диск только в лог.
+                try:
+                    self.record(sql, params, many, context, duration)
+                except Exception:
+                    logger.exception('Медленный запрос не записан')
+
+    def record(self, sql, params, many, context, duration):
+        shaped = shape(sql)
+        plan = [] if many else explain(context['connection'], sql, params)
+        if many:
+            # Набор строк executemany к этому моменту уже прочитан.
+            params = {'executemany': len(params) if isinstance(
+                params, (list, tuple)) else None}
+        self.db.execute(
+            'INSERT INTO slow_query (fingerprint, shape, sql, params, view, '
+            'location, plan, duration, at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (fingerprint(shaped), shaped, sql,
+             json.dumps(params, default=str,
+                        ensure_ascii=False)[:PARAMS_LENGTH],
+             getattr(local, 'view', None) or '', location(),
+             '\n'.join(plan), duration * 1000, time.time()))
+        self.writes += 1
+        if self.writes >= PRUNE_EVERY:
+            self.writes = 0
+            self.db.execute(
+                'DELETE FROM slow_query WHERE at < ?',
+                (time.time() - RETENTION,))
+
+    def top(self, since=0, limit=20):
+        """Самые затратные по суммарному времени формы запросов.
+
+        У каждой формы — число и время повторов, а также вьюха, место
+        вызова, параметры и план самого долгого из них.
+        """
+        rows = self.db.execute(
+            'SELECT fingerprint, shape, count(*), sum(duration), '
+            'max(duration), view, location, params, plan '
+            'FROM slow_query WHERE at >= ? GROUP BY fingerprint '
+            'ORDER BY sum(duration) DESC LIMIT ?', (since, limit))
+        fields = (
+            'fingerprint', 'shape', 'count', 'total_ms', 'max_ms', 'view',
+            'location', 'params', 'plan')
+        # max() в SQLite берёт остальные столбцы из строки с максимумом.
+        return [dict(zip(fields, row)) for row in rows]
@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def commit_callbacks(using=DEFAULT_DB_ALIAS, execute=True):
+    """Выполнить колбэки transaction.on_commit, добавленные в блоке.
+
+    В TestCase транзакция теста не фиксируется, и отложенные до COMMIT
+    действия сами не срабатывают. Это замена captureOnCommitCallbacks
+    из Django 3.2; колбэки, добавленные другими колбэками, тоже
+    выполняются. Возвращает список выполненных функций.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    callbacks = []
+    try:
+        yield callbacks
+    finally:
+        while execute:
+            added = connection.run_on_commit[start:]
+            if not added:
+                break
+            start += len(added)
+            for _, callback in added:
+                callbacks.append(callback)
+                callback()
@@ -0,0 +1,67 @@
+import copy
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core import benchmark
+from posts.models import AuthorStats, Comment, Post
+
+User = get_user_model()
+
+
+class BenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        benchmark.seed(
+            posts=300, authors=20, groups=5, comments_per_post=1,
+            batch_size=100)
+        cls.user = User.objects.get(username='author0')
+        cls.user.is_staff = True
+        cls.user.save()
+
+    def test_seed_is_skewed(self):
+        """Первые авторы пишут намного больше последних, счётчики верны."""
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 300)
+        per_author = Counter(
+            Post.objects.values_list('author__username', flat=True))
+        self.assertGreater(per_author['author0'], 5 * per_author['author19'])
+        post = Post.objects.filter(comment_count__gt=0).first()
+        self.assertEqual(post.comment_count, post.comments.count())
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).post_count,
+            per_author['author0'])
+
+    def test_every_url_is_measured(self):
+        """Замеры есть для всех адресов posts, users и about."""
+        results = benchmark.run(self.user, iterations=2)
+        self.assertIn('posts:index', results)
+        self.assertIn('users:login', results)
+        self.assertIn('about:tech', results)
+        index = results['posts:index']
+        self.assertEqual(index['path'], '/')
+        for mode in benchmark.MODES:
+            self.assertEqual(index[mode]['status'], 200)
+            self.assertEqual(
+                set(index[mode]['latency_ms']), {'p50', 'p95', 'p99', 'mean'})
+            self.assertGreater(index[mode]['peak_memory_kb'], 0)
+        # Повторный запрос ленты берётся из кэша.
+        self.assertLess(
+            index['warm']['queries'], index['cold']['queries'])
+
+    def test_compare_reports_regressions(self):
+        """Лишний SQL-запрос и рост p95 сверх допуска — регрессии."""
+        report = {'data': {'posts': 300}, 'urls': benchmark.run(
+            self.user, iterations=2, only={'posts:index'})}
+        self.assertEqual(benchmark.compare(report, report), [])
+        slower = copy.deepcopy(report)
+        cold = slower['urls']['posts:index']['cold']
+        cold['queries'] += 1
+        cold['latency_ms']['p95'] = cold['latency_ms']['p95'] * 2 + 10
+        problems = benchmark.compare(report, slower)
+        self.assertEqual(len(problems), 2)
+        self.assertIn('SQL-запросов', problems[0])
+        other = dict(report, data={'posts': 1000})
+        self.assertIn('разных данных', benchmark.compare(report, other)[0])
@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+def increment(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_values_round_trip(self):
+        """Числа, строки и объекты читаются такими же, какими записаны."""
+        values = {'int': 42, 'bool': True, 'text': 'пост',
+                  'list': [1, 'два'], 'big': 2 ** 70}
+        self.cache.set_many(values)
+        self.assertEqual(self.cache.get_many(list(values) + ['none']),
+                         values)
+        self.assertIs(self.cache.get('bool'), True)
+        self.cache.delete('text')
+        self.assertFalse(self.cache.has_key('text'))
+
+    def test_expired_values_are_missing(self):
+        """Просроченная запись не читается и может быть добавлена."""
+        self.cache.set('key', 'old', timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'newer'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_incr(self):
+        """incr меняет число и падает на отсутствующем ключе."""
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_is_atomic_across_processes(self):
+        """Одновременные incr из разных процессов не теряются."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=increment, args=(self.path, 50))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_least_recently_used_are_culled(self):
+        """При переполнении вытесняются давно не читавшиеся записи."""
+        cache = SQLiteCache(self.path, {
+            'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}})
+        for number in range(12):
+            cache.set(f'key:{number}', number)
+            cache.db.execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                (number + 1, cache.make_key(f'key:{number}')))
+        self.assertEqual(cache.get('key:0'), 0)
+        cache.cull()
+        self.assertTrue(cache.has_key('key:0'))
+        self.assertFalse(cache.has_key('key:1'))
+        self.assertTrue(cache.has_key('key:11'))
+
+    def test_size_limit(self):
+        """Кэш больше MAX_BYTES ужимается, даже если записей немного."""
+        cache = SQLiteCache(self.path, {'OPTIONS': {'MAX_BYTES': 64 * 1024}})
+        cache.set_many({f'key:{number}': 'x' * 10000 for number in range(20)})
+        self.assertTrue(cache.oversized())
+        cache.cull()
+        self.assertLess(len(cache.get_many(
+            [f'key:{number}' for number in range(20)])), 20)
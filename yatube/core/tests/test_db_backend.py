@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.backends.sqlite3.base import DatabaseWrapper
+
+
+class SQLiteBackendTest(TransactionTestCase):
+    def pragma(self, db, name):
+        with db.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        """Каждое соединение открывается с настройками из OPTIONS."""
+        with tempfile.TemporaryDirectory() as directory:
+            db = DatabaseWrapper({
+                **connection.settings_dict,
+                'NAME': os.path.join(directory, 'db.sqlite3'),
+            })
+            try:
+                self.assertEqual(self.pragma(db, 'journal_mode'), 'wal')
+                self.assertEqual(self.pragma(db, 'synchronous'), 1)
+                self.assertEqual(self.pragma(db, 'busy_timeout'), 5000)
+            finally:
+                db.close()
+
+    def test_transactions_take_write_lock_immediately(self):
+        """transaction.atomic начинается с BEGIN IMMEDIATE."""
+        with CaptureQueriesContext(connection) as captured:
+            with transaction.atomic():
+                pass
+        self.assertEqual(captured.captured_queries[0]['sql'],
+                         'BEGIN IMMEDIATE')
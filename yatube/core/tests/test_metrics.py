@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+User = get_user_model()
+
+
+@override_settings(METRICS_ENABLED=True)
+class MetricsMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def test_records_view(self):
+        """Запрос учитывается под именем URL со всеми показателями."""
+        response = self.client.get(reverse('posts:index'))
+        stats = metrics.registry.snapshot()['posts:index']
+        self.assertEqual(stats['count'], 1)
+        self.assertEqual(sum(stats['buckets']), 1)
+        self.assertGreater(stats['sql_queries'], 0)
+        self.assertGreater(stats['template_seconds'], 0)
+        self.assertLess(stats['template_seconds'], stats['seconds'])
+        self.assertEqual(stats['response_bytes'], len(response.content))
+        self.assertEqual(stats['statuses'], {'2xx': 1})
+
+    def test_unmatched_path(self):
+        """Случайные адреса собираются под одной меткой."""
+        self.client.get('/no/such/page/')
+        self.client.get('/another/missing/')
+        stats = metrics.registry.snapshot()
+        self.assertEqual(stats[metrics.UNMATCHED]['statuses'], {'4xx': 2})
+
+    def test_endpoint_merges_workers(self):
+        """/metrics суммирует снимки других воркеров со своими."""
+        self.client.get(reverse('posts:index'))
+        other = metrics.ViewStats()
+        other.count = 2
+        other.buckets[0] = 2
+        other.statuses = {'5xx': 2}
+        cache.add(metrics.WORKERS_KEY, 0, None)
+        slot = cache.incr(metrics.WORKERS_KEY)
+        cache.set(metrics.worker_key(slot), {'posts:index': other.as_dict()})
+        response = self.client.get(reverse('metrics'))
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 3',
+            body)
+        self.assertIn(
+            'yatube_responses_total{view="posts:index",status="5xx"} 2', body)
+
+    def test_only_staff_can_read_metrics(self):
+        response = Client().get(reverse('metrics'))
+        self.assertEqual(response.status_code, 302)
+
+
+class WorkerSlotsTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def worker(self, requests):
+        registry = metrics.Registry()
+        for _ in range(requests):
+            registry.record(
+                'posts:index', 200, 0.01, metrics.RequestMetrics(), 10)
+        registry.flush(force=True)
+        return registry
+
+    def count(self, registry):
+        return registry.collect()['posts:index']['count']
+
+    def test_restarted_worker_reuses_slot(self):
+        """Новый процесс занимает слот ушедшего и продолжает его счёт."""
+        dead = self.worker(3)
+        cache.delete(metrics.lease_key(dead.slot))
+        alive = self.worker(2)
+        self.assertEqual(alive.slot, dead.slot)
+        self.assertEqual(cache.get(metrics.WORKERS_KEY), 1)
+        self.assertEqual(self.count(alive), 5)
+
+    def test_idle_worker_is_not_counted_twice(self):
+        """Воркер, у которого отобрали слот, переходит в другой без
+        повторного учёта уже отправленного.
+        """
+        idle = self.worker(3)
+        cache.delete(metrics.lease_key(idle.slot))
+        other = self.worker(2)
+        idle.record('posts:index', 200, 0.01, metrics.RequestMetrics(), 10)
+        idle.flush(force=True)
+        self.assertNotEqual(idle.slot, other.slot)
+        self.assertEqual(self.count(idle), 6)
+        self.assertEqual(self.count(other), 6)
+
+
+class ExpositionTest(SimpleTestCase):
+    def test_histogram_is_cumulative(self):
+        stats = metrics.ViewStats()
+        stats.buckets[0] = 1
+        stats.buckets[-1] = 2
+        stats.count = 3
+        body = metrics.exposition({'a"b': stats.as_dict()})
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket{view="a\\"b",le="0.01"} 1',
+            body)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket{view="a\\"b",le="+Inf"} 3',
+            body)
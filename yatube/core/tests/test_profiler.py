@@ -0,0 +1,88 @@
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import profiler
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+def wait():
+    time.sleep(0.01)
+
+
+class ProfilerMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ответ')
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def test_staff_gets_report(self):
+        """Вместо страницы — cProfile, SQL, шаблоны и память."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        response = self.client_for(self.staff).get(url, {'_profile': ''})
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        report = response.content.decode()
+        self.assertIn('Вьюха: posts:post_detail, ответ: 200', report)
+        self.assertIn('cumulative', report)
+        self.assertIn('SELECT "posts_comment"', report)
+        self.assertIn('posts/post_detail.html', report)
+        self.assertIn('  includes/comment.html', report)
+        self.assertIn('КБ', report.split('== Выделения памяти')[1])
+
+    def test_header_and_streaming(self):
+        response = self.client_for(self.staff).get(
+            reverse('posts:export'), HTTP_X_PROFILE='1')
+        self.assertIn('Вьюха: posts:export', response.content.decode())
+
+    def test_others_get_page(self):
+        """Обычным пользователям параметр ничего не даёт."""
+        url = reverse('posts:index')
+        for client in (Client(), self.client_for(self.user)):
+            response = client.get(url, {'_profile': ''})
+            self.assertIn('page_obj', response.context)
+
+    def test_sampled_profiles(self):
+        """Выборочные профили пишутся и складываются в один файл."""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(PROFILER_DIR=directory):
+                for _ in range(2):
+                    with profiler.Sampler(0.0005) as sampler:
+                        wait()
+                    sampler.save(directory, 'posts:index')
+                out = StringIO()
+                call_command(
+                    'merge_profiles', '--view', 'posts:index', '--since',
+                    '1h', stdout=out, stderr=StringIO())
+            self.assertEqual(len(os.listdir(directory)), 2)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        stack, count = lines[0].rsplit(' ', 1)
+        # Кадры выше вызвавшего Sampler в стек не входят.
+        self.assertEqual(stack, 'core/tests/test_profiler.py:wait')
+        self.assertGreater(int(count), 2)
+
+    @override_settings(PROFILER_SAMPLE_RATE=1, PROFILER_INTERVAL=0.0005)
+    def test_requests_are_sampled(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(PROFILER_DIR=directory):
+                self.client_for(self.user).get(
+                    reverse('posts:profile', args=['user']))
+            names = os.listdir(directory)
+        self.assertTrue(names)
+        self.assertTrue(names[0].endswith('-posts.profile.folded'))
@@ -0,0 +1,134 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase
+
+from core import benchmark
+from core.query_budget import (QueryBudgetExceeded, QueryBudgetMixin,
+                               query_budget)
+from posts.models import Comment, Group, Post
+from yatube.settings import AMOUNT_COMMENTS, AMOUNT_POSTS
+
+User = get_user_model()
+
+# Больше SQL-запросов на холодном кэше адрес делать не должен. Новый
+# адрес без строки здесь роняет тест: бюджет задаётся вместе с вьюхой.
+# Сессия и пользователь — два запроса на любой странице.
+BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 5,
+    'posts:profile': 5,
+    'posts:add_comment': 3,
+    'posts:post_comments': 1,
+    'posts:post_edit': 5,
+    'posts:post_detail': 5,
+    'posts:post_create': 3,
+    'posts:search': 2,
+    'posts:export': 8,
+    'users:signup': 2,
+    'users:logout': 4,
+    'users:login': 2,
+    'users:password_reset_form': 2,
+    'users:password_reset_done': 2,
+    'users:password_change_done': 2,
+    'users:password_reset_confirm': 5,
+    'users:password_reset_complete': 2,
+    'about:author': 2,
+    'about:tech': 2,
+}
+# Объёмы данных: посты в лентах и комментарии под постом. Внутри
+# страницы растёт число строк на ней, за её пределами — число страниц;
+# на границе добавляется подсчёт, поэтому сравниваются только объёмы
+# по одну сторону от неё.
+PAGE = max(AMOUNT_POSTS, AMOUNT_COMMENTS)
+SIZES = ((1, AMOUNT_POSTS // 2), (PAGE + 5, 2 * PAGE + 5))
+# Адреса, которые сейчас падают, а не отвечают.
+BROKEN = {
+    # UpdateView без queryset и get_object: ImproperlyConfigured.
+    'users:password_change',
+}
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    def test_budget_exceeded(self):
+        """Превышение бюджета перечисляет все запросы блока."""
+        with self.assertRaisesMessage(
+                QueryBudgetExceeded, '2 SQL-запросов при бюджете 1'):
+            with query_budget(1):
+                User.objects.count()
+                Post.objects.count()
+        with query_budget(1):
+            User.objects.count()
+
+    def test_decorator(self):
+        @query_budget(0)
+        def count():
+            return User.objects.count()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            count()
+
+    def test_growing_queries_are_caught(self):
+        """Запрос на каждый пост — ошибка, даже если он в бюджете."""
+        user = User.objects.create_user(username='grower')
+
+        def grow(size):
+            while user.posts.count() < size:
+                Post.objects.create(text='Пост', author=user)
+
+        def per_post():
+            for post in Post.objects.all():
+                post.author.username
+
+        with self.assertRaisesMessage(
+                AssertionError, 'растёт с объёмом данных'):
+            self.assertQueriesDoNotGrow((1, 3), grow, per_post)
+
+
+class UrlBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='budget', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='budget', description='Описание')
+
+    def grow(self, name, size):
+        """Довести до ``size`` посты автора и других авторов в группе и
+        комментарии под последним постом автора; открыть сессию.
+        """
+        for number in range(self.user.posts.count(), size):
+            Post.objects.create(
+                text=f'Пост {number}', author=self.user, group=self.group)
+            Post.objects.create(
+                text=f'Чужой пост {number}', group=self.group,
+                author=User.objects.create_user(username=f'writer{number}'))
+        post = self.user.posts.latest('pub_date')
+        for number in range(post.comments.count(), size):
+            Comment.objects.create(
+                post=post, text=f'Комментарий {number}',
+                author=User.objects.create_user(
+                    username=f'reader{post.pk}-{number}'))
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.path = benchmark.url_paths(self.user, only={name})[name]
+
+    def fetch(self):
+        return benchmark.fetch(self.client, self.path)
+
+    def test_every_url_has_budget(self):
+        paths = benchmark.url_paths(self.user, skip=BROKEN)
+        self.assertEqual(set(paths) - set(BUDGETS), set())
+
+    def test_urls_within_budget(self):
+        """Число запросов не зависит от объёма данных и в бюджете."""
+        for name, budget in BUDGETS.items():
+            with self.subTest(url=name), transaction.atomic():
+                for sizes in SIZES:
+                    counts = self.assertQueriesDoNotGrow(
+                        sizes, partial(self.grow, name), self.fetch)
+                    self.assertLessEqual(max(counts.values()), budget)
+                transaction.set_rollback(True)
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.query_log import recent_queries
+
+User = get_user_model()
+
+
+class RecentQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.staff)
+
+    def test_disabled_by_default(self):
+        """Без QUERY_LOG_SIZE запросы не записываются."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('recent_queries'))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(QUERY_LOG_SIZE=5)
+    def test_buffer_is_bounded(self):
+        """Буфер хранит только последние QUERY_LOG_SIZE запросов."""
+        for _ in range(3):
+            self.client.get(reverse('posts:profile', args=['staff']))
+        entries = self.client.get(
+            reverse('recent_queries')).json()['queries']
+        self.assertEqual(len(entries), 5)
+        self.assertEqual(len(recent_queries.recent()), 5)
+        self.assertTrue(all(entry['sql'] for entry in entries))
+        self.assertIn('/profile/staff/', {entry['path'] for entry in entries})
+
+    @override_settings(QUERY_LOG_SIZE=5)
+    def test_only_staff_can_read_queries(self):
+        """Буфер виден только сотрудникам."""
+        response = Client().get(reverse('recent_queries'))
+        self.assertEqual(response.status_code, 302)
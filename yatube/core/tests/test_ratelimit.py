@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core import ratelimit
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(RATE_LIMITS={
+    'posts:add_comment': {'user': '2/m', 'ip': '3/m'},
+    'posts:post_create': {'user': '1/m'},
+})
+class RateLimitMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='chatty')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:add_comment', args=[self.post.pk])
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def comment(self, client):
+        return client.post(self.url, {'text': 'Комментарий'})
+
+    def test_user_limit(self):
+        """Лишний запрос получает 429 без единого запроса к базе."""
+        client = self.client_for(self.user)
+        for _ in range(2):
+            self.assertEqual(self.comment(client).status_code, 302)
+        with self.assertNumQueries(0):
+            response = self.comment(client)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(self.post.comments.count(), 2)
+
+    def test_ip_limit_covers_all_sessions(self):
+        """Лимит по IP общий для всех сессий с одного адреса."""
+        statuses = [
+            self.comment(self.client_for(self.user)).status_code
+            for _ in range(4)
+        ]
+        self.assertEqual(statuses, [302, 302, 302, 429])
+
+    @override_settings(TRUSTED_PROXIES=['127.0.0.1'])
+    def test_ip_limit_behind_proxy(self):
+        """За доверенным прокси клиенты различаются по X-Forwarded-For,
+        а подставленные клиентом адреса не учитываются.
+        """
+        def comment_from(forwarded):
+            return self.client_for(self.user).post(
+                self.url, {'text': 'Комментарий'},
+                HTTP_X_FORWARDED_FOR=forwarded).status_code
+
+        statuses = [
+            comment_from(f'10.0.0.{i}, 192.0.2.1') for i in range(4)]
+        self.assertEqual(statuses, [302, 302, 302, 429])
+        self.assertEqual(comment_from('192.0.2.2'), 302)
+
+    def test_reading_is_not_limited(self):
+        """GET формы и чужие URL лимиты не расходуют."""
+        client = self.client_for(self.user)
+        for _ in range(3):
+            self.assertEqual(
+                client.get(reverse('posts:post_create')).status_code, 200)
+        self.assertEqual(
+            client.post(reverse('posts:post_create'),
+                        {'text': 'Новый пост'}).status_code, 302)
+        self.assertEqual(
+            client.post(reverse('posts:post_create'),
+                        {'text': 'Ещё пост'}).status_code, 429)
+
+
+class BucketTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.bucket = ratelimit.Bucket('3/m')
+
+    def take(self, at):
+        with mock.patch.object(ratelimit.time, 'time', return_value=at):
+            return self.bucket.take('bucket')
+
+    def test_refill(self):
+        """Ведро наполняется со скоростью лимита, но не сверх ёмкости."""
+        self.assertEqual([self.take(1000) for _ in range(4)][-1], 20)
+        self.assertEqual(self.take(1020), 0)
+        self.assertEqual(self.take(1020), 20)
+        # Час простоя даёт не больше трёх запросов подряд.
+        waits = [self.take(4600) for _ in range(4)]
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertGreater(waits[3], 0)
+
+    def test_bad_rate(self):
+        with self.assertRaises(ImproperlyConfigured):
+            ratelimit.Bucket('10 в минуту')
+        with self.assertRaises(ImproperlyConfigured):
+            ratelimit.load_limits({'posts:index': {'everyone': '1/s'}})
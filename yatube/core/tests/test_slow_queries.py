@@ -0,0 +1,96 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection, transaction
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.slow_queries import SlowQueryLog, shape
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ShapeTest(SimpleTestCase):
+    def test_values_are_removed(self):
+        """Значения и длина IN-списков не меняют форму запроса."""
+        self.assertEqual(
+            shape("SELECT * FROM t WHERE a IN (%s, %s) AND b = 'x'  LIMIT 11"),
+            shape('SELECT * FROM t WHERE a IN (%s) AND b = %s LIMIT 21'))
+        self.assertEqual(
+            shape('SELECT * FROM t WHERE a IN (%s, %s)'),
+            'SELECT * FROM t WHERE a IN (...)')
+
+
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='slow')
+        Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'slow.sqlite3')
+        # Порог 0: медленным считается любой запрос.
+        self.log = SlowQueryLog(self.path, 0)
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_request_queries_are_logged(self):
+        """В журнале есть вьюха, место вызова, параметры и план."""
+        with connection.execute_wrapper(self.log):
+            Client().get(reverse('posts:profile', args=['slow']))
+        rows = self.log.top()
+        author = next(
+            row for row in rows
+            if 'WHERE "auth_user"."username"' in row['shape'])
+        self.assertEqual(author['view'], 'posts:profile')
+        self.assertTrue(author['location'].startswith('posts/views.py:'))
+        self.assertIn('slow', author['params'])
+        self.assertIn('SEARCH', author['plan'])
+
+    def test_same_shape_is_grouped(self):
+        with connection.execute_wrapper(self.log):
+            for pk in (1, 2, 3):
+                list(Post.objects.filter(pk__in=range(pk)))
+            User.objects.count()
+        rows = self.log.top()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['count'] + rows[1]['count'], 4)
+        self.assertEqual({row['count'] for row in rows}, {1, 3})
+
+    def test_broken_log_does_not_break_queries(self):
+        """Ошибка записи журнала не меняет ни результат запроса, ни
+        исключение упавшего запроса.
+        """
+        # Вместо файла журнала — каталог: SQLite его не откроет.
+        broken = SlowQueryLog(os.path.dirname(self.path), 0)
+        with connection.execute_wrapper(broken):
+            with self.assertLogs('core.slow_queries', 'ERROR'):
+                self.assertEqual(User.objects.count(), 1)
+            with self.assertLogs('core.slow_queries', 'ERROR'):
+                with self.assertRaisesMessage(
+                        DatabaseError, 'no such table'), \
+                        transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT * FROM no_such_table')
+
+    def test_command_filters_by_time(self):
+        with connection.execute_wrapper(self.log):
+            User.objects.count()
+        with override_settings(SLOW_QUERY_LOG=self.path):
+            out = StringIO()
+            call_command('slow_queries', '--since', '1h', '--plans',
+                         stdout=out)
+            self.assertIn('COUNT(*)', out.getvalue())
+            out = StringIO()
+            call_command(
+                'slow_queries', '--since', '2999-01-01T00:00', stdout=out)
+            self.assertIn('Медленных запросов нет', out.getvalue())
+            with self.assertRaises(CommandError):
+                call_command('slow_queries', '--since', 'вчера')
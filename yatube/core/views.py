@@ -1,5 +1,11 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
 
+from . import metrics as view_metrics
+from .query_log import recent_queries
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +21,21 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def queries(request):
+    """Последние SQL-запросы процесса из кольцевого буфера."""
+    if not settings.QUERY_LOG_SIZE:
+        raise Http404
+    return JsonResponse({'queries': recent_queries.recent()})
+
+
+@staff_member_required
+def metrics(request):
+    """Показатели всех воркеров в текстовом формате Prometheus."""
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(
+        view_metrics.exposition(view_metrics.registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
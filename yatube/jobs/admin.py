@@ -0,0 +1,29 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+from .queue import requeue
+
+
+class JobAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'priority',
+        'attempts',
+        'run_at',
+        'locked_by'
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('key',)
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        requeue(queryset.filter(status=Job.FAILED),
+                attempts=0, run_at=timezone.now())
+    retry.short_description = 'Повторить упавшие задачи'
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,61 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import Worker
+
+
+def run_worker(sleep, burst):
+    """Текущая задача доделывается и после SIGTERM или Ctrl+C."""
+    worker = Worker(sleep=sleep)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    processed = worker.run(burst=burst)
+    connections.close_all()
+    return processed
+
+
+class Command(BaseCommand):
+    help = 'Запустить процессы, выполняющие фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Сколько секунд ждать новых задач, когда очередь пуста')
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Завершиться, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            processed = run_worker(options['sleep'], options['burst'])
+            self.stdout.write(f'Выполнено задач: {processed}')
+            return
+        # Соединения родителя не должны достаться дочерним процессам.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(
+                target=run_worker,
+                args=(options['sleep'], options['burst']))
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+
+        def stop(*args):
+            for worker in workers:
+                worker.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            # Дочерние процессы получили тот же SIGINT и доделывают
+            # текущие задачи; SIGTERM пересылается им явно.
+            for worker in workers:
+                worker.join()
@@ -0,0 +1,67 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(max_length=100, verbose_name='Задача')
+    payload = models.TextField(verbose_name='Аргументы (JSON)', default='{}')
+    key = models.CharField(
+        max_length=255,
+        verbose_name='Ключ',
+        blank=True,
+        help_text='Задача с тем же ключом не ставится в очередь дважды',
+    )
+    priority = models.SmallIntegerField(verbose_name='Приоритет', default=0)
+    status = models.CharField(
+        max_length=10,
+        verbose_name='Состояние',
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток', default=5)
+    run_at = models.DateTimeField(
+        verbose_name='Выполнить после', default=timezone.now)
+    locked_by = models.CharField(
+        max_length=100, verbose_name='Воркер', blank=True)
+    locked_at = models.DateTimeField(
+        verbose_name='Взята в работу', blank=True, null=True)
+    last_error = models.TextField(verbose_name='Последняя ошибка', blank=True)
+    created = models.DateTimeField(
+        verbose_name='Дата создания', auto_now_add=True)
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('status', '-priority', 'run_at', 'id'),
+                name='jobs_job_next_idx',
+            ),
+            models.Index(
+                fields=('status', 'name', 'run_at', 'id'),
+                name='jobs_job_batch_idx',
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'key'),
+                condition=Q(status='queued') & ~Q(key=''),
+                name='jobs_job_queued_key_uniq',
+            ),
+        )
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
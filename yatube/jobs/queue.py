@@ -0,0 +1,228 @@
+import json
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Пауза перед повтором удваивается с каждой попыткой: 10 с, 20 с,
+# 40 с и так далее, но не больше часа.
+BACKOFF_BASE = 10
+BACKOFF_MAX = 60 * 60
+# Задача, которую воркер держит дольше, считается брошенной упавшим
+# процессом и возвращается в очередь.
+LEASE = timedelta(minutes=10)
+
+registry = {}
+
+
+class Task:
+    """Функция, которую можно выполнить в фоне через ``enqueue``.
+
+    Задача с ``batch_size`` больше единицы получает список аргументов
+    сразу нескольких однотипных заданий, например чтобы отправить
+    письма через одно соединение. Ошибка повторяет всю пачку.
+    """
+
+    def __init__(self, func, name, priority, max_attempts, batch_size):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, key='', delay=None, **payload):
+        return enqueue(self.name, key=key, delay=delay, **payload)
+
+    def run(self, payloads):
+        if self.batch_size > 1:
+            self.func(payloads)
+            return
+        for payload in payloads:
+            self.func(**payload)
+
+
+def task(name=None, priority=0, max_attempts=5, batch_size=1):
+    """Объявить фоновую задачу; имя по умолчанию — ``модуль.функция``."""
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        registry[task_name] = Task(
+            func, task_name, priority, max_attempts, batch_size)
+        return registry[task_name]
+    return decorator
+
+
+def enqueue(name, key='', delay=None, **payload):
+    """Поставить задачу в очередь в текущей транзакции.
+
+    Запись появляется вместе с изменениями, ради которых задача
+    ставится, и пропадает при их откате. Пока в очереди ждёт задача
+    с тем же непустым ``key``, новая не добавляется.
+    """
+    task = registry[name]
+    run_at = timezone.now()
+    if delay is not None:
+        run_at += timedelta(seconds=delay)
+    Job.objects.bulk_create([Job(
+        name=name,
+        payload=json.dumps(payload),
+        key=key,
+        priority=task.priority,
+        max_attempts=task.max_attempts,
+        run_at=run_at,
+    )], ignore_conflicts=bool(key))
+
+
+def fail(name, error, key='', **payload):
+    """Записать задачу сразу упавшей, не выполняя её.
+
+    Так задача, которая заведомо не удастся, видна в админке с
+    ошибкой и может быть повторена оттуда, а не ставится снова и
+    снова.
+    """
+    task = registry[name]
+    Job.objects.create(
+        name=name,
+        payload=json.dumps(payload),
+        key=key,
+        priority=task.priority,
+        status=Job.FAILED,
+        attempts=task.max_attempts,
+        max_attempts=task.max_attempts,
+        last_error=error,
+    )
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def claim(worker):
+    """Взять самую срочную задачу, а для пакетной — и однотипные с ней.
+
+    В SQLite транзакция начинается с ``BEGIN IMMEDIATE``, поэтому два
+    воркера не возьмут одну задачу; в других базах строки блокируются
+    через ``SELECT ... FOR UPDATE SKIP LOCKED``.
+    """
+    now = timezone.now()
+    due = Job.objects.select_for_update(skip_locked=True).filter(
+        status=Job.QUEUED, run_at__lte=now)
+    with transaction.atomic():
+        first = due.order_by('-priority', 'run_at', 'id').first()
+        if first is None:
+            return []
+        jobs = [first]
+        task = registry.get(first.name)
+        if task is not None and task.batch_size > 1:
+            jobs += due.filter(name=first.name).exclude(
+                pk=first.pk).order_by('run_at', 'id')[:task.batch_size - 1]
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now)
+    return jobs
+
+
+def execute(jobs):
+    """Выполнить взятые задачи: удачные удаляются, упавшие ждут повтора."""
+    task = registry.get(jobs[0].name)
+    try:
+        if task is None:
+            raise LookupError(f'Неизвестная задача {jobs[0].name}')
+        task.run([json.loads(job.payload) for job in jobs])
+    except Exception:
+        logger.exception('Задача %s упала', jobs[0].name)
+        retry(jobs, traceback.format_exc())
+        return False
+    Job.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+    return True
+
+
+def retry(jobs, error):
+    now = timezone.now()
+    for job in jobs:
+        job.attempts += 1
+        job.last_error = error
+        job.locked_by = ''
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+        else:
+            job.status = Job.QUEUED
+            job.run_at = now + backoff(job.attempts)
+        try:
+            with transaction.atomic():
+                job.save()
+        except IntegrityError:
+            # Пока задача выполнялась, такую же поставили снова.
+            job.delete()
+
+
+def requeue(queryset, **fields):
+    """Вернуть задачи ``queryset`` в очередь по одной.
+
+    Если задача с тем же ключом уже ждёт в очереди, возвращаемая
+    удаляется: вторая копия нарушила бы уникальность ключа, а ошибка
+    остановила бы воркер.
+    """
+    requeued = 0
+    for pk in list(queryset.values_list('pk', flat=True)):
+        try:
+            with transaction.atomic():
+                requeued += queryset.filter(pk=pk).update(
+                    status=Job.QUEUED, **fields)
+        except IntegrityError:
+            queryset.filter(pk=pk).delete()
+    return requeued
+
+
+def requeue_stale():
+    """Вернуть в очередь задачи воркеров, которые не дожили до конца."""
+    return requeue(Job.objects.filter(
+        status=Job.RUNNING, locked_at__lt=timezone.now() - LEASE,
+    ), locked_by='', locked_at=None)
+
+
+class Worker:
+    """Цикл одного процесса: взять задачу, выполнить, повторить.
+
+    Если задач нет, воркер спит ``sleep`` секунд; с ``burst=True``
+    он завершается, как только очередь опустеет.
+    """
+
+    def __init__(self, name=None, sleep=1.0):
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.sleep = sleep
+        self.stopping = False
+        self.processed = 0
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def run(self, burst=False):
+        next_requeue = 0
+        while not self.stopping:
+            if time.monotonic() >= next_requeue:
+                requeue_stale()
+                next_requeue = time.monotonic() + LEASE.total_seconds() / 2
+            jobs = claim(self.name)
+            if jobs:
+                execute(jobs)
+                self.processed += len(jobs)
+            close_old_connections()
+            if not jobs:
+                if burst:
+                    break
+                time.sleep(self.sleep)
+        return self.processed
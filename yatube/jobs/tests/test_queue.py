@@ -0,0 +1,183 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.query_plans import QueryPlanMixin
+
+from .. import queue
+from ..models import Job
+
+User = get_user_model()
+calls = []
+
+
+@queue.task(name='test.record')
+def record(value):
+    calls.append(value)
+
+
+@queue.task(name='test.urgent', priority=5)
+def urgent(value):
+    calls.append(value)
+
+
+@queue.task(name='test.batch', batch_size=3)
+def batch(payloads):
+    calls.append(sorted(payload['value'] for payload in payloads))
+
+
+@queue.task(name='test.broken', max_attempts=2)
+def broken():
+    raise RuntimeError('Не получилось')
+
+
+class JobQueueTest(QueryPlanMixin, TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def work(self):
+        return queue.Worker(name='test').run(burst=True)
+
+    def test_job_is_part_of_transaction(self):
+        """Задача из откаченной транзакции не попадает в очередь."""
+        try:
+            with transaction.atomic():
+                record.enqueue(value=1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(Job.objects.exists())
+
+    def test_same_key_is_queued_once(self):
+        """Задача с ключом не дублируется, пока ждёт в очереди."""
+        record.enqueue(key='one', value=1)
+        record.enqueue(key='one', value=2)
+        record.enqueue(value=3)
+        record.enqueue(value=3)
+        self.assertEqual(self.work(), 3)
+        self.assertEqual(calls, [1, 3, 3])
+        self.assertFalse(Job.objects.exists())
+
+    def test_priority_and_delay(self):
+        """Срочные задачи идут первыми, отложенные ждут своего времени."""
+        record.enqueue(value='обычная')
+        record.enqueue(value='отложенная', delay=60)
+        urgent.enqueue(value='срочная')
+        self.assertEqual(self.work(), 2)
+        self.assertEqual(calls, ['срочная', 'обычная'])
+        self.assertEqual(Job.objects.get().name, 'test.record')
+
+    def test_similar_jobs_are_batched(self):
+        """Пакетная задача получает до batch_size однотипных заданий."""
+        for value in range(5):
+            batch.enqueue(value=value)
+        self.assertEqual(self.work(), 5)
+        self.assertEqual(calls, [[0, 1, 2], [3, 4]])
+
+    def test_failed_job_is_retried_with_backoff(self):
+        """Упавшая задача откладывается, а после всех попыток остаётся
+        с ошибкой.
+        """
+        broken.enqueue()
+        started = timezone.now()
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertEqual(self.work(), 1)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreaterEqual(
+            job.run_at, started + timedelta(seconds=queue.BACKOFF_BASE / 2))
+        self.assertIn('Не получилось', job.last_error)
+        self.assertEqual(self.work(), 0)
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_jobs_are_requeued(self):
+        """Задача упавшего воркера возвращается в очередь после LEASE."""
+        record.enqueue(value=1)
+        self.assertEqual(len(queue.claim('lost')), 1)
+        self.assertEqual(self.work(), 0)
+        Job.objects.update(locked_at=timezone.now() - queue.LEASE * 2)
+        self.assertEqual(self.work(), 1)
+        self.assertEqual(calls, [1])
+
+    def test_stale_job_with_queued_twin_is_dropped(self):
+        """Брошенная задача, чей ключ уже снова в очереди, удаляется,
+        а не ломает воркер нарушением уникальности.
+        """
+        record.enqueue(key='one', value=1)
+        self.assertEqual(len(queue.claim('lost')), 1)
+        record.enqueue(key='one', value=2)
+        Job.objects.filter(status=Job.RUNNING).update(
+            locked_at=timezone.now() - queue.LEASE * 2)
+        self.assertEqual(queue.requeue_stale(), 0)
+        self.assertEqual(self.work(), 1)
+        self.assertEqual(calls, [2])
+        self.assertFalse(Job.objects.exists())
+
+    def test_admin_retry_skips_queued_twin(self):
+        """Повтор упавшей задачи из админки не дублирует ключ."""
+        Job.objects.create(name='test.record', key='one', status=Job.FAILED,
+                           payload=json.dumps({'value': 1}))
+        record.enqueue(key='one', value=2)
+        Job.objects.create(name='test.record', status=Job.FAILED,
+                           payload=json.dumps({'value': 3}))
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        client.post(reverse('admin:jobs_job_changelist'), {
+            'action': 'retry',
+            '_selected_action': list(
+                Job.objects.values_list('pk', flat=True)),
+        })
+        self.assertEqual(self.work(), 2)
+        self.assertEqual(sorted(calls), [2, 3])
+
+    def test_claim_uses_indexes(self):
+        """Выбор следующей задачи и её пачки идёт по индексам."""
+        for value in range(3):
+            batch.enqueue(value=value)
+            record.enqueue(value=value)
+        self.assertIndexedQueries(queue.claim, 'test')
+
+    def test_run_workers_command(self):
+        """Команда с --burst выполняет очередь и завершается."""
+        record.enqueue(value=1)
+        out = StringIO()
+        call_command('run_workers', processes=1, burst=True, stdout=out)
+        self.assertEqual(calls, [1])
+        self.assertIn('Выполнено задач: 1', out.getvalue())
+
+
+class PasswordResetQueueTest(TestCase):
+    def test_reset_email_is_sent_by_worker(self):
+        """Запрос сброса пароля только ставит письмо в очередь."""
+        User.objects.create_user(
+            username='forgetful', email='forgetful@example.com',
+            password='secret-password')
+        response = Client().post(
+            reverse('users:password_reset_form'),
+            {'email': 'forgetful@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'users.tasks.send_password_reset')
+        # В очереди нет ссылки с токеном — только номер пользователя.
+        self.assertNotIn('/auth/reset/', job.payload)
+        self.assertNotIn('token', json.loads(job.payload))
+        queue.Worker().run(burst=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['forgetful@example.com'])
+        self.assertIn('/auth/reset/', mail.outbox[0].body)
@@ -1,9 +1,18 @@
 from django.contrib import admin
 
-from .models import Post, Group, Comment
+from . import search
+from .models import AuthorStats, Post, Group, Comment
+from .paginators import EstimatedCountPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список, который не пересчитывает всю таблицу на каждый запрос."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class PostAdmin(LargeTableAdmin):
 
     list_display = (
         'pk',
@@ -16,6 +25,29 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Один список групп на все строки редактируемого списка."""
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs)
+        if db_field.name == 'group' and request is not None:
+            choices = getattr(request, '_group_choices', None)
+            if choices is None:
+                choices = request._group_choices = list(
+                    iter(formfield.choices))
+            formfield.choices = choices
+        return formfield
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту через полнотекстовый индекс вместо LIKE."""
+        if not search_term or not search.is_available():
+            return super().get_search_results(
+                request, queryset, search_term)
+        if search.match_expression(search_term) is None:
+            return queryset.none(), False
+        return queryset.filter(
+            id__in=search.matching_ids(search_term)), False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -28,7 +60,7 @@ class GroupAdmin(admin.ModelAdmin):
     )
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
 
     list_display = (
         'post',
@@ -36,6 +68,18 @@ class CommentAdmin(admin.ModelAdmin):
         'text',
         'created'
     )
+    list_select_related = ('post', 'author')
+
+
+class AuthorStatsAdmin(admin.ModelAdmin):
+
+    list_display = (
+        'author',
+        'post_count',
+        'comment_count',
+        'last_post_at'
+    )
+    list_select_related = ('author',)
 
 
 admin.site.register(Post, PostAdmin)
@@ -43,3 +87,5 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 
 admin.site.register(Comment, CommentAdmin)
+
+admin.site.register(AuthorStats, AuthorStatsAdmin)
@@ -0,0 +1,32 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """ETag из того, от чего зависит страница: поколений, отметок
+    времени, пользователя и адреса.
+    """
+    raw = ':'.join(str(part) for part in parts)
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Хранить можно, но перед показом нужно спросить сервер: иначе
+    # браузер по эвристике Last-Modified покажет устаревшую страницу.
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def not_modified(request, etag, last_modified):
+    """Ответ 304 на If-None-Match/If-Modified-Since или None, если
+    страницу нужно отрисовать.
+    """
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
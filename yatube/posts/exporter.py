@@ -0,0 +1,139 @@
+import csv
+import io
+import itertools
+import json
+
+from .models import Comment, Group, Post, User
+
+FIELDS = ('type', 'id', 'title', 'slug', 'description', 'text', 'author',
+          'group', 'post', 'pub_date', 'created')
+# Порция чтения и подгрузки авторов; SQLite ограничивает число
+# параметров в одном запросе.
+CHUNK_SIZE = 500
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Exporter:
+    """Потоковая выгрузка в формате, который понимает import_posts.
+
+    Строки читаются через ``iterator()`` порциями по ``chunk_size``,
+    а имена авторов и слаги групп подгружаются одним запросом на порцию,
+    поэтому память не зависит от размера выгрузки.
+    """
+
+    def __init__(self, group=None, author=None, kinds=('post', 'comment'),
+                 chunk_size=CHUNK_SIZE):
+        self.group = group
+        self.author = author
+        self.kinds = kinds
+        self.chunk_size = chunk_size
+
+    def posts(self):
+        posts = Post.objects.order_by('id')
+        if self.group is not None:
+            posts = posts.filter(group=self.group)
+        if self.author is not None:
+            posts = posts.filter(author=self.author)
+        return posts
+
+    def groups(self):
+        if self.group is not None:
+            return Group.objects.filter(pk=self.group.pk)
+        if self.author is not None:
+            return Group.objects.filter(
+                id__in=self.posts().values('group_id'))
+        return Group.objects.order_by('id')
+
+    def comments(self):
+        comments = Comment.objects.order_by('id')
+        if self.group is not None or self.author is not None:
+            comments = comments.filter(
+                post_id__in=self.posts().values('id'))
+        return comments
+
+    def records(self):
+        if 'post' in self.kinds:
+            for group in self.groups().iterator(chunk_size=self.chunk_size):
+                yield {
+                    'type': 'group', 'title': group.title,
+                    'slug': group.slug, 'description': group.description,
+                }
+            yield from self.post_records()
+        if 'comment' in self.kinds:
+            yield from self.comment_records()
+
+    def post_records(self):
+        rows = self.posts().values_list(
+            'id', 'text', 'author_id', 'group_id', 'pub_date')
+        for batch in batches(
+                rows.iterator(chunk_size=self.chunk_size), self.chunk_size):
+            authors = self.usernames(row[2] for row in batch)
+            groups = dict(Group.objects.filter(
+                id__in={row[3] for row in batch if row[3]},
+            ).values_list('id', 'slug'))
+            for pk, text, author_id, group_id, pub_date in batch:
+                yield {
+                    'type': 'post', 'id': pk, 'text': text,
+                    'author': authors[author_id],
+                    'group': groups.get(group_id),
+                    'pub_date': pub_date.isoformat(),
+                }
+
+    def comment_records(self):
+        rows = self.comments().values_list(
+            'id', 'post_id', 'author_id', 'text', 'created')
+        for batch in batches(
+                rows.iterator(chunk_size=self.chunk_size), self.chunk_size):
+            authors = self.usernames(row[2] for row in batch)
+            for pk, post_id, author_id, text, created in batch:
+                yield {
+                    'type': 'comment', 'id': pk, 'post': post_id,
+                    'author': authors[author_id], 'text': text,
+                    'created': created.isoformat(),
+                }
+
+    @staticmethod
+    def usernames(author_ids):
+        return dict(User.objects.filter(
+            id__in=set(author_ids)).values_list('id', 'username'))
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def csv_lines(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, FIELDS)
+
+    def take():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writeheader()
+    yield take()
+    for record in records:
+        writer.writerow(record)
+        yield take()
+
+
+def render(records, fmt):
+    """Строки файла выгрузки; отдаются по одной для потоковой записи."""
+    if fmt == 'csv':
+        return csv_lines(records)
+    return jsonl_lines(records)
@@ -0,0 +1,107 @@
+import time
+
+from django.core.cache import cache
+
+from yatube.settings import FEED_COUNT_TIMEOUT
+
+INDEX = 'index'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def post_feeds(post):
+    """Ленты, в которых показывается пост."""
+    feeds = [INDEX, author_feed(post.author_id)]
+    if post.group_id is not None:
+        feeds.append(group_feed(post.group_id))
+    return feeds
+
+
+def count_key(feed):
+    return f'feed-count:{feed}'
+
+
+def feed_count(feed, queryset):
+    """Число постов в ленте из кэша.
+
+    COUNT(*) выполняется только при промахе, а раз в
+    FEED_COUNT_TIMEOUT секунд значение пересчитывается заново,
+    поэтому расхождение счётчика с таблицей ограничено по времени.
+    """
+    count = cache.get(count_key(feed))
+    if count is None:
+        count = store_count(feed, queryset.count())
+    return count
+
+
+def store_count(feed, count):
+    """Сохранить точное число постов ленты; возвращает его же."""
+    cache.set(count_key(feed), count, FEED_COUNT_TIMEOUT)
+    return count
+
+
+def adjust_counts(feeds, delta):
+    for feed in feeds:
+        try:
+            cache.incr(count_key(feed), delta)
+        except ValueError:
+            # Счётчика нет в кэше: посчитается при следующем запросе.
+            pass
+
+
+def generation_key(feed):
+    return f'feed-gen:{feed}'
+
+
+def feed_generation(feed):
+    """Текущее поколение ленты; меняется при каждой правке её постов.
+
+    Начальное значение берётся из времени, поэтому после вытеснения
+    ключа из кэша поколение не совпадёт ни с одним из прежних.
+    """
+    key = generation_key(feed)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, int(time.time() * 1000), None)
+        generation = cache.get(key)
+    return generation
+
+
+def modified_key(feed):
+    return f'feed-modified:{feed}'
+
+
+def feed_modified(feed):
+    """Время последней правки ленты (Unix-время, секунды) для
+    Last-Modified; ставится вместе со сменой поколения.
+
+    Если ключ вытеснен, берётся текущее время: клиент просто получит
+    страницу заново.
+    """
+    key = modified_key(feed)
+    modified = cache.get(key)
+    if modified is None:
+        cache.add(key, int(time.time()), None)
+        modified = cache.get(key)
+    return modified
+
+
+def bump_generations(feeds):
+    """Сменить поколения лент; возвращает новые поколения, None —
+    если ключа не было в кэше.
+    """
+    generations = {}
+    for feed in feeds:
+        try:
+            generations[feed] = cache.incr(generation_key(feed))
+        except ValueError:
+            generations[feed] = None
+    now = int(time.time())
+    cache.set_many({modified_key(feed): now for feed in feeds}, None)
+    return generations
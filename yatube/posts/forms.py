@@ -6,10 +6,12 @@ from .models import Post, Comment
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
-        fields = ('text', 'group')
-        label = {'text': 'Текст поста', 'group': 'Группа'}
+        fields = ('text', 'group', 'image')
+        label = {'text': 'Текст поста', 'group': 'Группа',
+                 'image': 'Картинка'}
         help_text = {'text': 'Напишите текст поста',
-                     'group': 'Выберите группу'}
+                     'group': 'Выберите группу',
+                     'image': 'Загрузите картинку'}
 
 
 class CommentForm(forms.ModelForm):
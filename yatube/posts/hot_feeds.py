@@ -0,0 +1,295 @@
+import bisect
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta, timezone
+
+from yatube.settings import (HOT_FEED_MAX_AGE, HOT_FEED_SIZE,
+                             HOT_GROUP_FEED_SIZE, HOT_GROUP_FEEDS)
+
+from . import feeds
+from .models import Group, Post, User
+from .paginators import InvalidCursor, KeysetPaginator
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+# Порядок полей — как в модели: его ожидает Model.from_db.
+POST_FIELDS = tuple(field.attname for field in Post._meta.concrete_fields)
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name')
+GROUP_FIELDS = ('id', 'title', 'slug', 'description')
+Row = namedtuple('Row', POST_FIELDS)
+# Снимок ленты: строки в порядке ленты, ключи сортировки для bisect,
+# справочники авторов и групп; complete — в буфере вся лента;
+# loaded — когда снимок прочитан из базы (time.monotonic).
+State = namedtuple(
+    'State', 'generation rows keys authors groups complete loaded')
+
+
+def sort_key(pub_date, pk):
+    """Ключ по возрастанию для ленты, идущей по (-pub_date, -id)."""
+    return (-((pub_date - EPOCH) // MICROSECOND), -pk)
+
+
+class HotFeed:
+    """Последние посты одной ленты в памяти процесса.
+
+    Посты хранятся кортежами, авторы и группы — по одному разу в
+    справочниках, и превращаются в объекты моделей только для
+    выводимой страницы, поэтому страница из буфера не делает SQL.
+    Снимок состояния заменяется целиком, так что читатели в других
+    потоках не видят его наполовину обновлённым.
+
+    Буфер действителен, пока его поколение совпадает с поколением
+    ленты в общем кэше. Правки в этом процессе применяются к буферу
+    сигналами после фиксации; правки в других воркерах меняют
+    поколение, и буфер перечитывается одним запросом. Кроме того,
+    снимок старше ``max_age`` секунд перечитывается в любом случае:
+    так ошибка согласования не может жить в буфере бесконечно.
+    """
+
+    def __init__(self, feed, queryset, size, max_age=HOT_FEED_MAX_AGE):
+        self.feed = feed
+        self.queryset = queryset
+        self.size = size
+        self.max_age = max_age
+        self.state = None
+        self.lock = threading.Lock()
+
+    def current(self):
+        """Актуальный снимок; при смене поколения или по возрасту —
+        перечитанный.
+        """
+        generation = feeds.feed_generation(self.feed)
+        state = self.state
+        if (state is None or state.generation != generation
+                or time.monotonic() - state.loaded > self.max_age):
+            state = self.load(generation)
+        return state
+
+    def load(self, generation):
+        fields = (
+            POST_FIELDS
+            + tuple(f'author__{name}' for name in AUTHOR_FIELDS[1:])
+            + tuple(f'group__{name}' for name in GROUP_FIELDS[1:]))
+        records = list(self.queryset.order_by('-pub_date', '-id').values_list(
+            *fields)[:self.size])
+        rows, authors, groups = [], {}, {}
+        width = len(POST_FIELDS)
+        for record in records:
+            row = Row._make(record[:width])
+            rows.append(row)
+            authors[row.author_id] = (row.author_id,) + record[
+                width:width + len(AUTHOR_FIELDS) - 1]
+            if row.group_id is not None:
+                groups[row.group_id] = (row.group_id,) + record[
+                    width + len(AUTHOR_FIELDS) - 1:]
+        state = State(
+            generation, rows, [sort_key(row.pub_date, row.id) for row in rows],
+            authors, groups, len(rows) < self.size, time.monotonic())
+        self.state = state
+        return state
+
+    def apply(self, generation, post=None, remove=None):
+        """Применить правку из сигнала.
+
+        ``generation`` — поколение ленты после правки. Если буфер был
+        на предыдущем, правка переводит его на новое; иначе между ними
+        были чужие правки, и буфер будет перечитан.
+        """
+        with self.lock:
+            state = self.state
+            if (state is None or generation is None
+                    or state.generation + 1 != generation):
+                self.state = None
+                return
+            rows = list(state.rows)
+            authors, groups = dict(state.authors), dict(state.groups)
+            complete = state.complete
+            drop = remove if remove is not None else (
+                post.pk if post is not None else None)
+            rows = [row for row in rows if row.id != drop]
+            if post is not None and self.accepts(post):
+                authors[post.author_id] = tuple(
+                    getattr(post.author, name) for name in AUTHOR_FIELDS)
+                if post.group_id is not None:
+                    groups[post.group_id] = tuple(
+                        getattr(post.group, name) for name in GROUP_FIELDS)
+                row = Row._make(
+                    getattr(post, name) for name in POST_FIELDS
+                )._replace(image=post.image.name or '')
+                keys = [sort_key(item.pub_date, item.id) for item in rows]
+                position = bisect.bisect(
+                    keys, sort_key(row.pub_date, row.id))
+                if position < len(rows) or complete:
+                    rows.insert(position, row)
+            if len(rows) > self.size:
+                rows = rows[:self.size]
+                complete = False
+            # Правка не продлевает снимок: возраст считается от чтения.
+            self.state = State(
+                generation, rows,
+                [sort_key(row.pub_date, row.id) for row in rows],
+                authors, groups, complete, state.loaded)
+
+    def count_comments(self, post_id, delta):
+        """Поправить счётчик комментариев поста, не меняя поколения.
+
+        Ради счётчика ленты не сбрасываются; в других воркерах он
+        обновится, когда их буфер будет перечитан.
+        """
+        with self.lock:
+            state = self.state
+            if state is None:
+                return
+            self.state = state._replace(rows=[
+                row._replace(comment_count=max(row.comment_count + delta, 0))
+                if row.id == post_id else row for row in state.rows])
+
+    def accepts(self, post):
+        return self.feed == feeds.INDEX or (
+            feeds.group_feed(post.group_id) == self.feed)
+
+    def posts(self, state, start, stop):
+        """Посты ``state.rows[start:stop]`` объектами моделей или None,
+        если в буфере нет всех нужных строк.
+        """
+        if stop > len(state.rows) and not state.complete:
+            return None
+        return [self.materialize(state, row)
+                for row in state.rows[start:stop]]
+
+    @staticmethod
+    def materialize(state, row):
+        post = Post.from_db('default', POST_FIELDS, row)
+        post.author = User.from_db(
+            'default', AUTHOR_FIELDS, state.authors[row.author_id])
+        if row.group_id is not None:
+            post.group = Group.from_db(
+                'default', GROUP_FIELDS, state.groups[row.group_id])
+        else:
+            post.group = None
+        return post
+
+
+class HotPaginator(KeysetPaginator):
+    """KeysetPaginator, который берёт первые страницы ленты из
+    HotFeed и обращается к базе только за её пределами.
+    """
+
+    def __init__(self, object_list, per_page, feed, hot):
+        super().__init__(object_list, per_page, feed=feed)
+        self.hot = hot
+        self.state = hot.current()
+
+    def page_rows(self, number):
+        offset = (number - 1) * self.per_page
+        rows = self.hot.posts(
+            self.state, offset, offset + self.per_page + 1)
+        if rows is None:
+            return super().page_rows(number)
+        return rows
+
+    def recount(self):
+        """В полном буфере вся лента: число постов известно без SQL."""
+        if not self.state.complete:
+            return super().recount()
+        for name in ('count', 'num_pages'):
+            self.__dict__.pop(name, None)
+        self.count = feeds.store_count(self.feed, len(self.state.rows))
+
+    def cursor_page(self, cursor):
+        direction, number, values = self.decode_cursor(cursor)
+        try:
+            key = sort_key(*values)
+        except TypeError:
+            raise InvalidCursor(cursor)
+        keys = self.state.keys
+        if direction == 'next':
+            start = bisect.bisect_right(keys, key)
+            rows = self.hot.posts(
+                self.state, start, start + self.per_page + 1)
+            if rows is None:
+                return super().cursor_page(cursor)
+            if not rows:
+                return self.number_page(1)
+            return self._build_page(
+                rows, number, has_next=len(rows) > self.per_page,
+                has_previous=True)
+        stop = bisect.bisect_left(keys, key)
+        if stop == len(keys) and not self.state.complete:
+            return super().cursor_page(cursor)
+        start = max(stop - self.per_page, 0)
+        rows = self.hot.posts(self.state, start, stop)
+        if not rows:
+            return self.number_page(1)
+        if start == 0:
+            number = 1
+        return self._build_page(
+            rows, number, has_next=True, has_previous=start > 0,
+            trimmed=True)
+
+
+class Registry:
+    """Буферы процесса: общая лента и HOT_GROUP_FEEDS последних
+    запрошенных групп.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.index = HotFeed(feeds.INDEX, Post.objects.all(), HOT_FEED_SIZE)
+        self.groups = OrderedDict()
+
+    def group(self, group_id):
+        with self.lock:
+            hot = self.groups.get(group_id)
+            if hot is None:
+                hot = self.groups[group_id] = HotFeed(
+                    feeds.group_feed(group_id),
+                    Post.objects.filter(group_id=group_id),
+                    HOT_GROUP_FEED_SIZE)
+                if len(self.groups) > HOT_GROUP_FEEDS:
+                    self.groups.popitem(last=False)
+            else:
+                self.groups.move_to_end(group_id)
+            return hot
+
+    def group_by_slug(self, slug):
+        """Группа из буферов без запроса к базе или None."""
+        for hot in list(self.groups.values()):
+            state = hot.state
+            if state is None:
+                continue
+            for data in state.groups.values():
+                if data[2] == slug and hot.feed == feeds.group_feed(data[0]):
+                    if hot.current() is not state:
+                        return None
+                    return Group.from_db('default', GROUP_FIELDS, data)
+        return None
+
+    def feeds(self, names):
+        """Загруженные буферы лент ``names``."""
+        buffers = {feeds.INDEX: self.index}
+        buffers.update(
+            (hot.feed, hot) for hot in list(self.groups.values()))
+        return [buffers[name] for name in names if name in buffers]
+
+    def apply(self, generations, **change):
+        """Применить правку к буферам лент ``generations``.
+
+        Вызывается после фиксации транзакции вместе со сменой
+        поколений: при откате буферы не должны показать несохранённый
+        пост.
+        """
+        for hot in self.feeds(generations):
+            hot.apply(generations[hot.feed], **change)
+
+    def count_comments(self, post_id, delta):
+        for hot in [self.index, *list(self.groups.values())]:
+            hot.count_comments(post_id, delta)
+
+
+registry = Registry()
@@ -0,0 +1,269 @@
+import contextlib
+import csv
+import json
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import feeds, search
+from .models import AuthorStats, Comment, Group, Post, User
+
+KINDS = ('group', 'post', 'comment')
+# SQLite ограничивает число параметров в одном запросе.
+LOOKUP_CHUNK = 500
+# Сколько авторов и групп держать в словарях поиска: при большем числе
+# словари очищаются, и память не растёт с размером файла.
+LOOKUP_CACHE = 10000
+
+
+class RecordError(Exception):
+    pass
+
+
+def read_records(stream, fmt, default_kind='post'):
+    """Построчно читать записи JSONL или CSV, не загружая файл целиком."""
+    if fmt == 'csv':
+        rows = csv.DictReader(stream)
+    else:
+        rows = (json.loads(line) for line in stream if line.strip())
+    for row in rows:
+        if not isinstance(row, dict):
+            raise RecordError(f'Запись должна быть объектом: {row!r}')
+        row.setdefault('type', default_kind)
+        yield row
+
+
+def chunks(values, size=LOOKUP_CHUNK):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+@contextlib.contextmanager
+def preserved_dates():
+    """Сохранять pub_date и created из файла вместо auto_now_add."""
+    fields = [Post._meta.get_field('pub_date'),
+              Comment._meta.get_field('created')]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+@contextlib.contextmanager
+def deferred_indexes():
+    """Снять вторичные индексы постов и синхронизацию поиска на время
+    импорта и восстановить их одним проходом в конце.
+    """
+    indexes = Post._meta.indexes
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.remove_index(Post, index)
+    if search.is_available():
+        with connection.cursor() as cursor:
+            search.drop_triggers(cursor)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(Post, index)
+        if search.is_available():
+            with connection.cursor() as cursor:
+                search.create_triggers(cursor)
+            search.reindex()
+
+
+class Importer:
+    """Пакетная загрузка групп, постов и комментариев.
+
+    Авторы и группы ищутся по словарям в памяти, которые дополняются
+    одним запросом на пакет. Каждый пакет пишется в одной транзакции
+    вместе с пересчётом того, что bulk_create обходит стороной, так
+    что память не зависит от размера файла.
+    """
+
+    def __init__(self, batch_size=1000, create_users=False,
+                 ignore_conflicts=False):
+        self.batch_size = batch_size
+        self.create_users = create_users
+        self.ignore_conflicts = ignore_conflicts
+        self.authors = {}
+        self.groups = {}
+        self.pending = {kind: [] for kind in KINDS}
+        self.size = 0
+
+    def add(self, record):
+        kind = record.get('type')
+        if kind not in KINDS:
+            raise RecordError(f'Неизвестный тип записи: {kind!r}')
+        self.pending[kind].append(record)
+        self.size += 1
+        return self.size >= self.batch_size
+
+    @transaction.atomic
+    def flush(self):
+        groups, posts, comments = (self.pending[kind] for kind in KINDS)
+        touched = Touched()
+        if groups:
+            self.import_groups(groups)
+        if posts:
+            self.import_posts(posts, touched)
+        if comments:
+            self.import_comments(comments, touched)
+        touched.reconcile()
+        flushed = self.size
+        self.pending = {kind: [] for kind in KINDS}
+        self.size = 0
+        for lookup in (self.authors, self.groups):
+            if len(lookup) > LOOKUP_CACHE:
+                lookup.clear()
+        return flushed
+
+    def import_groups(self, records):
+        Group.objects.bulk_create(
+            (Group(title=record['title'], slug=record['slug'],
+                   description=record.get('description', ''))
+             for record in records),
+            ignore_conflicts=self.ignore_conflicts,
+        )
+        self.resolve_groups(record['slug'] for record in records)
+
+    def import_posts(self, records, touched):
+        self.resolve_authors(record['author'] for record in records)
+        self.resolve_groups(
+            record['group'] for record in records if record.get('group'))
+        posts = []
+        for record in records:
+            author_id = self.authors[record['author']]
+            group_id = (
+                self.groups[record['group']] if record.get('group')
+                else None)
+            touched.authors.add(author_id)
+            if group_id is not None:
+                touched.groups.add(group_id)
+            posts.append(Post(
+                id=record.get('id') or None,
+                text=record['text'],
+                author_id=author_id,
+                group_id=group_id,
+                pub_date=self.parse_date(record.get('pub_date')),
+            ))
+        Post.objects.bulk_create(
+            posts, ignore_conflicts=self.ignore_conflicts)
+
+    def import_comments(self, records, touched):
+        self.resolve_authors(record['author'] for record in records)
+        comments = []
+        for record in records:
+            author_id = self.authors[record['author']]
+            touched.authors.add(author_id)
+            touched.posts.add(record['post'])
+            comments.append(Comment(
+                id=record.get('id') or None,
+                post_id=record['post'],
+                author_id=author_id,
+                text=record['text'],
+                created=self.parse_date(record.get('created')),
+            ))
+        Comment.objects.bulk_create(
+            comments, ignore_conflicts=self.ignore_conflicts)
+
+    def resolve_authors(self, usernames):
+        missing = set(usernames) - self.authors.keys()
+        self.authors.update(self.lookup(User, 'username', missing))
+        missing -= self.authors.keys()
+        if missing and self.create_users:
+            User.objects.bulk_create(
+                User(username=username, password=make_password(None))
+                for username in missing)
+            self.authors.update(self.lookup(User, 'username', missing))
+            missing -= self.authors.keys()
+        if missing:
+            raise RecordError(
+                'Неизвестные авторы: ' + ', '.join(sorted(missing)))
+
+    def resolve_groups(self, slugs):
+        missing = set(slugs) - self.groups.keys()
+        self.groups.update(self.lookup(Group, 'slug', missing))
+        missing -= self.groups.keys()
+        if missing:
+            raise RecordError(
+                'Неизвестные группы: ' + ', '.join(sorted(missing)))
+
+    @staticmethod
+    def lookup(model, field, values):
+        found = {}
+        for chunk in chunks(values):
+            found.update(model.objects.filter(
+                **{f'{field}__in': chunk}).values_list(field, 'id'))
+        return found
+
+    @staticmethod
+    def parse_date(value):
+        if not value:
+            return timezone.now()
+        date = parse_datetime(value)
+        if date is None:
+            raise RecordError(f'Неверная дата: {value!r}')
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+
+class Touched:
+    """Авторы, группы и прокомментированные посты одного пакета."""
+
+    def __init__(self):
+        self.authors = set()
+        self.groups = set()
+        self.posts = set()
+
+    def reconcile(self):
+        """Привести в порядок то, что bulk_create обходит стороной:
+        статистику авторов, счётчики комментариев, счётчики и поколения
+        кэша лент. Кэш меняется после фиксации пакета.
+        """
+        for chunk in chunks(self.posts):
+            fixed = Post.rebuild_comment_counts(
+                Post.objects.filter(pk__in=chunk))
+            for _, author_id, group_id in fixed:
+                self.authors.add(author_id)
+                if group_id is not None:
+                    self.groups.add(group_id)
+        for chunk in chunks(self.authors):
+            AuthorStats.rebuild(author_ids=chunk)
+        if not self.authors:
+            return
+        touched = (
+            [feeds.INDEX]
+            + [feeds.author_feed(pk) for pk in self.authors]
+            + [feeds.group_feed(pk) for pk in self.groups]
+        )
+
+        def invalidate():
+            cache.delete_many([feeds.count_key(feed) for feed in touched])
+            feeds.bump_generations(touched)
+        transaction.on_commit(invalidate)
+
+
+class Progress:
+    def __init__(self, write, skipped=0):
+        self.write = write
+        self.started = time.monotonic()
+        self.rows = 0
+        self.skipped = skipped
+
+    def add(self, rows):
+        self.rows += rows
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        self.write(
+            f'Загружено записей: {self.skipped + self.rows} '
+            f'({self.rows / elapsed:.0f} записей/с)')
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exporter import CHUNK_SIZE, Exporter, render
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая выгрузка групп, постов и комментариев в JSONL или CSV '
+        'в формате команды import_posts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'destination', nargs='?', default='-',
+            help='Путь к файлу или «-» для стандартного вывода')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат; по умолчанию определяется по расширению')
+        parser.add_argument('--group', help='Слаг группы')
+        parser.add_argument('--author', help='Имя автора')
+        parser.add_argument(
+            '--type', choices=('post', 'comment'), action='append',
+            help='Что выгружать; по умолчанию посты и комментарии')
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Сколько строк читать из базы за один раз')
+
+    def handle(self, *args, **options):
+        destination = options['destination']
+        fmt = options['format'] or (
+            'csv' if destination.endswith('.csv') else 'jsonl')
+        group = author = None
+        try:
+            if options['group']:
+                group = Group.objects.get(slug=options['group'])
+            if options['author']:
+                author = User.objects.get(username=options['author'])
+        except (Group.DoesNotExist, User.DoesNotExist) as error:
+            raise CommandError(error)
+        exporter = Exporter(
+            group, author, options['type'] or ('post', 'comment'),
+            options['chunk_size'])
+        lines = render(exporter.records(), fmt)
+        if destination == '-':
+            count = self.write(lines, lambda line: self.stdout.write(
+                line, ending=''))
+        else:
+            with open(destination, 'w', encoding='utf-8',
+                      newline='') as stream:
+                count = self.write(lines, stream.write)
+        if fmt == 'csv':
+            count -= 1
+        self.stderr.write(f'Выгружено записей: {count}')
+
+    @staticmethod
+    def write(lines, write):
+        count = 0
+        for line in lines:
+            write(line)
+            count += 1
+        return count
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.page_cache import cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Попадания и промахи кэша страниц лент и ответы 304'
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        self.stdout.write(
+            'hits: {hits}\nmisses: {misses}\n'
+            'hit ratio: {hit_ratio:.2%}\n'
+            'not modified: {not_modified}'.format(**stats))
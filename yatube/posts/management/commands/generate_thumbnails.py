@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+
+class Command(BaseCommand):
+    help = 'Заранее создать миниатюры всех картинок постов'
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True).distinct()
+        count = 0
+        for name in names.iterator():
+            generate(name)
+            count += 1
+        self.stdout.write(f'Обработано картинок: {count}')
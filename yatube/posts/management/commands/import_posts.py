@@ -0,0 +1,113 @@
+import contextlib
+import io
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from posts.importer import (Importer, Progress, RecordError,
+                            deferred_indexes, preserved_dates, read_records)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоковая загрузка групп, постов и комментариев из JSONL или CSV. '
+        'Для JSONL тип записи берётся из поля type.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source', nargs='?', default='-',
+            help='Путь к файлу или «-» для стандартного ввода')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат; по умолчанию определяется по расширению')
+        parser.add_argument(
+            '--type', choices=('group', 'post', 'comment'), default='post',
+            help='Тип записей без поля type, например для CSV')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько записей писать в одной транзакции')
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Создавать неизвестных авторов без пароля')
+        parser.add_argument(
+            '--defer-indexes', action='store_true',
+            help='Строить индексы и поисковый индекс один раз в конце')
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с числом уже загруженных записей; '
+                 'по умолчанию <source>.checkpoint')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Пропустить записи, загруженные до сбоя')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        fmt = options['format'] or (
+            'csv' if source.endswith('.csv') else 'jsonl')
+        checkpoint = options['checkpoint'] or (
+            None if source == '-' else source + '.checkpoint')
+        if options['resume'] and checkpoint is None:
+            raise CommandError('Для --resume со stdin нужен --checkpoint')
+        done = self.read_checkpoint(checkpoint) if options['resume'] else 0
+
+        importer = Importer(
+            batch_size=options['batch_size'],
+            create_users=options['create_users'],
+            # Пакет, записанный перед сбоем, может прийти ещё раз.
+            ignore_conflicts=options['resume'],
+        )
+        progress = Progress(self.stdout.write, skipped=done)
+        deferred = (
+            deferred_indexes() if options['defer_indexes']
+            else contextlib.nullcontext())
+        with self.open_source(source) as stream, preserved_dates(), deferred:
+            records = read_records(stream, fmt, options['type'])
+            try:
+                for number, record in enumerate(records, 1):
+                    if number <= done:
+                        continue
+                    if importer.add(record):
+                        self.flush(importer, progress, checkpoint, done)
+                if importer.size:
+                    self.flush(importer, progress, checkpoint, done)
+            except (RecordError, KeyError, ValueError) as error:
+                raise CommandError(
+                    f'Ошибка в записи {done + progress.rows + importer.size}'
+                    f': {error!r}. Загрузку можно продолжить с --resume.')
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {progress.rows} записей'))
+
+    def flush(self, importer, progress, checkpoint, done):
+        first = done + progress.rows + 1
+        last = first + importer.size - 1
+        try:
+            flushed = importer.flush()
+        except DatabaseError as error:
+            # Например, комментарий к посту, которого нет: ограничение
+            # проверяется при фиксации пакета, поэтому виноват весь пакет.
+            raise CommandError(
+                f'Ошибка в записях {first}–{last}: '
+                f'{error!r}. Загрузку можно продолжить с --resume.')
+        progress.add(flushed)
+        if checkpoint:
+            with open(checkpoint, 'w') as file:
+                file.write(str(done + progress.rows))
+
+    def open_source(self, source):
+        if source == '-':
+            return contextlib.nullcontext(
+                io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'))
+        return open(source, encoding='utf-8', newline='')
+
+    @staticmethod
+    def read_checkpoint(path):
+        try:
+            with open(path) as file:
+                return int(file.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать статистику авторов по постам и комментариям'
+
+    def handle(self, *args, **options):
+        count = AuthorStats.rebuild()
+        self.stdout.write(f'Пересчитана статистика авторов: {count}')
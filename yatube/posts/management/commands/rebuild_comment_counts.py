@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts import feeds
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Сверить счётчики комментариев постов с таблицей комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов сверять одним запросом')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = Post.objects.order_by('pk').values_list('pk', flat=True)
+        last_id = 0
+        fixed = []
+        while True:
+            ids = list(posts.filter(pk__gt=last_id)[:batch_size])
+            if not ids:
+                break
+            fixed += Post.rebuild_comment_counts(
+                Post.objects.filter(pk__gt=last_id, pk__lte=ids[-1]))
+            last_id = ids[-1]
+        touched = set()
+        for _, author_id, group_id in fixed:
+            touched.update(feeds.post_feeds(
+                Post(author_id=author_id, group_id=group_id)))
+        feeds.bump_generations(touched)
+        self.stdout.write(f'Исправлено счётчиков: {len(fixed)}')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестроить полнотекстовый индекс постов порциями, каждая в '
+        'своей транзакции. Запись постов ждёт только текущую порцию; '
+        'правки между порциями триггеры применяют к уже '
+        'проиндексированным постам, остальные порции читают в их '
+        'текущем виде. Прерванную перестройку нужно запустить заново.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов индексировать в одной транзакции')
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stderr.write('Полнотекстовый индекс есть только в SQLite')
+            return
+
+        def progress(total):
+            self.stdout.write(f'Проиндексировано постов: {total}')
+
+        total = search.reindex(options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен, постов: {total}'))
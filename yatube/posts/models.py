@@ -1,10 +1,12 @@
-from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 from yatube.settings import AMOUNT_CHAR
 
-settings.DEBUG = True
+from .storage import HashedStorage
+
 
 User = get_user_model()
 
@@ -46,20 +48,69 @@ class Post(models.Model):
         related_name='posts',
         help_text='Группа, к которой будет относиться пост'
     )
-#    image = models.ImageField(
-#        'Картинка',
-#        upload_to='posts/',
-#        blank=True
-#    )
+    modified = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+    )
+    image = models.ImageField(
+        'Картинка',
+        upload_to='posts/',
+        storage=HashedStorage(),
+        blank=True
+    )
+    comment_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('pub_date', 'id'),
+                name='posts_post_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=('group', 'pub_date', 'id'),
+                name='posts_post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date', 'id'),
+                name='posts_post_author_pub_date_idx',
+            ),
+        )
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
 
     def __str__(self):
         return self.text[:AMOUNT_CHAR]
 
+    def save(self, *args, **kwargs):
+        # Счётчики автора обновляются в обработчиках post_save,
+        # поэтому они должны выполниться в той же транзакции.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def rebuild_comment_counts(cls, queryset=None):
+        """Исправить ``comment_count``, разошедшийся с комментариями.
+
+        Возвращает исправленные посты как (id, автор, группа).
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        actual = Comment.objects.filter(post=OuterRef('pk')).order_by(
+        ).values('post').annotate(count=models.Count('id')).values('count')
+        wrong = queryset.order_by().annotate(
+            actual=Coalesce(Subquery(actual), 0),
+        ).exclude(comment_count=F('actual')).values_list(
+            'pk', 'author_id', 'group_id', 'actual')
+        fixed = []
+        for pk, author_id, group_id, count in wrong:
+            cls.objects.filter(pk=pk).update(comment_count=count)
+            fixed.append((pk, author_id, group_id))
+        return fixed
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -83,5 +134,85 @@ class Comment(models.Model):
     )
 
     class Meta:
+        indexes = (
+            models.Index(
+                fields=('post', 'created', 'id'),
+                name='posts_comment_post_created_idx',
+            ),
+        )
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        verbose_name='Автор',
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='stats',
+    )
+    post_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+    )
+    comment_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+    )
+    last_post_at = models.DateTimeField(
+        verbose_name='Дата последнего поста',
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        verbose_name = "Статистика автора"
+        verbose_name_plural = "Статистика авторов"
+
+    def __str__(self):
+        return str(self.author)
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, author_ids=None):
+        """Пересчитать с нуля статистику всех авторов или только
+        перечисленных в ``author_ids``.
+        """
+        stats = {}
+        posts = Post.objects.all()
+        comments = Comment.objects.all()
+        existing = cls.objects.all()
+        if author_ids is not None:
+            posts = posts.filter(author_id__in=author_ids)
+            comments = comments.filter(author_id__in=author_ids)
+            existing = existing.filter(author_id__in=author_ids)
+        posts = posts.order_by().values('author').annotate(
+            count=models.Count('id'), last=models.Max('pub_date'))
+        for row in posts:
+            stats[row['author']] = cls(
+                author_id=row['author'],
+                post_count=row['count'],
+                last_post_at=row['last'],
+            )
+        comments = comments.order_by().values('author').annotate(
+            count=models.Count('id'))
+        for row in comments:
+            stats.setdefault(
+                row['author'], cls(author_id=row['author']),
+            ).comment_count = row['count']
+        existing.delete()
+        cls.objects.bulk_create(stats.values(), batch_size=500)
+        return len(stats)
+
+    @classmethod
+    def change(cls, author_id, **changes):
+        """Обновить счётчики автора одним UPDATE, создав запись при нужде."""
+        rows = cls.objects.filter(author_id=author_id)
+        if not rows.update(**changes):
+            cls.objects.get_or_create(author_id=author_id)
+            rows.update(**changes)
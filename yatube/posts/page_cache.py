@@ -0,0 +1,81 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.shortcuts import render
+
+from yatube.settings import AMOUNT_SECONDS, index_page
+
+from .conditional import make_etag, not_modified, set_validators
+from .feeds import feed_generation, feed_modified
+
+HITS_KEY = 'feed-cache:hits'
+MISSES_KEY = 'feed-cache:misses'
+NOT_MODIFIED_KEY = 'feed-cache:not-modified'
+PAGE_TIMEOUT = AMOUNT_SECONDS * index_page
+
+
+def window():
+    """Начало текущего окна кэша страниц (Unix-время, секунды).
+
+    Комментарии не меняют поколений общей ленты и лент групп, а число
+    комментариев в карточках от них зависит. Окно входит в ключ
+    страницы и в валидаторы, поэтому счётчики в этих лентах отстают не
+    больше чем на PAGE_TIMEOUT секунд (плюс срок буфера ленты
+    HOT_FEED_MAX_AGE) и для клиентов с If-None-Match.
+    """
+    now = int(time.time())
+    return now - now % PAGE_TIMEOUT
+
+
+def page_key(request, feed):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return 'feed-page:{}:{}:{}:{}:{}'.format(
+        feed, feed_generation(feed), window(), request.user.pk or 0, path)
+
+
+def cached_render(request, feed, template_name, get_context):
+    """Отрисовать ленту или взять готовую страницу из кэша.
+
+    Ключ включает поколение ленты, поэтому после правки поста старые
+    страницы просто перестают находиться и вытесняются по времени.
+    Из того же ключа строится ETag, так что на условный запрос с
+    неизменившейся лентой ответ 304 отдаётся без обращения к постам.
+    """
+    key = page_key(request, feed)
+    etag = make_etag(key)
+    last_modified = max(feed_modified(feed), window())
+    response = not_modified(request, etag, last_modified)
+    if response is not None:
+        _count(NOT_MODIFIED_KEY)
+        return response
+    response = cache.get(key)
+    if response is not None:
+        _count(HITS_KEY)
+        response['X-Feed-Cache'] = 'hit'
+        return set_validators(response, etag, last_modified)
+    _count(MISSES_KEY)
+    response = render(request, template_name, get_context())
+    cache.set(key, response, PAGE_TIMEOUT)
+    response['X-Feed-Cache'] = 'miss'
+    return set_validators(response, etag, last_modified)
+
+
+def cache_stats():
+    stats = cache.get_many([HITS_KEY, MISSES_KEY, NOT_MODIFIED_KEY])
+    hits = stats.get(HITS_KEY, 0)
+    misses = stats.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+        'not_modified': stats.get(NOT_MODIFIED_KEY, 0),
+    }
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
@@ -0,0 +1,288 @@
+import base64
+import binascii
+import hashlib
+import json
+import math
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import (EmptyResultSet, FieldDoesNotExist,
+                                    ValidationError)
+from django.core.paginator import Page, Paginator
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from yatube.settings import FEED_COUNT_TIMEOUT, PAGE_WINDOW
+
+from .feeds import feed_count, store_count
+
+# Границы INTEGER в SQLite: большее число база в запрос не примет.
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage(Page):
+    """Страница, которая знает только соседние курсоры, без COUNT(*)."""
+
+    def __init__(self, object_list, number, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, number, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<KeysetPage %s>' % self.number
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    @property
+    def page_range(self):
+        """Окно из нескольких номеров вокруг текущей страницы."""
+        last = min(self.paginator.num_pages, self.number + PAGE_WINDOW)
+        if self.has_next():
+            last = max(last, self.number + 1)
+        return range(max(self.number - PAGE_WINDOW, 1), last + 1)
+
+
+class KeysetPaginator(Paginator):
+    """Постраничный вывод по ключу (seek) вместо OFFSET/LIMIT.
+
+    Курсор хранит значения полей сортировки крайней записи страницы,
+    поэтому следующая страница выбирается условием WHERE по индексу,
+    и её стоимость не зависит от глубины. Номер ``?page=N`` остаётся
+    для старых ссылок и работает через OFFSET.
+
+    Если передано имя ленты ``feed``, общее число записей берётся из
+    кэшированного счётчика ленты, а не из COUNT(*) на каждый запрос.
+    """
+
+    def __init__(self, object_list, per_page, keys=('-pub_date', '-id'),
+                 feed=None):
+        super().__init__(object_list.order_by(*keys), per_page)
+        self.keys = [
+            (key.lstrip('-'), key.startswith('-')) for key in keys
+        ]
+        self.feed = feed
+
+    @cached_property
+    def count(self):
+        if self.feed is None:
+            return super().count
+        return feed_count(self.feed, self.object_list)
+
+    def get_page(self, number=None, cursor=None):
+        if cursor:
+            try:
+                return self.cursor_page(cursor)
+            except InvalidCursor:
+                pass
+        if number == 'last':
+            return self.last_page()
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        return self.number_page(number)
+
+    def number_page(self, number):
+        if number > 1 and number > self.num_pages:
+            # Номер за концом ленты не должен попасть в OFFSET: слишком
+            # большое число SQLite не примет. Счётчик мог отстать,
+            # поэтому сначала он пересчитывается.
+            self.recount()
+            number = self.num_pages
+        rows = self.page_rows(number)
+        if not rows and number > 1:
+            # Страница за концом ленты: номер из старой ссылки или
+            # завышенный счётчик. Счётчик пересчитывается один раз.
+            self.recount()
+            number = self.num_pages
+            rows = self.page_rows(number)
+        return self._build_page(
+            rows, number, has_next=len(rows) > self.per_page,
+            has_previous=number > 1,
+        )
+
+    def page_rows(self, number):
+        """Записи страницы ``number`` и одна следующая за ней."""
+        offset = (number - 1) * self.per_page
+        return list(self.object_list[offset:offset + self.per_page + 1])
+
+    def recount(self):
+        """Точное число записей вместо кэшированного счётчика ленты;
+        исправленный счётчик сохраняется в кэш.
+        """
+        for name in ('count', 'num_pages'):
+            self.__dict__.pop(name, None)
+        if self.feed is not None:
+            self.count = store_count(self.feed, self.object_list.count())
+
+    def last_page(self):
+        """Последняя страница обратным проходом по индексу, без OFFSET.
+
+        Размер страницы следует из числа записей, поэтому оно
+        считается точно: по неточному счётчику на последней странице
+        оказались бы не те записи.
+        """
+        self.recount()
+        number = self.num_pages
+        size = self.count - (number - 1) * self.per_page
+        rows = list(self.object_list.reverse()[:max(size, 1)])
+        rows.reverse()
+        return self._build_page(
+            rows, number, has_next=False, has_previous=number > 1)
+
+    def cursor_page(self, cursor):
+        direction, number, values = self.decode_cursor(cursor)
+        backwards = direction == 'prev'
+        queryset = self.object_list.filter(self._seek(values, backwards))
+        if backwards:
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows:
+            return self.number_page(1)
+        if backwards:
+            rows.reverse()
+            if not has_more:
+                number = 1
+            return self._build_page(
+                rows, number, has_next=True, has_previous=has_more,
+                trimmed=True,
+            )
+        return self._build_page(
+            rows, number, has_next=has_more, has_previous=True,
+            trimmed=True,
+        )
+
+    def encode_cursor(self, obj, direction, number):
+        values = []
+        for name, _ in self.keys:
+            field = self._field(name)
+            value = getattr(obj, field.attname if field else name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        payload = json.dumps([direction, number, values]).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = base64.urlsafe_b64decode(
+                cursor + '=' * (-len(cursor) % 4))
+            direction, number, values = json.loads(payload.decode())
+            if direction not in ('next', 'prev') or (
+                    len(values) != len(self.keys)):
+                raise InvalidCursor(cursor)
+            values = [
+                self._to_python(name, value)
+                for (name, _), value in zip(self.keys, values)
+            ]
+            return direction, max(int(number), 1), values
+        except (binascii.Error, UnicodeDecodeError, TypeError,
+                ValueError, OverflowError, ValidationError):
+            raise InvalidCursor(cursor)
+
+    def _build_page(self, rows, number, has_next, has_previous,
+                    trimmed=False):
+        if not trimmed:
+            rows = rows[:self.per_page]
+        next_cursor = previous_cursor = None
+        if has_next and rows:
+            next_cursor = self.encode_cursor(rows[-1], 'next', number + 1)
+        if has_previous and rows:
+            previous_cursor = self.encode_cursor(
+                rows[0], 'prev', number - 1)
+        return KeysetPage(
+            rows, number, self, next_cursor=next_cursor,
+            previous_cursor=previous_cursor,
+        )
+
+    def _seek(self, values, backwards):
+        """Условие «строго после курсора» в порядке сортировки.
+
+        Первое поле дополнительно ограничено нестрогим неравенством,
+        чтобы база могла начать чтение индекса прямо с курсора.
+        """
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.keys, values):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        first_name, first_descending = self.keys[0]
+        bound = 'lte' if first_descending != backwards else 'gte'
+        return Q(**{f'{first_name}__{bound}': values[0]}) & condition
+
+    def _field(self, name):
+        """Поле модели или None для аннотаций вроде ``rank`` поиска."""
+        try:
+            return self.object_list.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def _to_python(self, name, value):
+        """Значение поля курсора; пустое значение, дата без часового
+        пояса и число вне 64 бит в условие WHERE и в ключи ленты не
+        годятся.
+        """
+        field = self._field(name)
+        if field is None:
+            if not isinstance(value, (int, float)):
+                raise InvalidCursor(value)
+        else:
+            value = field.to_python(value)
+        if value is None or (
+                isinstance(value, datetime) and timezone.is_naive(value)):
+            raise InvalidCursor(value)
+        if isinstance(value, float) and not math.isfinite(value):
+            raise InvalidCursor(value)
+        if isinstance(value, int) and not INT64_MIN <= value <= INT64_MAX:
+            raise InvalidCursor(value)
+        return value
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для больших списков в админке.
+
+    Для списка без фильтров число строк оценивается по максимальному
+    первичному ключу, что читает одну запись индекса. Для списка с
+    фильтрами считается точный COUNT(*). Оба значения кэшируются на
+    FEED_COUNT_TIMEOUT секунд.
+    """
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        try:
+            sql, params = query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = 'estimated-count:' + hashlib.md5(
+            f'{sql}{params}'.encode()).hexdigest()
+        count = cache.get(key)
+        if count is not None:
+            return count
+        if not query.where:
+            estimate = self.object_list.aggregate(last=Max('pk'))['last']
+            cache.set(key, estimate or 0, FEED_COUNT_TIMEOUT)
+            return estimate or 0
+        count = self.object_list.count()
+        cache.set(key, count, FEED_COUNT_TIMEOUT)
+        return count
@@ -0,0 +1,145 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+NO_RANK = RawSQL('0', (), output_field=FloatField())
+
+# Пока идёт перестройка индекса, здесь хранится id последнего уже
+# проиндексированного поста. Триггеры не трогают посты дальше него:
+# их прочитает из таблицы одна из следующих порций.
+PROGRESS = f'{TABLE}_progress'
+INDEXED = 'NOT EXISTS (SELECT 1 FROM {progress} WHERE {row}.id > last_id)'
+
+TRIGGERS = {
+    f'{TABLE}_insert': (
+        f'AFTER INSERT ON posts_post '
+        f'WHEN {INDEXED.format(progress=PROGRESS, row="new")} BEGIN '
+        f'INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text); END'
+    ),
+    f'{TABLE}_delete': (
+        f'AFTER DELETE ON posts_post '
+        f'WHEN {INDEXED.format(progress=PROGRESS, row="old")} BEGIN '
+        f"INSERT INTO {TABLE}({TABLE}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); END"
+    ),
+    f'{TABLE}_update': (
+        f'AFTER UPDATE OF text ON posts_post '
+        f'WHEN {INDEXED.format(progress=PROGRESS, row="old")} BEGIN '
+        f"INSERT INTO {TABLE}({TABLE}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); "
+        f'INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text); END'
+    ),
+}
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def create_triggers(cursor):
+    for name, body in TRIGGERS.items():
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+
+
+def ensure_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Обработчик post_migrate: вернуть триггеры синхронизации индекса.
+
+    SQLite удаляет триггеры вместе с таблицей, когда миграция
+    пересоздаёт posts_post, поэтому они создаются здесь после любой
+    миграции, а не в самих миграциях.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite' or not {TABLE, PROGRESS} <= set(
+            db.introspection.table_names()):
+        return
+    with db.cursor() as cursor:
+        create_triggers(cursor)
+
+
+def drop_triggers(cursor):
+    """Отключить синхронизацию индекса, например на время импорта."""
+    for name in TRIGGERS:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def reindex(batch_size=1000, progress=None):
+    """Перестроить поисковый индекс порциями по ``batch_size`` постов.
+
+    Каждая порция пишется в своей транзакции, чтобы не держать
+    блокировку записи SQLite на всё время перестройки. Вместе с
+    порцией сдвигается отметка в PROGRESS, поэтому триггеры между
+    порциями правят индекс только для уже проиндексированных постов,
+    а остальные посты порции прочитают в их текущем виде. Прерванная
+    перестройка оставляет отметку, и её нужно запустить заново.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {PROGRESS}')
+        cursor.execute(f'INSERT INTO {PROGRESS}(last_id) VALUES (0)')
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('delete-all')")
+    last_id = 0
+    total = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT max(id), count(*) FROM (SELECT id FROM posts_post '
+                'WHERE id > %s ORDER BY id LIMIT %s)', [last_id, batch_size])
+            batch_last_id, count = cursor.fetchone()
+            if not count:
+                cursor.execute(f'DELETE FROM {PROGRESS}')
+                return total
+            cursor.execute(
+                f'INSERT INTO {TABLE}(rowid, text) SELECT id, text '
+                f'FROM posts_post WHERE id > %s AND id <= %s',
+                [last_id, batch_last_id])
+            cursor.execute(
+                f'UPDATE {PROGRESS} SET last_id = %s', [batch_last_id])
+        last_id = batch_last_id
+        total += count
+        if progress is not None:
+            progress(total)
+
+
+def match_expression(query):
+    """Запрос пользователя как безопасное выражение MATCH для FTS5.
+
+    Каждое слово берётся в кавычки, так что операторы FTS5 в вводе
+    не работают; последнее слово ищется как префикс.
+    """
+    words = WORD.findall(query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search(query, queryset=None):
+    """Посты, подходящие под запрос, с релевантностью в поле ``rank``.
+
+    Чем меньше ``rank`` (bm25), тем выше пост в выдаче.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.annotate(rank=NO_RANK).none()
+    if not is_available():
+        return queryset.filter(text__icontains=query).annotate(rank=NO_RANK)
+    return queryset.extra(
+        tables=[TABLE],
+        where=[f'{TABLE}.rowid = posts_post.id', f'{TABLE} MATCH %s'],
+        params=[expression],
+    ).annotate(rank=RawSQL(f'{TABLE}.rank', (), output_field=FloatField()))
+
+
+def matching_ids(query):
+    """Подзапрос с id подходящих постов для фильтра ``id__in``."""
+    return RawSQL(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+        (match_expression(query),))
@@ -0,0 +1,139 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.db.models import F, OuterRef, Subquery
+from django.dispatch import receiver
+
+from . import feeds, thumbnails
+from .hot_feeds import registry as hot_feeds
+from .models import AuthorStats, Comment, Group, Post
+
+
+def invalidate(affected, counts=(), **change):
+    """Сменить поколения лент ``affected`` и поправить счётчики постов
+    ``counts`` (пары лента и прибавка) после фиксации транзакции.
+
+    Обработчики выполняются внутри atomic() из save(): смени поколение
+    до COMMIT, и другой воркер закэширует под ним прежние данные, а
+    счётчик после отката остался бы завышенным.
+    """
+    def bump():
+        for feed, delta in counts:
+            feeds.adjust_counts([feed], delta)
+        generations = feeds.bump_generations(affected)
+        # Без описания правки буферы лент просто перечитаются.
+        if change:
+            hot_feeds.apply(generations, **change)
+    transaction.on_commit(bump)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    instance._previous_group_id = None
+    instance._previous_image = ''
+    if instance.pk is not None and not raw:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image').first() or (None, ''))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    affected = feeds.post_feeds(instance)
+    counts = []
+    if created:
+        counts += [(feed, 1) for feed in affected]
+        AuthorStats.change(
+            instance.author_id,
+            post_count=F('post_count') + 1,
+            last_post_at=instance.pub_date,
+        )
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id not in (None, instance.group_id):
+        previous = feeds.group_feed(previous_group_id)
+        counts.append((previous, -1))
+        affected.append(previous)
+        if instance.group_id is not None:
+            counts.append((feeds.group_feed(instance.group_id), 1))
+    invalidate(affected, counts, post=instance)
+    image = instance.image.name
+    if image and image != getattr(instance, '_previous_image', ''):
+        thumbnails.schedule(image)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    affected = feeds.post_feeds(instance)
+    invalidate(
+        affected, [(feed, -1) for feed in affected], remove=instance.pk)
+    # Запись статистики здесь не создаётся: автор может удаляться
+    # вместе с постами, и новая строка нарушила бы внешний ключ.
+    last_post = Post.objects.filter(
+        author_id=OuterRef('author_id')).order_by('-pub_date')
+    AuthorStats.objects.filter(
+        author_id=instance.author_id, post_count__gt=0,
+    ).update(
+        post_count=F('post_count') - 1,
+        last_post_at=Subquery(last_post.values('pub_date')[:1]),
+    )
+
+
+def count_comments(post_id, author_id, delta):
+    """Новый счётчик комментариев после фиксации транзакции.
+
+    Общая лента и ленты групп ради счётчика не сбрасываются: в буферах
+    этого процесса он обновится сразу, в буферах других воркеров — при
+    их перечитывании, а страницы и их валидаторы меняются со сменой
+    окна кэша (page_cache.window). Сбрасывается только лента автора.
+    """
+    def update():
+        feeds.bump_generations([feeds.author_feed(author_id)])
+        hot_feeds.count_comments(post_id, delta)
+    transaction.on_commit(update)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.change(
+            instance.author_id, comment_count=F('comment_count') + 1)
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1)
+        count_comments(instance.post_id, instance.post.author_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    AuthorStats.objects.filter(
+        author_id=instance.author_id, comment_count__gt=0,
+    ).update(comment_count=F('comment_count') - 1)
+    posts = Post.objects.filter(pk=instance.post_id)
+    posts.filter(comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1)
+    author_id = posts.values_list('author_id', flat=True).first()
+    if author_id is not None:
+        count_comments(instance.post_id, author_id, -1)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    instance._author_ids = list(instance.posts.values_list(
+        'author_id', flat=True).order_by().distinct())
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    """Группа видна в ленте группы, а её ссылка — в общей и авторских."""
+    if raw:
+        return
+    author_ids = getattr(instance, '_author_ids', None)
+    if author_ids is None:
+        author_ids = instance.posts.values_list(
+            'author_id', flat=True).order_by().distinct()
+    invalidate(
+        [feeds.INDEX, feeds.group_feed(instance.pk)]
+        + [feeds.author_feed(author_id) for author_id in list(author_ids)]
+    )
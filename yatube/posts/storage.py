@@ -0,0 +1,33 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+
+def content_hash(content):
+    """SHA-256 файла, прочитанного порциями по ``chunks()``."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class HashedStorage(FileSystemStorage):
+    """Хранилище, в котором файл называется по хешу содержимого.
+
+    Одинаковые картинки, загруженные к разным постам, лежат на диске
+    один раз. Загрузка уже во временном файле (см.
+    FILE_UPLOAD_HANDLERS), поэтому хеш считается чтением с диска, а
+    сохранение сводится к переносу файла.
+    """
+
+    def save(self, name, content, max_length=None):
+        digest = content_hash(content)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, digest[:2], digest + extension)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,9 @@
+from jobs.queue import task
+
+from . import thumbnails
+
+
+@task(name=thumbnails.TASK, batch_size=20)
+def generate_thumbnails(payloads):
+    """Миниатюры пачки картинок с одним сбросом кэша их лент."""
+    thumbnails.generate(*{payload['image'] for payload in payloads})
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password')
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-')
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def add_rows(self, amount):
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.user,
+                 group=self.groups[i % len(self.groups)])
+            for i in range(amount))
+        posts = Post.objects.filter(text__startswith='Пост ')
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.user, text='Комментарий')
+            for post in posts)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк на странице."""
+        for url in ('/admin/posts/post/', '/admin/posts/comment/'):
+            with self.subTest(url=url):
+                Post.objects.all().delete()
+                self.add_rows(3)
+                few = self.count_queries(url)
+                self.add_rows(30)
+                self.assertEqual(self.count_queries(url), few)
+
+    def test_changelist_count_is_cached(self):
+        """Повторный показ списка не считает строки заново."""
+        self.add_rows(3)
+        self.client.get('/admin/posts/post/')
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get('/admin/posts/post/')
+        self.assertFalse([
+            query for query in captured
+            if 'COUNT(' in query['sql'] or 'MAX(' in query['sql']
+        ])
+
+    def test_editable_group_keeps_selection(self):
+        """Общий список групп не теряет выбранное значение строки."""
+        self.add_rows(1)
+        response = self.client.get('/admin/posts/post/')
+        self.assertContains(
+            response,
+            f'<option value="{self.groups[0].pk}" selected>Группа 0</option>')
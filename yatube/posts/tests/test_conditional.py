@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import commit_callbacks
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='conditional')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='conditional-group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.user, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+        self.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk})
+
+    def test_unchanged_feed_answers_304_without_queries(self):
+        """Неизменившаяся лента отвечает 304 без запросов к БД."""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                reverse('posts:index'),
+                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        """Ленту можно проверить и по Last-Modified."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        response = self.guest_client.get(url)
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_post_changes_feed_etag(self):
+        """После нового поста прежний ETag ленты не подходит."""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        etag = self.guest_client.get(url)['ETag']
+        with commit_callbacks():
+            self.author_client.post(
+                reverse('posts:post_create'), {'text': 'Новый пост'})
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый пост')
+
+    def test_etag_depends_on_user(self):
+        """Страница гостя и автора различаются и по ETag."""
+        url = reverse('posts:index')
+        self.assertNotEqual(self.guest_client.get(url)['ETag'],
+                            self.author_client.get(url)['ETag'])
+
+    def test_unchanged_post_answers_304(self):
+        """Страница поста отвечает 304 после одного запроса валидаторов."""
+        etag = self.guest_client.get(self.detail_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(
+                self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_post_changes_invalidate_etag(self):
+        """Новый комментарий и правка поста меняют его ETag."""
+        changes = (
+            lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'),
+            lambda: self.author_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+                {'text': 'Исправленный пост'}),
+        )
+        for change in changes:
+            etag = self.guest_client.get(self.detail_url)['ETag']
+            with commit_callbacks():
+                change()
+            response = self.guest_client.get(
+                self.detail_url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+    def test_missing_post_is_404(self):
+        """Для несуществующего поста валидаторов нет, ответ 404."""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': 10 ** 6}),
+            HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
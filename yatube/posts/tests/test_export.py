@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..exporter import Exporter
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(
+            username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Выгрузка', slug='export', description='Группа')
+        cls.post = Post.objects.create(
+            text='Пост в группе', author=cls.user, group=cls.group)
+        Post.objects.create(text='Пост без группы', author=cls.staff)
+        Comment.objects.create(
+            post=cls.post, author=cls.staff, text='Комментарий')
+
+    def setUp(self):
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def export(self, **params):
+        response = self.staff_client.get(reverse('posts:export'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_is_staff_only(self):
+        """Выгрузка доступна только сотрудникам."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('posts:export'))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(response.streaming)
+
+    def test_export_group_jsonl(self):
+        """В выгрузку группы попадают её посты и комментарии к ним."""
+        records = [json.loads(line) for line in
+                   self.export(group='export').splitlines()]
+        self.assertEqual([record['type'] for record in records],
+                         ['group', 'post', 'comment'])
+        self.assertEqual(records[1]['author'], 'writer')
+        self.assertEqual(records[1]['group'], 'export')
+        self.assertEqual(records[2]['post'], self.post.pk)
+
+    def test_export_csv(self):
+        """CSV содержит заголовок и по строке на запись."""
+        rows = list(csv.DictReader(io.StringIO(
+            self.export(format='csv', type='post'))))
+        self.assertEqual(
+            {row['text'] for row in rows if row['type'] == 'post'},
+            {'Пост в группе', 'Пост без группы'})
+
+    def test_lookups_are_batched(self):
+        """Авторы и группы подгружаются запросом на порцию, а не на строку."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.user) for i in range(8))
+        exporter = Exporter(kinds=('post',), chunk_size=5)
+        # Группы, посты, авторы и группы первой порции и авторы второй:
+        # во второй порции постов в группах нет.
+        with self.assertNumQueries(5):
+            self.assertEqual(len(list(exporter.records())), 11)
+
+    def test_command_output_can_be_imported(self):
+        """Выгрузка команды загружается обратно через import_posts."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dump.jsonl')
+            call_command('export_posts', path, stderr=io.StringIO())
+            Comment.objects.all().delete()
+            Post.objects.all().delete()
+            Group.objects.all().delete()
+            call_command('import_posts', path, stdout=io.StringIO())
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).group.slug, 'export')
+        self.assertEqual(Comment.objects.get().post_id, self.post.pk)
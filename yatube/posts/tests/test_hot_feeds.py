@@ -0,0 +1,171 @@
+import base64
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from yatube.settings import AMOUNT_POSTS
+
+from .. import feeds
+from ..hot_feeds import HotFeed, HotPaginator, registry
+from ..models import Comment, Group, Post
+from ..paginators import KeysetPaginator
+
+User = get_user_model()
+
+
+class HotFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='hot', first_name='Горячий', last_name='Автор')
+        cls.group = Group.objects.create(
+            title='Горячая группа', slug='hot', description='Описание')
+        for i in range(AMOUNT_POSTS * 3):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.user,
+                group=cls.group if i % 2 else None)
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.client = Client()
+
+    def test_first_pages_without_sql(self):
+        """Первые страницы общей ленты и ленты группы — без SQL."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                warm = self.client.get(url)
+                # Другой адрес — промах кэша страниц, но не буфера.
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, {'page': 1})
+                self.assertEqual(
+                    list(response.context['page_obj']),
+                    list(warm.context['page_obj']))
+                self.assertContains(response, 'Горячий Автор')
+
+    def test_tampered_cursor_returns_first_page(self):
+        """Курсор с датой без часового пояса или пустыми значениями
+        ведёт на первую страницу ленты из буфера.
+        """
+        payloads = (
+            ['next', 2, ['2020-01-01T00:00:00', 5]],
+            ['next', 2, [None, None]],
+        )
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+        )
+        for payload in payloads:
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(payload).encode()).decode().rstrip('=')
+            for url in urls:
+                with self.subTest(payload=payload, url=url):
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.context['page_obj'].number, 1)
+
+    def test_pages_match_database(self):
+        """Страницы по номеру и курсору совпадают со страницами из
+        базы, в том числе за пределами буфера.
+        """
+        queryset = Post.objects.select_related('author', 'group')
+        expected = KeysetPaginator(queryset, AMOUNT_POSTS)
+        hot = HotFeed(feeds.INDEX, Post.objects.all(), AMOUNT_POSTS + 5)
+        paginator = HotPaginator(queryset, AMOUNT_POSTS, feeds.INDEX, hot)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(cursor=pages[-1].next_cursor))
+        self.assertEqual(len(pages), 3)
+        for number, page in enumerate(pages, 1):
+            self.assertEqual(list(page), list(expected.get_page(number)))
+            self.assertEqual(
+                list(paginator.get_page(number)), list(page))
+            if page.has_previous():
+                self.assertEqual(
+                    list(paginator.get_page(cursor=page.previous_cursor)),
+                    list(pages[number - 2]))
+        self.assertFalse(pages[0].has_previous())
+
+    def test_other_worker_change_reloads(self):
+        """Смена поколения в другом процессе перечитывает буфер."""
+        hot = registry.index
+        hot.current()
+        Post.objects.filter(pk=Post.objects.latest('pub_date').pk).update(
+            text='Правка из другого воркера')
+        feeds.bump_generations([feeds.INDEX])
+        with self.assertNumQueries(1):
+            state = hot.current()
+        self.assertEqual(
+            hot.posts(state, 0, 1)[0].text, 'Правка из другого воркера')
+
+    def test_old_snapshot_is_reloaded(self):
+        """Снимок старше max_age перечитывается без смены поколения."""
+        hot = registry.index
+        state = hot.current()
+        Post.objects.filter(pk=Post.objects.latest('pub_date').pk).update(
+            text='Правка без смены поколения')
+        with self.assertNumQueries(0):
+            self.assertIs(hot.current(), state)
+        hot.state = state._replace(
+            loaded=time.monotonic() - hot.max_age - 1)
+        with self.assertNumQueries(1):
+            state = hot.current()
+        self.assertEqual(
+            hot.posts(state, 0, 1)[0].text, 'Правка без смены поколения')
+
+
+class HotFeedSignalsTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.user = User.objects.create_user(username='writer')
+        self.post = Post.objects.create(text='Первый', author=self.user)
+        self.hot = registry.index
+        self.hot.current()
+
+    def first(self):
+        with self.assertNumQueries(0):
+            return self.hot.posts(self.hot.current(), 0, 1)[0]
+
+    def test_signals_update_buffer(self):
+        """Новый пост, комментарий и удаление применяются без SQL."""
+        post = Post.objects.create(text='Второй', author=self.user)
+        self.assertEqual(self.first().pk, post.pk)
+        generation = feeds.feed_generation(feeds.INDEX)
+        Comment.objects.create(post=post, author=self.user, text='Да')
+        self.assertEqual(self.first().comment_count, 1)
+        # Счётчик поправлен на месте, лента не сброшена.
+        self.assertEqual(feeds.feed_generation(feeds.INDEX), generation)
+        post.delete()
+        self.assertEqual(self.first().pk, self.post.pk)
+
+    def test_generation_changes_after_commit(self):
+        """До COMMIT поколение прежнее: другой воркер, прочитавший
+        старые данные, не сохранит их под новым поколением.
+        """
+        generation = feeds.feed_generation(feeds.INDEX)
+        with transaction.atomic():
+            Post.objects.create(text='Второй', author=self.user)
+            self.assertEqual(feeds.feed_generation(feeds.INDEX), generation)
+        self.assertEqual(
+            feeds.feed_generation(feeds.INDEX), generation + 1)
+        self.assertEqual(self.first().text, 'Второй')
+
+    def test_rolled_back_post_is_not_shown(self):
+        with transaction.atomic():
+            Post.objects.create(text='Откатится', author=self.user)
+            transaction.set_rollback(True)
+        # Откат не меняет поколение: буфер остаётся действительным.
+        with self.assertNumQueries(0):
+            state = self.hot.current()
+        self.assertEqual(self.hot.posts(state, 0, 1)[0].pk, self.post.pk)
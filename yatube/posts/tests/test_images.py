@@ -0,0 +1,126 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail.base import ThumbnailBackend
+
+from jobs.models import Job
+from jobs.queue import Worker
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+THUMBNAIL_URL = settings.MEDIA_URL + 'cache/'
+
+
+def make_image(color='red', name='picture.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (600, 400), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+class PostImageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='painter')
+
+    def setUp(self):
+        # Свой каталог на каждый тест: файлы с одинаковым хешем и их
+        # миниатюры не переходят из теста в тест.
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def create_post(self, image):
+        self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'image': image})
+        return Post.objects.latest('id')
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом с именем по хешу."""
+        first = self.create_post(make_image(name='first.png'))
+        second = self.create_post(make_image(name='second.png'))
+        third = self.create_post(make_image('blue'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, third.image.name)
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(directory),
+                         [os.path.basename(first.image.name)])
+
+    def test_feed_does_not_wait_for_thumbnails(self):
+        """Пока миниатюры нет, лента выводится без неё, а задача на её
+        создание стоит в очереди один раз.
+        """
+        post = self.create_post(make_image())
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertNotContains(response, THUMBNAIL_URL)
+        self.assertEqual(
+            Job.objects.filter(
+                name=thumbnails.TASK, key=post.image.name).count(), 1)
+
+    def test_generated_thumbnails_reach_cached_pages(self):
+        """После работы воркера миниатюры появляются в уже
+        закэшированной ленте.
+        """
+        self.create_post(make_image())
+        self.create_post(make_image('blue'))
+        url = reverse('posts:index')
+        self.author_client.get(url)
+        self.assertEqual(Worker().run(burst=True), 2)
+        response = self.author_client.get(url)
+        self.assertContains(response, THUMBNAIL_URL, count=2)
+        self.assertContains(response, 'width="500"')
+
+    def test_pages_do_not_queue_thumbnails(self):
+        """Вывод ленты не ставит задач, а битая картинка остаётся
+        упавшей задачей и не возвращается в очередь.
+        """
+        post = self.create_post(make_image())
+        with open(post.image.path, 'wb') as file:
+            file.write(b'not an image')
+        self.assertEqual(Worker().run(burst=True), 1)
+        job = Job.objects.get(name=thumbnails.TASK)
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.key, post.image.name)
+        for _ in range(2):
+            cache.clear()
+            response = self.author_client.get(reverse('posts:index'))
+            self.assertNotContains(response, THUMBNAIL_URL)
+        self.assertFalse(Job.objects.filter(status=Job.QUEUED).exists())
+
+    def test_broken_image_does_not_fail_batch(self):
+        """Битая картинка не мешает миниатюрам остальных в пачке."""
+        broken = self.create_post(make_image())
+        good = self.create_post(make_image('blue'))
+        get_thumbnail = ThumbnailBackend.get_thumbnail
+
+        def raising(backend, file_, *args, **kwargs):
+            if file_.name == broken.image.name:
+                raise OSError('cannot identify image file')
+            return get_thumbnail(backend, file_, *args, **kwargs)
+
+        with mock.patch.object(ThumbnailBackend, 'get_thumbnail', raising):
+            with self.assertLogs('posts.thumbnails', 'ERROR'):
+                thumbnails.generate(broken.image.name, good.image.name)
+        self.assertEqual(
+            Job.objects.get(status=Job.FAILED).key, broken.image.name)
+        cache.clear()
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, THUMBNAIL_URL)
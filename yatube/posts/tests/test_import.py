@@ -0,0 +1,142 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+
+from core.testing import commit_callbacks
+
+from .. import feeds
+from ..models import AuthorStats, Comment, Group, Post
+
+User = get_user_model()
+
+
+class ImportPostsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def write_jsonl(self, records):
+        return self.write('data.jsonl', ''.join(
+            json.dumps(record, ensure_ascii=False) + '\n'
+            for record in records))
+
+    def run_import(self, path, *args):
+        out = StringIO()
+        call_command('import_posts', path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_jsonl(self):
+        """Группы, посты и комментарии загружаются пакетами с датами."""
+        path = self.write_jsonl([
+            {'type': 'group', 'title': 'Импорт', 'slug': 'import',
+             'description': 'Загруженная группа'},
+            {'type': 'post', 'id': 1000, 'text': 'Первый импорт',
+             'author': 'writer', 'group': 'import',
+             'pub_date': '2020-01-02T03:04:05+00:00'},
+            {'type': 'post', 'id': 1001, 'text': 'Второй импорт',
+             'author': 'writer'},
+            {'type': 'comment', 'post': 1000, 'author': 'writer',
+             'text': 'Импортный комментарий'},
+        ])
+        output = self.run_import(path, '--batch-size', '2')
+        self.assertIn('записей/с', output)
+        post = Post.objects.get(pk=1000)
+        self.assertEqual(post.group, Group.objects.get(slug='import'))
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertEqual(post.comment_count, 1)
+        stats = AuthorStats.objects.get(author=self.user)
+        self.assertEqual(stats.post_count, 2)
+        self.assertEqual(stats.comment_count, 1)
+
+    def test_counters_follow_each_batch(self):
+        """Счётчики лент, авторов и комментариев пересчитываются с
+        каждым пакетом, а не копятся до конца загрузки.
+        """
+        cache.clear()
+        feed = feeds.author_feed(self.user.pk)
+        self.assertEqual(feeds.feed_count(feed, self.user.posts.all()), 0)
+        records = [
+            {'type': 'post', 'id': 3000 + i, 'text': f'Пост {i}',
+             'author': 'writer'}
+            for i in range(3)
+        ]
+        records.append({'type': 'comment', 'post': 3000,
+                        'author': 'writer', 'text': 'Ответ'})
+        with commit_callbacks():
+            self.run_import(self.write_jsonl(records), '--batch-size', '2')
+        self.assertEqual(feeds.feed_count(feed, self.user.posts.all()), 3)
+        self.assertEqual(Post.objects.get(pk=3000).comment_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.user).post_count, 3)
+
+    def test_import_csv_with_new_users(self):
+        """CSV с новыми авторами загружается при --create-users."""
+        path = self.write(
+            'posts.csv', 'text,author\nПост из CSV,newcomer\n')
+        self.run_import(path, '--create-users')
+        self.assertEqual(
+            Post.objects.get(text='Пост из CSV').author.username,
+            'newcomer')
+
+    def test_non_object_record_is_reported(self):
+        """Строка JSONL, которая не объект, — понятная ошибка."""
+        path = self.write('bad.jsonl', '[1, 2]\n')
+        with self.assertRaisesMessage(
+                CommandError, 'Запись должна быть объектом'):
+            self.run_import(path)
+
+    def test_resume_after_failure(self):
+        """После ошибки загрузка продолжается с последнего пакета."""
+        records = [
+            {'id': 2000 + i, 'text': f'Пост {i}', 'author': 'writer'}
+            for i in range(4)
+        ]
+        records[3]['author'] = 'stranger'
+        path = self.write_jsonl(records)
+        with self.assertRaises(CommandError):
+            self.run_import(path, '--batch-size', '2')
+        self.assertEqual(Post.objects.count(), 2)
+        with open(path + '.checkpoint') as file:
+            self.assertEqual(file.read(), '2')
+        self.run_import(path, '--batch-size', '2', '--resume',
+                        '--create-users')
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+
+class ImportConstraintTest(TransactionTestCase):
+    def test_comment_to_missing_post_is_reported(self):
+        """Нарушение внешнего ключа при фиксации пакета завершает
+        загрузку ошибкой с номерами записей пакета.
+        """
+        User.objects.create_user(username='writer')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bad.jsonl')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(json.dumps({
+                    'type': 'comment', 'post': 999999,
+                    'author': 'writer', 'text': 'Ответ'}) + '\n')
+            with self.assertRaisesMessage(
+                    CommandError, 'Ошибка в записях 1–1'):
+                call_command('import_posts', path, stdout=StringIO())
+        self.assertFalse(Comment.objects.exists())
@@ -1,12 +1,12 @@
-from django.conf import settings
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
 from yatube.settings import AMOUNT_CHAR
 
-from ..models import Group, Post
-
-settings.DEBUG = True
+from ..models import AuthorStats, Comment, Group, Post
 
 
 User = get_user_model()
@@ -87,3 +87,80 @@ class GroupModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).verbose_name, expected_value)
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='stats')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_posts_and_comments(self):
+        """Счётчики автора меняются вместе с постами и комментариями."""
+        first = Post.objects.create(author=self.user, text='Первый')
+        last = Post.objects.create(author=self.user, text='Второй')
+        comment = Comment.objects.create(
+            post=first, author=self.reader, text='Комментарий')
+        stats = AuthorStats.objects.get(author=self.user)
+        self.assertEqual(stats.post_count, 2)
+        self.assertEqual(stats.last_post_at, last.pub_date)
+        self.assertEqual(self.reader.stats.comment_count, 1)
+        last.delete()
+        comment.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.post_count, 1)
+        self.assertEqual(stats.last_post_at, first.pub_date)
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.reader).comment_count, 0)
+
+    def test_rebuild_restores_counters(self):
+        """Пересчёт восстанавливает испорченную статистику."""
+        post = Post.objects.create(author=self.user, text='Пост')
+        Comment.objects.create(post=post, author=self.user, text='Ответ')
+        AuthorStats.objects.update(post_count=100, comment_count=100)
+        AuthorStats.rebuild()
+        stats = AuthorStats.objects.get(author=self.user)
+        self.assertEqual(stats.post_count, 1)
+        self.assertEqual(stats.comment_count, 1)
+        self.assertEqual(stats.last_post_at, post.pub_date)
+
+    def test_user_with_posts_can_be_deleted(self):
+        """Удаление автора вместе с постами не ломает статистику."""
+        # Свой автор: общий self.user нужен остальным тестам класса.
+        author = User.objects.create_user(username='leaving')
+        Post.objects.create(author=author, text='Пост')
+        author_id = author.pk
+        author.delete()
+        self.assertFalse(
+            AuthorStats.objects.filter(author_id=author_id).exists())
+
+
+class PostCommentCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='counted')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def test_counter_follows_comments(self):
+        """Счётчик поста меняется вместе с комментариями."""
+        comments = [
+            Comment.objects.create(
+                post=self.post, author=self.user, text=f'Ответ {number}')
+            for number in range(2)
+        ]
+        comments[0].delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_rebuild_command_fixes_counter(self):
+        """Сверка исправляет только разошедшиеся счётчики."""
+        Comment.objects.create(post=self.post, author=self.user, text='Ответ')
+        Post.objects.create(author=self.user, text='Без комментариев')
+        Post.objects.filter(pk=self.post.pk).update(comment_count=100)
+        out = StringIO()
+        call_command('rebuild_comment_counts', batch_size=1, stdout=out)
+        self.assertIn('Исправлено счётчиков: 1', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
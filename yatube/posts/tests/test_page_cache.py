@@ -0,0 +1,204 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import commit_callbacks
+
+from ..feeds import INDEX, bump_generations, feed_generation
+from ..models import Group, Post
+from ..page_cache import PAGE_TIMEOUT, cache_stats
+from ..templatetags.post_cards import card_key
+
+User = get_user_model()
+
+
+class FeedPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cached')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='cached-group',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.user, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def test_second_request_is_served_from_cache(self):
+        """Повторный запрос ленты отдаётся из кэша без запросов к БД."""
+        self.guest_client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(response['X-Feed-Cache'], 'hit')
+        self.assertEqual(cache_stats()['hits'], 1)
+        self.assertEqual(cache_stats()['misses'], 1)
+
+    def test_new_post_invalidates_its_feeds(self):
+        """Новый пост сбрасывает общую ленту, ленту группы и автора."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        with commit_callbacks():
+            self.author_client.post(
+                reverse('posts:post_create'),
+                {'text': 'Новый пост', 'group': self.group.pk})
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response['X-Feed-Cache'], 'miss')
+                self.assertContains(response, 'Новый пост')
+
+    def test_generation_changes_after_commit(self):
+        """Поколение ленты меняется только после фиксации транзакции."""
+        generation = feed_generation(INDEX)
+        with commit_callbacks():
+            Post.objects.create(text='Новый пост', author=self.user)
+            self.assertEqual(feed_generation(INDEX), generation)
+        self.assertEqual(feed_generation(INDEX), generation + 1)
+
+    def test_comment_resets_only_author_feed(self):
+        """Комментарий сбрасывает ленту автора поста, но не общую и не
+        ленту группы: счётчик в них обновится по сроку кэша.
+        """
+        shared = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+        )
+        profile = reverse('posts:profile', kwargs={'username': self.user})
+        for url in shared + (profile,):
+            self.assertContains(self.guest_client.get(url), 'Комментариев: 0')
+        with commit_callbacks():
+            self.author_client.post(
+                reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+                {'text': 'Комментарий'})
+        for url in shared:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response['X-Feed-Cache'], 'hit')
+        response = self.guest_client.get(profile)
+        self.assertEqual(response['X-Feed-Cache'], 'miss')
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_comment_count_catches_up_in_next_window(self):
+        """Старый ETag общей ленты перестаёт подходить со сменой окна
+        кэша, и клиент получает новый счётчик комментариев.
+        """
+        url = reverse('posts:index')
+        with mock.patch('posts.page_cache.window', return_value=0):
+            etag = self.guest_client.get(url)['ETag']
+            with commit_callbacks():
+                self.author_client.post(
+                    reverse('posts:add_comment',
+                            kwargs={'post_id': self.post.pk}),
+                    {'text': 'Комментарий'})
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+        with mock.patch(
+                'posts.page_cache.window', return_value=PAGE_TIMEOUT):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_edit_keeps_other_group_cached(self):
+        """Правка поста не трогает кэш чужой группы."""
+        url = reverse('posts:group_list',
+                      kwargs={'slug': self.other_group.slug})
+        self.guest_client.get(url)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Исправленный пост', 'group': self.group.pk})
+        self.assertEqual(self.guest_client.get(url)['X-Feed-Cache'], 'hit')
+
+    def test_moving_post_invalidates_previous_group(self):
+        """Перенос поста в другую группу сбрасывает кэш прежней."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.guest_client.get(url)
+        with commit_callbacks():
+            self.author_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+                {'text': self.post.text, 'group': self.other_group.pk})
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Feed-Cache'], 'miss')
+        self.assertNotContains(response, self.post.text)
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='cards')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def test_cards_are_taken_from_cache(self):
+        """Готовые карточки не отрисовываются заново."""
+        self.guest_client.get(reverse('posts:index'))
+        post = self.posts[0]
+        cache.set(card_key(post, True), 'Карточка из кэша')
+        bump_generations([INDEX])
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Карточка из кэша')
+        self.assertNotContains(response, 'Пост 0')
+        self.assertContains(response, '<hr>', count=2)
+
+    def test_post_edit_invalidates_card(self):
+        """Правка поста через post_edit даёт новую карточку."""
+        post = self.posts[1]
+        self.guest_client.get(reverse('posts:index'))
+        old_key = card_key(Post.objects.get(pk=post.pk), True)
+        with commit_callbacks():
+            self.author_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+                {'text': 'Исправленный пост'})
+        self.assertNotEqual(
+            card_key(Post.objects.get(pk=post.pk), True), old_key)
+        self.assertContains(
+            self.guest_client.get(reverse('posts:index')),
+            'Исправленный пост')
+
+    def test_group_rename_invalidates_card(self):
+        """Новый слаг группы и имя автора попадают в карточку."""
+        group = Group.objects.create(title='Старая', slug='old-slug')
+        # Свой автор: переименование общего self.user осталось бы в
+        # памяти после отката и сбило бы ключи карточек других тестов.
+        author = User.objects.create_user(username='renamed')
+        Post.objects.create(text='Пост группы', author=author, group=group)
+        self.assertContains(
+            self.guest_client.get(reverse('posts:index')), '/group/old-slug/')
+        group.slug = 'new-slug'
+        author.first_name = 'Новое'
+        author.last_name = 'Имя'
+        author.save()
+        with commit_callbacks():
+            group.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, '/group/new-slug/')
+        self.assertNotContains(response, '/group/old-slug/')
+        self.assertContains(response, 'Новое Имя')
@@ -0,0 +1,183 @@
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.db import transaction
+from django.urls import reverse
+
+from core.testing import commit_callbacks
+from yatube.settings import AMOUNT_POSTS, PAG_TEST_AMOUNT
+
+from .. import feeds
+from ..models import Post
+from ..paginators import KeysetPaginator
+
+User = get_user_model()
+
+
+def encode(payload):
+    """Курсор из произвольных значений, как его подделал бы клиент."""
+    return base64.urlsafe_b64encode(
+        json.dumps(payload).encode()).decode().rstrip('=')
+
+
+class KeysetPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='keyset')
+        for i in range(PAG_TEST_AMOUNT):
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.paginator = KeysetPaginator(Post.objects.all(), AMOUNT_POSTS)
+
+    def test_cursor_pages_match_offset_pages(self):
+        """Страницы по курсору совпадают со страницами по номеру."""
+        first = self.paginator.get_page()
+        second = self.paginator.get_page(cursor=first.next_cursor)
+        self.assertEqual(list(second), list(self.paginator.get_page(2)))
+        self.assertEqual(second.number, 2)
+        self.assertFalse(second.has_next())
+        back = self.paginator.get_page(cursor=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_new_posts_do_not_shift_cursor_page(self):
+        """Новые посты не сдвигают уже открытую следующую страницу."""
+        first = self.paginator.get_page()
+        expected = list(self.paginator.get_page(cursor=first.next_cursor))
+        Post.objects.create(text='Свежий пост', author=self.user)
+        self.assertEqual(
+            list(self.paginator.get_page(cursor=first.next_cursor)),
+            expected)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор ведёт на первую страницу."""
+        page = self.paginator.get_page(cursor='not-a-cursor')
+        self.assertEqual(page.number, 1)
+        self.assertEqual(len(page), AMOUNT_POSTS)
+
+    def test_cursor_without_values_returns_first_page(self):
+        """Курсор с пустыми значениями, датой без часового пояса или
+        числами за пределами 64 бит ведёт на первую страницу, а не к
+        ошибке сервера.
+        """
+        payloads = (
+            ['next', 2, [None, None]],
+            ['next', 2, ['2020-01-01T00:00:00', 5]],
+            ['next', float('inf'), ['2020-01-01T00:00:00+00:00', 5]],
+            ['next', 2, ['2020-01-01T00:00:00+00:00', 1e23]],
+            ['next', 2, ['2020-01-01T00:00:00+00:00', 2 ** 63]],
+        )
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                cursor = encode(payload)
+                page = self.paginator.get_page(cursor=cursor)
+                self.assertEqual(page.number, 1)
+                self.assertEqual(len(page), AMOUNT_POSTS)
+                post_id = Post.objects.latest('pk').pk
+                requests = (
+                    (reverse('posts:profile', args=[self.user.username]),
+                     {'cursor': cursor}),
+                    (reverse('posts:post_detail', args=[post_id]),
+                     {'comments': cursor}),
+                    (reverse('posts:post_comments', args=[post_id]),
+                     {'cursor': cursor}),
+                )
+                for url, data in requests:
+                    response = self.guest_client.get(url, data)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_huge_page_number_returns_last_page(self):
+        """Номер страницы за пределами 64 бит ведёт на последнюю."""
+        response = self.guest_client.get(
+            reverse('posts:profile', args=[self.user.username]),
+            {'page': 2 ** 63 - 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].number,
+                         response.context['page_obj'].paginator.num_pages)
+
+    def test_view_follows_next_cursor(self):
+        """Ссылка «Следующая» в ленте ведёт на вторую страницу."""
+        response = self.guest_client.get(reverse('posts:index'))
+        cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, f'?cursor={cursor}')
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': cursor})
+        self.assertEqual(len(response.context['page_obj']),
+                         PAG_TEST_AMOUNT - AMOUNT_POSTS)
+
+    def test_feed_count_is_cached(self):
+        """Повторный запрос ленты обходится без COUNT(*), а страница
+        из буфера общей ленты — и вовсе без SQL.
+        """
+        self.guest_client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                reverse('posts:index'), {'page': 2})
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         PAG_TEST_AMOUNT)
+
+    def test_feed_count_follows_new_posts(self):
+        """Новый пост увеличивает закэшированные счётчики лент."""
+        feed = feeds.author_feed(self.user.pk)
+        feeds.feed_count(feed, self.user.posts.all())
+        with commit_callbacks():
+            Post.objects.create(text='Ещё пост', author=self.user)
+            self.assertEqual(cache.get(feeds.count_key(feed)),
+                             PAG_TEST_AMOUNT)
+        self.assertEqual(cache.get(feeds.count_key(feed)),
+                         PAG_TEST_AMOUNT + 1)
+
+    def test_rolled_back_post_keeps_count(self):
+        """Откаченный пост не меняет счётчик ленты."""
+        feed = feeds.author_feed(self.user.pk)
+        feeds.feed_count(feed, self.user.posts.all())
+        with commit_callbacks():
+            with transaction.atomic():
+                Post.objects.create(text='Откатится', author=self.user)
+                transaction.set_rollback(True)
+        self.assertEqual(cache.get(feeds.count_key(feed)), PAG_TEST_AMOUNT)
+
+    def test_too_high_count_is_recounted(self):
+        """Страница за концом ленты при завышенном счётчике ведёт на
+        настоящую последнюю и исправляет счётчик.
+        """
+        feed = feeds.author_feed(self.user.pk)
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        for number in (3, 'last'):
+            with self.subTest(page=number):
+                cache.set(
+                    feeds.count_key(feed), PAG_TEST_AMOUNT + 2 * AMOUNT_POSTS)
+                page_obj = self.guest_client.get(
+                    url, {'page': number}).context['page_obj']
+                self.assertEqual(page_obj.number, 2)
+                self.assertEqual(
+                    len(page_obj), PAG_TEST_AMOUNT - AMOUNT_POSTS)
+                self.assertFalse(page_obj.has_next())
+                self.assertEqual(
+                    cache.get(feeds.count_key(feed)), PAG_TEST_AMOUNT)
+
+    def test_too_high_count_on_hot_feed(self):
+        """То же для общей ленты, которая отдаётся из буфера."""
+        cache.set(feeds.count_key(feeds.INDEX), PAG_TEST_AMOUNT + 1)
+        page_obj = self.guest_client.get(
+            reverse('posts:index'), {'page': 3}).context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj), PAG_TEST_AMOUNT - AMOUNT_POSTS)
+        self.assertEqual(
+            cache.get(feeds.count_key(feeds.INDEX)), PAG_TEST_AMOUNT)
+
+    def test_last_page_link(self):
+        """Ссылка «Последняя» открывает последнюю страницу."""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'page': 'last'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj), PAG_TEST_AMOUNT - AMOUNT_POSTS)
+        self.assertFalse(page_obj.has_next())
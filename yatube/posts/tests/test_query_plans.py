@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.query_plans import QueryPlanMixin
+from yatube.settings import AMOUNT_POSTS
+
+from .. import feeds
+from ..hot_feeds import HotFeed, HotPaginator, registry
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueryPlanTest(QueryPlanMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='planner')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='plans',
+            description='Тестовое описание',
+        )
+        for i in range(AMOUNT_POSTS + 2):
+            post = Post.objects.create(
+                text=f'Пост {i}', author=cls.user, group=cls.group)
+            Comment.objects.create(post=post, author=cls.user, text='Ответ')
+        cls.post = post
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_views_use_indexes(self):
+        """Запросы всех страниц постов обходятся без полного скана."""
+        post_id = {'post_id': self.post.pk}
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs=post_id),
+            reverse('posts:post_comments', kwargs=post_id),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.assertIndexedQueries(self.client.get, url)
+                cursor = getattr(
+                    response.context.get('page_obj'), 'next_cursor', None)
+                if cursor:
+                    self.assertIndexedQueries(
+                        self.client.get, url, {'cursor': cursor})
+
+    def test_hot_feeds_use_indexes(self):
+        """Чтение буферов лент и запросы мимо неполного буфера идут
+        по индексам: первые страницы общей ленты SQL не делают, и
+        проверка вьюх этих запросов не видит.
+        """
+        registry.reset()
+        hot_feeds = (
+            (feeds.INDEX, Post.objects.all(), registry.index),
+            (feeds.group_feed(self.group.pk), self.group.posts.all(),
+             registry.group(self.group.pk)),
+        )
+        for feed, queryset, hot in hot_feeds:
+            with self.subTest(feed=feed):
+                self.assertIndexedQueries(hot.current)
+                # Буфер меньше ленты: дальние страницы идут в базу.
+                small = HotFeed(feed, queryset, 2)
+                paginator = HotPaginator(
+                    queryset.select_related('author', 'group'),
+                    AMOUNT_POSTS, feed, small)
+                page = self.assertIndexedQueries(paginator.get_page, 2)
+                self.assertEqual(len(page), 2)
+                first = paginator.get_page(1)
+                self.assertIndexedQueries(
+                    paginator.get_page, cursor=first.next_cursor)
+                self.assertIndexedQueries(paginator.get_page, 'last')
+
+    def test_forms_scan_only_groups(self):
+        """Формы постов читают целиком только список групп."""
+        urls = (
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            reverse('posts:post_create'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIndexedQueries(
+                    self.client.get, url, allowed_tables=('posts_group',))
+
+    def test_comment_and_post_writes_use_indexes(self):
+        """Запись поста и комментария не читает таблицы целиком."""
+        self.assertIndexedQueries(
+            self.client.post,
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Новый комментарий'})
+        self.assertIndexedQueries(
+            self.client.post, reverse('posts:post_create'),
+            {'text': 'Новый пост', 'group': self.group.pk})
+        self.assertIndexedQueries(Post.objects.get(pk=self.post.pk).delete)
@@ -0,0 +1,170 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from yatube.settings import AMOUNT_POSTS
+
+from .. import search
+from ..models import Post
+
+User = get_user_model()
+
+
+class PostSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username='searcher', email='searcher@example.com',
+            password='password')
+        cls.best = Post.objects.create(
+            text='Кошки, кошки и ещё раз кошки', author=cls.user)
+        cls.other = Post.objects.create(
+            text='Пост про кошку и собаку', author=cls.user)
+        Post.objects.create(text='Совсем про другое', author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_results(self, query):
+        response = self.guest_client.get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_search_is_ranked(self):
+        """Самый релевантный пост идёт первым."""
+        self.assertEqual(self.get_results('кошки'), [self.best])
+
+    def test_prefix_search(self):
+        """Последнее слово запроса ищется по префиксу."""
+        self.assertEqual(
+            set(self.get_results('кош')), {self.best, self.other})
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        self.other.text = 'Теперь про попугаев'
+        self.other.save()
+        self.assertEqual(self.get_results('попугаев'), [self.other])
+        Post.objects.get(pk=self.other.pk).delete()
+        self.assertEqual(self.get_results('попугаев'), [])
+
+    def test_operators_in_query_are_ignored(self):
+        """Спецсимволы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(self.get_results('"кошки* ('), [self.best])
+        self.assertEqual(self.get_results('!!!'), [])
+
+    def test_results_are_paginated_by_cursor(self):
+        """Выдача листается курсором с сохранением запроса."""
+        Post.objects.bulk_create(
+            Post(text=f'Кролик номер {i}', author=self.user)
+            for i in range(AMOUNT_POSTS + 1))
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'кролик'})
+        page_obj = response.context['page_obj']
+        self.assertContains(
+            response, urlencode({'q': 'кролик'}) + '&amp;cursor=')
+        response = self.guest_client.get(
+            reverse('posts:search'),
+            {'q': 'кролик', 'cursor': page_obj.next_cursor})
+        self.assertEqual(len(response.context['page_obj']), 1)
+        self.assertNotIn(response.context['page_obj'][0], page_obj)
+
+    def test_reindex_command(self):
+        """Команда перестраивает индекс и сообщает о ходе работы."""
+        with connection.cursor() as cursor:
+            search.drop_triggers(cursor)
+            Post.objects.create(text='Без индекса ёжик', author=self.user)
+            search.create_triggers(cursor)
+        self.assertEqual(self.get_results('ёжик'), [])
+        stdout = io.StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=stdout)
+        self.assertEqual(len(self.get_results('ёжик')), 1)
+        self.assertIn('Проиндексировано постов: 2', stdout.getvalue())
+        self.assertIn(
+            f'Индекс перестроен, постов: {Post.objects.count()}',
+            stdout.getvalue())
+
+    def test_triggers_return_after_migrate(self):
+        """Триггеры поиска, пропавшие вместе с таблицей постов,
+        создаются снова после миграций.
+        """
+        with connection.cursor() as cursor:
+            search.drop_triggers(cursor)
+        emit_post_migrate_signal(0, False, 'default')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            names = {row[0] for row in cursor.fetchall()}
+        self.assertLessEqual(set(search.TRIGGERS), names)
+        Post.objects.create(text='После миграции ёжик', author=self.user)
+        self.assertEqual(len(self.get_results('ёжик')), 1)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит посты через индекс."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get('/admin/posts/post/', {'q': 'собаку'})
+        self.assertEqual(
+            list(response.context['cl'].queryset), [self.other])
+
+
+def index_state():
+    """Словарь индекса и его счётчики для bm25: должны совпадать с
+    индексом, построенным заново.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS temp.vocab '
+            f"USING fts5vocab(main, {search.TABLE}, 'instance')")
+        cursor.execute('SELECT * FROM temp.vocab ORDER BY 1, 2, 3, 4')
+        vocab = cursor.fetchall()
+        cursor.execute(f'SELECT block FROM {search.TABLE}_data WHERE id = 1')
+        averages = cursor.fetchone()
+        cursor.execute(
+            f'SELECT id, sz FROM {search.TABLE}_docsize ORDER BY id')
+        return vocab, averages, cursor.fetchall()
+
+
+class ReindexTransactionTest(TransactionTestCase):
+    def test_writes_between_batches_keep_index_consistent(self):
+        """Каждая порция фиксируется отдельно, а правки постов между
+        порциями не портят индекс.
+        """
+        user = User.objects.create_user(username='indexer')
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=user)
+            for i in range(5)
+        ]
+        edits = []
+
+        def write_between_batches(total):
+            if edits:
+                return
+            edits.append(total)
+            Post.objects.filter(pk=posts[0].pk).update(text='Первый ёжик')
+            posts[1].delete()
+            Post.objects.filter(pk=posts[3].pk).update(text='Дальний ёжик')
+            Post.objects.create(text='Новый ёжик', author=user)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(
+                search.reindex(batch_size=2, progress=write_between_batches),
+                6)
+        begins = [query['sql'] for query in captured.captured_queries
+                  if query['sql'] == 'BEGIN IMMEDIATE']
+        self.assertGreater(len(begins), 2)
+        state = index_state()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {search.TABLE}({search.TABLE}) "
+                f"VALUES ('rebuild')")
+        self.assertEqual(state, index_state())
+        self.assertEqual(
+            sorted(search.search('ёжик').values_list('text', flat=True)),
+            ['Дальний ёжик', 'Новый ёжик', 'Первый ёжик'])
@@ -1,14 +1,12 @@
 from django import forms
-from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from yatube.settings import AMOUNT_POSTS, PAG_TEST_AMOUNT
+from yatube.settings import AMOUNT_COMMENTS, AMOUNT_POSTS, PAG_TEST_AMOUNT
 
-from ..models import Group, Post
-
-settings.DEBUG = True
+from ..models import Comment, Group, Post
 
 
 User = get_user_model()
@@ -31,6 +29,7 @@ class PostURLTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -138,6 +137,7 @@ class PaginatorViewsTest(TestCase):
             ))
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_first_page_contains_ten_records(self):
@@ -169,3 +169,57 @@ class PaginatorViewsTest(TestCase):
                 response = self.guest_client.get(page + '?page=2')
                 self.assertEqual(len(response.context.get(
                     'page_obj')), PAG_TEST_AMOUNT - AMOUNT_POSTS)
+
+
+class CommentsViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commentator')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(AMOUNT_COMMENTS + 5)
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_comments_loaded_without_per_comment_queries(self):
+        """Комментарии и их авторы загружаются одним запросом."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        # Валидаторы для условного GET, пост и комментарии.
+        with self.assertNumQueries(3):
+            response = self.guest_client.get(url)
+        self.assertEqual(len(response.context['comments']), AMOUNT_COMMENTS)
+        self.assertTrue(response.context['comments'].has_next())
+
+    def test_load_more_fragment(self):
+        """Фрагмент «Показать ещё» отдаёт оставшиеся комментарии."""
+        response = self.guest_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}))
+        cursor = response.context['comments'].next_cursor
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'cursor': cursor})
+        self.assertTemplateUsed(response, 'includes/comments.html')
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_comments_of_missing_post_are_404(self):
+        """Подгрузка комментариев несуществующего поста отвечает 404."""
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 10 ** 6}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_ajax_comment_returns_fragment(self):
+        """AJAX-комментарий возвращает только свой фрагмент."""
+        response = self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Свежий комментарий'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 201)
+        self.assertTemplateUsed(response, 'includes/comment.html')
+        self.assertContains(response, 'Свежий комментарий', status_code=201)
@@ -0,0 +1,92 @@
+import logging
+import traceback
+
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings, settings
+from sorl.thumbnail.images import ImageFile
+
+from jobs.queue import enqueue, fail
+
+from . import feeds
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+TASK = 'posts.thumbnails'
+# Все размеры, которые выводят шаблоны: карточка в ленте и страница
+# поста — 500x500, превью в общей ленте — 100x100.
+SIZES = (
+    ('100x100', {'crop': 'center'}),
+    ('500x500', {'crop': 'center'}),
+)
+
+
+def schedule(name):
+    """Поставить создание миниатюр картинки в очередь фоновых задач."""
+    enqueue(TASK, key=name, image=name)
+
+
+def generate(*names):
+    """Создать все миниатюры картинок и сбросить кэш их карточек.
+
+    Карточки и страницы лент могли сохраниться без картинки, пока
+    миниатюр не было, поэтому у постов с ней обновляется ``modified``
+    и поколения их лент. Картинка, для которой миниатюра не
+    получилась, записывается упавшей задачей и не мешает остальным
+    картинкам пачки: sorl то бросает исключение на испорченный файл,
+    то молча не сохраняет миниатюру.
+    """
+    backend = ThumbnailBackend()
+    ready = []
+    for name in names:
+        error = make_thumbnails(backend, name)
+        if error is None:
+            ready.append(name)
+        else:
+            fail(TASK, error, key=name, image=name)
+    posts = Post.objects.filter(image__in=ready)
+    affected = set()
+    for post in posts.only('author_id', 'group_id'):
+        affected.update(feeds.post_feeds(post))
+    posts.update(modified=timezone.now())
+    feeds.bump_generations(affected)
+
+
+def make_thumbnails(backend, name):
+    """Миниатюры всех размеров картинки; текст ошибки или None."""
+    source = Post(image=name).image
+    for geometry, options in SIZES:
+        try:
+            thumbnail = backend.get_thumbnail(source, geometry, **options)
+        except Exception:
+            logger.exception('Миниатюра %s для %s', geometry, name)
+            return traceback.format_exc()
+        if default.kvstore.get(thumbnail) is None:
+            return f'Не удалось создать миниатюру {geometry}'
+    return None
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    """Бэкенд для шаблонов: отдаёт только готовые миниатюры.
+
+    Если миниатюры ещё нет, шаблон выводит пост без картинки, так
+    что запрос не ждёт обработки изображения. Генерацию ставит в
+    очередь сохранение поста, а не чтение: страницы не пишут в базу,
+    и битая картинка не попадает в очередь при каждом выводе.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        # Имя файла строится так же, как в ThumbnailBackend.get_thumbnail.
+        if settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
@@ -1,77 +1,182 @@
-
-# from django.views.decorators.cache import cache_page
-from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db.models import OuterRef, Subquery
+from django.http import (Http404, HttpResponseBadRequest,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.http import urlencode
 
-from yatube.settings import AMOUNT_POSTS
+from yatube.settings import AMOUNT_COMMENTS, AMOUNT_POSTS
 
+from . import exporter, feeds, search as post_search
+from .conditional import make_etag, not_modified, set_validators
 from .forms import CommentForm, PostForm
+from .hot_feeds import HotPaginator, registry as hot_feeds
 from .models import Comment, Group, Post, User
-
-settings.DEBUG = True
+from .page_cache import cached_render
+from .paginators import KeysetPaginator
+
+
+def get_context(queryset, request, feed, hot=None):
+    if hot is None:
+        paginator = KeysetPaginator(queryset, AMOUNT_POSTS, feed=feed)
+    else:
+        # Первые страницы берутся из буфера процесса без SQL.
+        paginator = HotPaginator(queryset, AMOUNT_POSTS, feed, hot)
+    page_obj = paginator.get_page(
+        request.GET.get('page'), cursor=request.GET.get('cursor'))
+    return page_obj
 
 
-def get_context(queryset, page_number):
-    paginator = Paginator(queryset, AMOUNT_POSTS)
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+def get_comments(post_id, cursor):
+    paginator = KeysetPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        AMOUNT_COMMENTS, keys=('-created', '-id'))
+    return paginator.get_page(cursor=cursor)
 
 
-# @cache_page(AMOUNT_SECONDS * index_page)
 def index(request):
-    page_number = request.GET.get('page')
-    page_obj = get_context(Post.objects.select_related(
-        'author', 'group').all(), page_number)
-    context = {
-        'page_obj': page_obj,
-    }
-    return render(request, 'posts/index.html', context)
+    def get_page_context():
+        page_obj = get_context(Post.objects.select_related(
+            'author', 'group').all(), request, feeds.INDEX, hot_feeds.index)
+        return {
+            'page_obj': page_obj,
+        }
+    return cached_render(
+        request, feeds.INDEX, 'posts/index.html', get_page_context)
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author').all()
-    paginator = Paginator(post_list, AMOUNT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {
-        'group': group,
-        'page_obj': page_obj
-    }
-    return render(request, 'posts/group_list.html', context)
+    group = hot_feeds.group_by_slug(slug) or get_object_or_404(
+        Group, slug=slug)
+    feed = feeds.group_feed(group.pk)
+
+    def get_page_context():
+        post_list = group.posts.select_related('author').all()
+        page_obj = get_context(
+            post_list, request, feed, hot_feeds.group(group.pk))
+        return {
+            'group': group,
+            'page_obj': page_obj
+        }
+    return cached_render(
+        request, feed, 'posts/group_list.html', get_page_context)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post = author.posts.select_related('author').all()
-    paginator = Paginator(post, AMOUNT_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    feed = feeds.author_feed(author.pk)
+
+    def get_page_context():
+        post = author.posts.select_related('author', 'group').all()
+        page_obj = get_context(post, request, feed)
+        return {
+            'author': author,
+            'page_obj': page_obj,
+        }
+    return cached_render(
+        request, feed, 'posts/profile.html', get_page_context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = KeysetPaginator(
+        post_search.search(query).select_related('author', 'group'),
+        AMOUNT_POSTS, keys=('rank', 'id'))
     context = {
-        'author': author,
-        'page_obj': page_obj,
+        'query': query,
+        'page_obj': paginator.get_page(cursor=request.GET.get('cursor')),
+        'extra_query': urlencode({'q': query}) + '&',
     }
-    return render(request, 'posts/profile.html', context)
+    return render(request, 'posts/search.html', context)
+
+
+def post_validators(request, post_id):
+    """ETag и Last-Modified страницы поста одним запросом по индексам.
+
+    Правки поста и счётчика постов автора отражаются в поколении ленты
+    автора, комментарии — во времени последнего и их числе, которое
+    хранится в строке поста.
+    """
+    last_comment = Comment.objects.filter(post=OuterRef('pk')).order_by(
+        '-created').values('created')[:1]
+    row = Post.objects.filter(pk=post_id).values(
+        'author_id', 'pub_date', 'comment_count',
+    ).annotate(last_comment=Subquery(last_comment)).first()
+    if row is None:
+        return None
+    feed = feeds.author_feed(row['author_id'])
+    etag = make_etag(
+        'post', post_id, feeds.feed_generation(feed), row['last_comment'],
+        row['comment_count'], request.user.pk or 0, request.get_full_path())
+    moments = (row['pub_date'], row['last_comment'])
+    last_modified = max([feeds.feed_modified(feed)] + [
+        int(moment.timestamp()) for moment in moments if moment is not None])
+    return etag, last_modified
 
 
 def post_detail(request, post_id):
+    validators = post_validators(request, post_id)
+    if validators is not None:
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
     post = get_object_or_404(
-        Post.objects.select_related('group'), pk=post_id)
+        Post.objects.select_related('author__stats', 'group'), pk=post_id)
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post=post)
+    comments = get_comments(post.pk, request.GET.get('comments'))
     context = {
         'post': post,
         'form': form,
         'comments': comments,
     }
-    return render(request, 'posts/post_detail.html', context)
+    response = render(request, 'posts/post_detail.html', context)
+    if validators is not None:
+        set_validators(response, *validators)
+    return response
+
+
+def post_comments(request, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё»."""
+    comments = get_comments(post_id, request.GET.get('cursor'))
+    # Пост проверяется, только если порция пуста: обычная подгрузка
+    # обходится одним запросом.
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404('Пост не найден')
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'includes/comments.html', context)
+
+
+@staff_member_required
+def export(request):
+    """Выгрузка постов и комментариев, отдаётся по мере чтения из базы.
+
+    Параметры: ``group`` (слаг), ``author`` (имя), ``type`` (post или
+    comment, по умолчанию оба) и ``format`` (jsonl или csv).
+    """
+    group = author = None
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+    if request.GET.get('author'):
+        author = get_object_or_404(User, username=request.GET['author'])
+    kinds = request.GET.getlist('type') or ('post', 'comment')
+    fmt = 'csv' if request.GET.get('format') == 'csv' else 'jsonl'
+    records = exporter.Exporter(group, author, kinds).records()
+    response = StreamingHttpResponse(
+        exporter.render(records, fmt),
+        content_type=exporter.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = (
+        f'attachment; filename="posts.{fmt}"')
+    return response
 
 
 @login_required
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
@@ -96,6 +201,7 @@ def post_edit(request, post_id):
     context = {
         'form': form,
         'is_edit': True,
+        'post': post,
     }
     return render(request, 'posts/create_post.html', context)
 
@@ -109,4 +215,9 @@ def add_comment(request, post_id):
         comment.author = request.user
         comment.post = post
         comment.save()
+        if request.is_ajax():
+            return render(request, 'includes/comment.html',
+                          {'comment': comment}, status=201)
+    elif request.is_ajax():
+        return HttpResponseBadRequest()
     return redirect('posts:post_detail', post_id=post_id)
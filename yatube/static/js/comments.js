@@ -0,0 +1,40 @@
+(function () {
+  var list = document.getElementById('comments');
+  var form = document.getElementById('comment-form');
+  if (!list) {
+    return;
+  }
+  var headers = {'X-Requested-With': 'XMLHttpRequest'};
+
+  list.addEventListener('click', function (event) {
+    var link = event.target.closest('[data-comments-more]');
+    if (!link) {
+      return;
+    }
+    event.preventDefault();
+    fetch(link.dataset.fragment, {headers: headers})
+      .then(function (response) { return response.text(); })
+      .then(function (html) { link.outerHTML = html; });
+  });
+
+  if (form) {
+    form.addEventListener('submit', function (event) {
+      event.preventDefault();
+      fetch(form.action, {
+        method: 'POST',
+        headers: headers,
+        body: new FormData(form),
+        credentials: 'same-origin'
+      }).then(function (response) {
+        if (response.status !== 201) {
+          form.submit();
+          return;
+        }
+        return response.text().then(function (html) {
+          list.insertAdjacentHTML('afterbegin', html);
+          form.reset();
+        });
+      });
+    });
+  }
+})();
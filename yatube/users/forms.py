@@ -1,6 +1,9 @@
-from django.contrib.auth.forms import UserCreationForm, PasswordChangeForm
+from django.contrib.auth.forms import (UserCreationForm, PasswordChangeForm,
+                                       PasswordResetForm)
 from django.contrib.auth import get_user_model
 
+from .tasks import send_password_reset
+
 
 User = get_user_model()
 
@@ -15,3 +18,26 @@ class ChangeForm(PasswordChangeForm):
     class Meta(PasswordChangeForm):
         model = User
         fields = ('old_password', 'new_password1', 'new_password2')
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Письмо со ссылкой собирает и отправляет воркер.
+
+    В очередь попадают только номер пользователя и адрес сайта: токен
+    сброса создаётся при отправке и в таблице задач не хранится.
+    """
+
+    def send_mail(self, subject_template_name, email_template_name,
+                  context, from_email, to_email,
+                  html_email_template_name=None):
+        send_password_reset.enqueue(
+            user_id=context['user'].pk,
+            email=to_email,
+            domain=context['domain'],
+            site_name=context['site_name'],
+            protocol=context['protocol'],
+            subject_template_name=subject_template_name,
+            email_template_name=email_template_name,
+            html_email_template_name=html_email_template_name,
+            from_email=from_email,
+        )
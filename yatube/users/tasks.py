@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template import loader
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from jobs.queue import task
+
+User = get_user_model()
+
+
+def build_email(subject, body, from_email, to, html=''):
+    email = EmailMultiAlternatives(subject, body, from_email, to)
+    if html:
+        email.attach_alternative(html, 'text/html')
+    return email
+
+
+@task(priority=10, batch_size=50)
+def send_password_reset(requests):
+    """Отправить письма сброса пароля через одно соединение.
+
+    Ссылка с токеном собирается здесь, а в задаче лежит только номер
+    пользователя: упавшие задачи хранятся и видны в админке, и
+    действующей ссылки в них быть не должно.
+    """
+    users = User.objects.in_bulk(
+        [request['user_id'] for request in requests])
+    emails = []
+    for request in requests:
+        user = users.get(request['user_id'])
+        if user is None or not user.is_active:
+            continue
+        context = {
+            'email': request['email'],
+            'domain': request['domain'],
+            'site_name': request['site_name'],
+            'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+            'user': user,
+            'token': default_token_generator.make_token(user),
+            'protocol': request['protocol'],
+        }
+        subject = loader.render_to_string(
+            request['subject_template_name'], context)
+        html = ''
+        if request['html_email_template_name'] is not None:
+            html = loader.render_to_string(
+                request['html_email_template_name'], context)
+        emails.append(build_email(
+            ''.join(subject.splitlines()),
+            loader.render_to_string(request['email_template_name'], context),
+            request['from_email'], [request['email']], html))
+    if emails:
+        get_connection(fail_silently=False).send_messages(emails)
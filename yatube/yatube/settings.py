@@ -1,11 +1,27 @@
 import os
+import sys
+
+from django.core.exceptions import ImproperlyConfigured
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-SECRET_KEY = '!^=het^^2(d$g60t-55fh@zm4y#dyv43sg-)j6wrveg^2r@q6s'
+# Профиль окружения: dev (по умолчанию), test или prod. DEBUG включён
+# только в dev: с ним Django хранит каждый SQL-запрос в
+# connection.queries, и память долгоживущих воркеров растёт.
+# Под manage.py test и pytest профиль по умолчанию — test.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+PROFILE = os.environ.get('YATUBE_PROFILE', 'test' if TESTING else 'dev')
+if PROFILE not in ('dev', 'test', 'prod'):
+    raise ImproperlyConfigured(f'Неизвестный YATUBE_PROFILE: {PROFILE}')
+
+SECRET_KEY = os.environ.get('SECRET_KEY')
+if not SECRET_KEY:
+    if PROFILE == 'prod':
+        raise ImproperlyConfigured('В prod нужен SECRET_KEY из окружения')
+    SECRET_KEY = '!^=het^^2(d$g60t-55fh@zm4y#dyv43sg-)j6wrveg^2r@q6s'
 
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', str(int(PROFILE == 'dev'))) == '1'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -13,6 +29,8 @@ ALLOWED_HOSTS = [
     '[::1]',
     'testserver',
 ]
+if os.environ.get('ALLOWED_HOSTS'):
+    ALLOWED_HOSTS = os.environ['ALLOWED_HOSTS'].split(',')
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -25,17 +43,23 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'jobs.apps.JobsConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'core.middleware.RateLimitMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware'
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.RecentQueriesMiddleware',
+    'core.middleware.SlowQueryMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -62,10 +86,25 @@ TEMPLATES = [
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
+# WAL позволяет читать ленты, пока пишется пост; synchronous=NORMAL
+# в WAL не нарушает целостность базы, а при сбое питания теряет
+# только последние транзакции. См. core/backends/sqlite3.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3')
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'wal',
+                'synchronous': 'normal',
+                'busy_timeout': 5000,
+                'cache_size': -64 * 1024,
+                'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'memory',
+            },
+        },
     }
 }
 
@@ -87,9 +126,20 @@ AUTH_PASSWORD_VALIDATORS = [
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_BYTES': 64 * 1024 * 1024,
+        },
     }
 }
+if PROFILE == 'test':
+    # Файловый кэш переживает запуск тестов, а база создаётся заново:
+    # в нём остались бы страницы прошлого прогона с теми же ключами.
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
 
 LANGUAGE_CODE = 'ru'
 
@@ -116,12 +166,82 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 
 AMOUNT_POSTS: int = 10
+AMOUNT_COMMENTS: int = 20
 AMOUNT_SECONDS: int = 20
 index_page: int = 15
 AMOUNT_CHAR: int = 15
 PAG_TEST_AMOUNT: int = 13
+FEED_COUNT_TIMEOUT: int = 300
+PAGE_WINDOW: int = 2
+POST_CARD_TIMEOUT: int = 60 * 60 * 24
+# Сколько последних постов общей ленты и ленты группы держит в памяти
+# каждый процесс (posts/hot_feeds.py) и для скольких групп сразу.
+HOT_FEED_SIZE: int = 300
+HOT_GROUP_FEED_SIZE: int = 100
+HOT_GROUP_FEEDS: int = 50
+# Буфер перечитывается не реже раза в столько секунд, даже если
+# поколение ленты не менялось.
+HOT_FEED_MAX_AGE: int = 60
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Загрузки всегда пишутся порциями во временный файл, а не в память.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Шаблоны берут только готовые миниатюры (posts/thumbnails.py),
+# а создаёт их фоновая задача (manage.py run_workers).
+THUMBNAIL_BACKEND = 'posts.thumbnails.ReadyThumbnailBackend'
+
+# Сколько последних SQL-запросов держать в памяти процесса для
+# диагностики (страница /debug/queries/ для сотрудников); 0 — выключено.
+QUERY_LOG_SIZE: int = int(os.environ.get('QUERY_LOG_SIZE', 0))
+QUERY_LOG_SQL_LENGTH: int = 1000
+
+# Запросы дольше SLOW_QUERY_MS миллисекунд записываются с параметрами,
+# вьюхой, местом вызова и планом в файл SLOW_QUERY_LOG (manage.py
+# slow_queries); не задано — журнал выключен.
+SLOW_QUERY_MS = (
+    float(os.environ['SLOW_QUERY_MS']) if 'SLOW_QUERY_MS' in os.environ
+    else None)
+SLOW_QUERY_LOG = os.environ.get(
+    'SLOW_QUERY_LOG', os.path.join(BASE_DIR, 'slow_queries.sqlite3'))
+
+# Показатели по адресам для Prometheus (страница /metrics для
+# сотрудников). Воркеры сбрасывают их в общий кэш не чаще раза
+# в METRICS_FLUSH_INTERVAL секунд. Выключены, пока manage.py
+# benchmark_metrics не укладывается в бюджет на целевой машине.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '0') == '1'
+METRICS_FLUSH_INTERVAL = 5
+
+# Сотрудник получает профиль вместо страницы, добавив к адресу
+# ?_profile или заголовок X-Profile. Доля PROFILER_SAMPLE_RATE обычных
+# запросов профилируется выборочно (стек раз в PROFILER_INTERVAL
+# секунд) в PROFILER_DIR; сложить их — manage.py merge_profiles.
+PROFILER_PARAM = '_profile'
+PROFILER_HEADER = 'X-Profile'
+PROFILER_SAMPLE_RATE = float(os.environ.get('PROFILER_SAMPLE_RATE', 0))
+PROFILER_INTERVAL = 0.005
+PROFILER_DIR = os.environ.get(
+    'PROFILER_DIR', os.path.join(BASE_DIR, 'profiles'))
+
+# Лимиты на запись (POST и другие небезопасные методы) по имени URL:
+# вёдра токенов отдельно на сессию пользователя и на IP, хранятся в
+# общем кэше. '20/h' — до 20 запросов подряд, затем 20 в час.
+RATE_LIMITS = {
+    'posts:post_create': {'user': '20/h', 'ip': '60/h'},
+    'posts:post_edit': {'user': '60/h', 'ip': '180/h'},
+    'posts:add_comment': {'user': '10/m', 'ip': '30/m'},
+}
+if PROFILE == 'test':
+    # Все тестовые клиенты приходят с одного IP.
+    RATE_LIMITS = {}
+# Адреса обратных прокси перед приложением. Для запросов от них IP
+# клиента для лимитов берётся из заголовка CLIENT_IP_HEADER, а не из
+# REMOTE_ADDR, иначе все анонимные клиенты делили бы одно ведро.
+TRUSTED_PROXIES = (
+    os.environ['TRUSTED_PROXIES'].split(',')
+    if os.environ.get('TRUSTED_PROXIES') else [])
+CLIENT_IP_HEADER = 'HTTP_X_FORWARDED_FOR'